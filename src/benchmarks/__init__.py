@@ -0,0 +1,2 @@
+"""Benchmarks for the vector space model, run offline over seeded synthetic corpora with `python3 -m benchmarks`.
+"""
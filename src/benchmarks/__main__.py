@@ -0,0 +1,4 @@
+from benchmarks.corpus_benchmarks import main
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Recall/latency benchmark of the approximate (IVF) index against the exact ranking, over a seeded synthetic corpus
+   with topics. Run with `python3 -m benchmarks.ann_recall --probes 1 2 4 8`; the results are written as JSON.
+"""
+import argparse
+import json
+import time
+
+from benchmarks.corpus_benchmarks import make_documents, git_commit
+from benchmarks.synthetic import ZipfianCorpus
+from vectorspace.vector_space_ann import ApproximateIndex, recall_at_k
+from vectorspace.vector_space_models import Document, Corpus
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+
+def benchmark_recall(corpus: Corpus, index: ApproximateIndex, query_docs: list[Document], k: int,
+                     probes: list[int]) -> list[dict]:
+    """Returns the recall@k and mean latencies of `index` for each probe count, alongside the mean latency of the
+    exact MaxScore `Corpus.search`."""
+    start = time.perf_counter()
+    for query_doc in query_docs:
+        corpus.search(query_doc, k)
+    search_seconds = (time.perf_counter() - start) / max(1, len(query_docs))
+    return [{**recall_at_k(index, corpus, query_docs, k, num_probes), "search_seconds": search_seconds}
+            for num_probes in probes]
+
+
+def run(args: argparse.Namespace) -> dict:
+    synthetic = ZipfianCorpus(args.docs, args.doc_length, args.vocabulary, args.seed, num_topics=args.topics)
+    corpus = Corpus(make_documents(synthetic.documents()), sparse=True)
+    start = time.perf_counter()
+    index = ApproximateIndex(corpus, args.lists, iterations=args.iterations, centroid_terms=args.centroid_terms,
+                             seed=args.seed)
+    build_seconds = time.perf_counter() - start
+
+    # "documents like this one" queries, and short keyword queries
+    step = max(1, len(corpus) // args.queries)
+    similar = [corpus[doc_id] for doc_id in range(0, len(corpus), step)][:args.queries]
+    keywords = [Document("query", words) for words in synthetic.queries(args.queries, 2, 8)]
+    return {
+        "meta": {"commit": git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")},
+        "parameters": vars(args),
+        "build": {"seconds": build_seconds, "num_lists": index.num_lists, "list_sizes": sorted(index.list_sizes)},
+        "similar_documents": benchmark_recall(corpus, index, similar, args.k, args.probes),
+        "keyword_queries": benchmark_recall(corpus, index, keywords, args.k, args.probes),
+    }
+
+
+def setup_argument_parser() -> argparse.ArgumentParser:
+    pars = argparse.ArgumentParser(prog="python3 -m benchmarks.ann_recall")
+    pars.add_argument("--docs", type=int, default=5000, help="number of synthetic documents (default: 5000)")
+    pars.add_argument("--doc-length", type=int, default=100, help="average words per document (default: 100)")
+    pars.add_argument("--vocabulary", type=int, default=20000, help="vocabulary size (default: 20000)")
+    pars.add_argument("--topics", type=int, default=50, help="number of topics of the corpus (default: 50)")
+    pars.add_argument("--queries", type=int, default=100, help="number of queries of each kind (default: 100)")
+    pars.add_argument("-k", type=int, default=10, help="results per query (default: 10)")
+    pars.add_argument("--seed", type=int, default=128, help="seed of the corpus and the clustering (default: 128)")
+    pars.add_argument("--lists", type=int, help="number of clusters (default: square root of --docs)")
+    pars.add_argument("--iterations", type=int, default=5, help="k-means iterations (default: 5)")
+    pars.add_argument("--centroid-terms", type=int, default=128, help="terms kept per centroid (default: 128)")
+    pars.add_argument("--probes", type=int, nargs="*", default=[1, 2, 4, 8],
+                      help="probe counts to measure recall@k with (default: 1 2 4 8)")
+    pars.add_argument("-o", "--output", type=str, default="-",
+                      help="path to write the JSON results to (default: '-' for stdout)")
+    return pars
+
+
+def main() -> None:
+    args = setup_argument_parser().parse_args()
+    results = json.dumps(run(args), indent=2)
+    if args.output == "-":
+        print(results)
+    else:
+        with open(args.output, "w") as output_file:
+            output_file.write(results + "\n")
+
+
+if __name__ == '__main__':
+    main()
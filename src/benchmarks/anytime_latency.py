@@ -0,0 +1,98 @@
+"""Tail latency/recall benchmark of the anytime (impact-ordered) index against the exact ranking, over a seeded
+   synthetic corpus. Run with `python3 -m benchmarks.anytime_latency --budgets 0.5 1 2`; the results are written as
+   JSON.
+"""
+import argparse
+import gc
+import json
+import time
+
+from benchmarks.corpus_benchmarks import make_documents, git_commit, percentile
+from benchmarks.synthetic import ZipfianCorpus
+from vectorspace.vector_space_anytime import ImpactOrderedIndex
+from vectorspace.vector_space_models import Document, Corpus
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+
+def benchmark_budget(corpus: Corpus, index: ImpactOrderedIndex, query_docs: list[Document], k: int,
+                     time_budget: float | None) -> dict:
+    """Returns the latency percentiles, the fraction of exact queries and the recall@k of `index` within
+    `time_budget` seconds per query (unlimited if None)."""
+    latencies, found, expected_total, exact_queries = [], 0, 0, 0
+    for query_doc in query_docs:
+        expected = {title for title, score in corpus.search(query_doc, k) if score > 0}
+        start = time.perf_counter()
+        ranked, exact = index.search_anytime(query_doc, k, time_budget=time_budget)
+        latencies.append(time.perf_counter() - start)
+        found += len(expected & {title for title, _ in ranked})
+        expected_total += len(expected)
+        exact_queries += exact
+    return {"time_budget_seconds": time_budget, "p50_seconds": percentile(latencies, 0.5),
+            "p99_seconds": percentile(latencies, 0.99), "max_seconds": max(latencies, default=0.0),
+            "exact": exact_queries / max(1, len(query_docs)), "recall": found / max(1, expected_total)}
+
+
+def benchmark_exact(corpus: Corpus, query_docs: list[Document], k: int) -> dict:
+    """Returns the latency percentiles of the exact MaxScore `Corpus.search`."""
+    latencies = []
+    for query_doc in query_docs:
+        start = time.perf_counter()
+        corpus.search(query_doc, k)
+        latencies.append(time.perf_counter() - start)
+    return {"p50_seconds": percentile(latencies, 0.5), "p99_seconds": percentile(latencies, 0.99),
+            "max_seconds": max(latencies, default=0.0)}
+
+
+def run(args: argparse.Namespace) -> dict:
+    synthetic = ZipfianCorpus(args.docs, args.doc_length, args.vocabulary, args.seed)
+    corpus = Corpus(make_documents(synthetic.documents()), sparse=True)
+    start = time.perf_counter()
+    index = ImpactOrderedIndex(corpus, args.bits)
+    build_seconds = time.perf_counter() - start
+    gc.freeze()  # like the runner, keeps full collections of the index out of the measured latencies
+
+    # keyword queries of frequent and rare terms alike, so that some touch very long posting lists
+    query_docs = [Document("query", words) for words in synthetic.queries(args.queries, 2, 8)]
+    budgets = [None, *[milliseconds / 1000 for milliseconds in args.budgets]]
+    return {
+        "meta": {"commit": git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")},
+        "parameters": vars(args),
+        "build": {"seconds": build_seconds},
+        "exact_search": benchmark_exact(corpus, query_docs, args.k),
+        "anytime_search": [benchmark_budget(corpus, index, query_docs, args.k, budget) for budget in budgets],
+    }
+
+
+def setup_argument_parser() -> argparse.ArgumentParser:
+    pars = argparse.ArgumentParser(prog="python3 -m benchmarks.anytime_latency")
+    pars.add_argument("--docs", type=int, default=5000, help="number of synthetic documents (default: 5000)")
+    pars.add_argument("--doc-length", type=int, default=100, help="average words per document (default: 100)")
+    pars.add_argument("--vocabulary", type=int, default=20000, help="vocabulary size (default: 20000)")
+    pars.add_argument("--queries", type=int, default=200, help="number of synthetic queries (default: 200)")
+    pars.add_argument("-k", type=int, default=10, help="results per query (default: 10)")
+    pars.add_argument("--seed", type=int, default=128, help="seed of the synthetic corpus (default: 128)")
+    pars.add_argument("--bits", type=int, default=8, help="bits of the quantized impacts (default: 8)")
+    pars.add_argument("--budgets", type=float, nargs="*", default=[0.5, 1, 2],
+                      help="time budgets per query to measure, in milliseconds (default: 0.5 1 2)")
+    pars.add_argument("-o", "--output", type=str, default="-",
+                      help="path to write the JSON results to (default: '-' for stdout)")
+    return pars
+
+
+def main() -> None:
+    args = setup_argument_parser().parse_args()
+    results = json.dumps(run(args), indent=2)
+    if args.output == "-":
+        print(results)
+    else:
+        with open(args.output, "w") as output_file:
+            output_file.write(results + "\n")
+
+
+if __name__ == '__main__':
+    main()
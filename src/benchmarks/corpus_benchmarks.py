@@ -0,0 +1,165 @@
+"""Reproducible benchmarks for building and querying a `Corpus` over a seeded synthetic corpus. Every benchmark
+   returns plain dictionaries so that `main` can write the results as JSON and runs can be compared across commits.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+
+from benchmarks.synthetic import ZipfianCorpus
+from vectorspace.vector_space_metrics import MetricsRecorder
+from vectorspace.vector_space_models import Document, Corpus
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+
+def make_documents(documents: list[tuple[str, list[str]]]) -> list[Document]:
+    """Returns fresh `Document`s, so that no term-count table is carried over from a previous build."""
+    return [Document(title, words) for title, words in documents]
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """Returns the nearest-rank percentile of `samples` for `fraction` in [0, 1]."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def benchmark_build(documents: list[tuple[str, list[str]]], threads: int = 1, processes: int = 1,
+                    sparse: bool = True) -> tuple[dict, Corpus]:
+    """Builds a corpus and returns its total and per-phase build times, along with the corpus."""
+    docs = make_documents(documents)
+    metrics = MetricsRecorder()
+    start = time.perf_counter()
+    corpus = Corpus(docs, threads=threads, sparse=sparse, processes=processes, metrics=metrics)
+    total = time.perf_counter() - start
+    phases = metrics.to_dict()["phases"]
+    corpus.metrics = None
+    return {"total_seconds": total,
+            "phase_seconds": {name: phase["wall_seconds"] for name, phase in phases.items()},
+            "phase_cpu_seconds": {name: phase["cpu_seconds"] for name, phase in phases.items()},
+            "threads": threads,
+            "processes": processes, "terms": len(corpus.terms),
+            "postings": sum([len(postings) for postings in corpus.index.values()])}, corpus
+
+
+def benchmark_memory(documents: list[tuple[str, list[str]]], sparse: bool = True, compact: bool = False) -> dict:
+    """Returns the peak memory traced while building a corpus, and the memory the built corpus (including its
+    documents) retains."""
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        corpus = Corpus(make_documents(documents), sparse=sparse, compact=compact)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del corpus
+    return {"compact": compact, "build_peak_bytes": peak - baseline, "retained_bytes": current - baseline}
+
+
+def benchmark_queries(corpus: Corpus, queries: list[list[str]], k: int = 10, block_size: int = 256) -> dict:
+    """Returns the latency distribution and the throughput of `corpus` for `queries`, searched one at a time and in
+    blocks of `block_size`."""
+    query_docs = [Document("query", words) for words in queries]
+
+    latencies = []
+    for query_doc in query_docs:
+        start = time.perf_counter()
+        corpus.search(query_doc, k)
+        latencies.append(time.perf_counter() - start)
+
+    # a query of a batch is answered when its block is, so each query waits for the scoring of its whole block
+    batch_latencies = []
+    for offset in range(0, len(query_docs), block_size):
+        block = query_docs[offset:offset + block_size]
+        start = time.perf_counter()
+        corpus.search_batch(block, k, block_size)
+        batch_latencies.extend([time.perf_counter() - start] * len(block))
+    batch_seconds = sum(batch_latencies[::block_size])
+
+    return {
+        "queries": len(query_docs),
+        "k": k,
+        "single": {"p50_seconds": percentile(latencies, 0.5), "p99_seconds": percentile(latencies, 0.99),
+                   "mean_seconds": sum(latencies) / len(latencies),
+                   "queries_per_second": len(latencies) / sum(latencies)},
+        "batch": {"block_size": block_size, "p50_seconds": percentile(batch_latencies, 0.5),
+                  "p99_seconds": percentile(batch_latencies, 0.99), "total_seconds": batch_seconds,
+                  "queries_per_second": len(query_docs) / batch_seconds},
+    }
+
+
+def benchmark_scaling(documents: list[tuple[str, list[str]]], workers: list[int]) -> list[dict]:
+    """Returns the build times of the corpus over each number of `workers`, as threads and as processes."""
+    results = []
+    for count in workers:
+        results.append({"mode": "threads", **benchmark_build(documents, threads=count)[0]})
+        results.append({"mode": "processes", **benchmark_build(documents, processes=count)[0]})
+    return results
+
+
+def git_commit() -> str | None:
+    """Returns the commit of the working tree, or None outside of a git repository."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Runs every benchmark selected by `args` and returns the results."""
+    synthetic = ZipfianCorpus(args.docs, args.doc_length, args.vocabulary, args.seed)
+    documents = synthetic.documents()
+    queries = synthetic.queries(args.queries)
+
+    build, corpus = benchmark_build(documents)
+    results = {
+        "meta": {"commit": git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")},
+        "parameters": vars(args),
+        "build": build,
+        "queries": benchmark_queries(corpus, queries, args.k),
+        "queries_compact": benchmark_queries(Corpus(make_documents(documents), compact=True), queries, args.k),
+    }
+    if not args.skip_memory:
+        results["memory"] = benchmark_memory(documents)
+        results["memory_compact"] = benchmark_memory(documents, compact=True)
+    if args.workers:
+        results["scaling"] = benchmark_scaling(documents, args.workers)
+    return results
+
+
+def setup_argument_parser() -> argparse.ArgumentParser:
+    pars = argparse.ArgumentParser(prog="python3 -m benchmarks")
+    pars.add_argument("--docs", type=int, default=2000, help="number of synthetic documents (default: 2000)")
+    pars.add_argument("--doc-length", type=int, default=200, help="average words per document (default: 200)")
+    pars.add_argument("--vocabulary", type=int, default=20000, help="vocabulary size (default: 20000)")
+    pars.add_argument("--queries", type=int, default=500, help="number of synthetic queries (default: 500)")
+    pars.add_argument("-k", type=int, default=10, help="results per query (default: 10)")
+    pars.add_argument("--seed", type=int, default=128, help="seed of the synthetic corpus (default: 128)")
+    pars.add_argument("--workers", type=int, nargs="*", default=[],
+                      help="thread and process counts to measure build scaling with, e.g. --workers 1 2 4")
+    pars.add_argument("--skip-memory", action="store_true", help="flag to skip the (slower) traced memory benchmark")
+    pars.add_argument("-o", "--output", type=str, default="-",
+                      help="path to write the JSON results to (default: '-' for stdout)")
+    return pars
+
+
+def main() -> None:
+    args = setup_argument_parser().parse_args()
+    results = json.dumps(run(args), indent=2)
+    if args.output == "-":
+        print(results)
+    else:
+        with open(args.output, "w") as output_file:
+            output_file.write(results + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Cold start benchmark of `vector_space_runner`: the wall time of a fresh process that loads a saved index (pickled
+   or binary), processes one query with the preprocessor stored in it and writes the results, over a seeded
+   synthetic corpus the size of the Inaugural corpus. Run with `python3 -m benchmarks.startup`; the results are
+   written as JSON, and report whether the runner imported NLTK or NumPy.
+"""
+import argparse
+import json
+import os
+import pickle
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus_benchmarks import make_documents, git_commit
+from benchmarks.synthetic import ZipfianCorpus
+from vectorspace.vector_space_models import Corpus, LazyStemmer, Preprocessor
+from vectorspace.vector_space_storage import write_index
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+# Runs the runner in this process, then reports which of the heavy modules it imported.
+_PROBE = """
+import json, runpy, sys
+sys.argv = ["vector_space_runner", *sys.argv[1:]]
+runpy.run_module("vectorspace.vector_space_runner", run_name="__main__")
+print(json.dumps({"nltk": "nltk" in sys.modules, "numpy": "numpy" in sys.modules}), file=sys.stderr)
+"""
+
+
+def build_indexes(synthetic: ZipfianCorpus, directory: str, num_stop_words: int) -> dict[str, list[str]]:
+    """Saves a pickled corpus and a binary index of `synthetic` in `directory`, each storing a preprocessor whose stop
+    words are the `num_stop_words` most frequent words, and returns the runner arguments opening each of them."""
+    documents = synthetic.documents()
+    preprocessor = Preprocessor(set(synthetic.vocabulary[:num_stop_words]), LazyStemmer("snowball", "english"))
+    preprocessor.build_stem_table({word for _, words in documents for word in words})
+    corpus = Corpus(make_documents([(title, preprocessor.process(words)) for title, words in documents]))
+    corpus.preprocessor = preprocessor
+
+    pickle_path, index_path = os.path.join(directory, "corpus.pkl"), os.path.join(directory, "corpus.idx")
+    with open(pickle_path, "wb") as pickle_file:
+        pickle.dump(corpus, pickle_file)
+    write_index(corpus, index_path)
+    return {"pickle": [pickle_path], "binary": [index_path, "-b"]}
+
+
+def time_process(command: list[str], repeat: int) -> dict:
+    """Runs `command` `repeat` times and returns the minimum and median wall time of a run, in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, capture_output=True, env=_environment())
+        samples.append(time.perf_counter() - start)
+    return {"min_seconds": min(samples), "median_seconds": statistics.median(samples)}
+
+
+def probe_imports(arguments: list[str]) -> dict:
+    """Returns which of NLTK and NumPy the runner imported when run with `arguments`."""
+    completed = subprocess.run([sys.executable, "-c", _PROBE, *arguments], check=True, capture_output=True,
+                               text=True, env=_environment())
+    return json.loads(completed.stderr.strip().splitlines()[-1])
+
+
+def run(args: argparse.Namespace) -> dict:
+    synthetic = ZipfianCorpus(args.docs, args.doc_length, args.vocabulary, args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        formats = build_indexes(synthetic, directory, args.stop_words)
+        queries_path, output_path = os.path.join(directory, "query.txt"), os.path.join(directory, "results.jsonl")
+        with open(queries_path, "w") as queries_file:
+            queries_file.write(" ".join(synthetic.queries(1, 3, 3)[0]) + "\n")
+
+        results = {
+            "meta": {"commit": git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")},
+            "parameters": vars(args),
+            "interpreter": time_process([sys.executable, "-c", "pass"], args.repeat),
+            "runner_import": time_process([sys.executable, "-c", "import vectorspace.vector_space_runner"],
+                                          args.repeat),
+        }
+        for name, index_arguments in formats.items():
+            arguments = ["1", *index_arguments, "-q", queries_path, "-o", output_path, "-k", str(args.k)]
+            results[f"first_result_{name}"] = {
+                **time_process([sys.executable, "-m", "vectorspace.vector_space_runner", *arguments], args.repeat),
+                "imported": probe_imports(arguments),
+            }
+    return results
+
+
+def _environment() -> dict[str, str]:
+    """Returns the environment of this process with the package directory on the `PYTHONPATH` of subprocesses."""
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    python_path = os.environ.get("PYTHONPATH")
+    return dict(os.environ, PYTHONPATH=package_dir if not python_path else os.pathsep.join([package_dir, python_path]))
+
+
+def setup_argument_parser() -> argparse.ArgumentParser:
+    pars = argparse.ArgumentParser(prog="python3 -m benchmarks.startup")
+    pars.add_argument("--docs", type=int, default=60, help="number of synthetic documents (default: 60)")
+    pars.add_argument("--doc-length", type=int, default=2500, help="average words per document (default: 2500)")
+    pars.add_argument("--vocabulary", type=int, default=10000, help="vocabulary size (default: 10000)")
+    pars.add_argument("--stop-words", type=int, default=100,
+                      help="number of most frequent words stored as stop words (default: 100)")
+    pars.add_argument("-k", type=int, default=10, help="results per query (default: 10)")
+    pars.add_argument("--seed", type=int, default=128, help="seed of the synthetic corpus (default: 128)")
+    pars.add_argument("--repeat", type=int, default=5, help="runs of each process to time (default: 5)")
+    pars.add_argument("-o", "--output", type=str, default="-",
+                      help="path to write the JSON results to (default: '-' for stdout)")
+    return pars
+
+
+def main() -> None:
+    args = setup_argument_parser().parse_args()
+    results = json.dumps(run(args), indent=2)
+    if args.output == "-":
+        print(results)
+    else:
+        with open(args.output, "w") as output_file:
+            output_file.write(results + "\n")
+
+
+if __name__ == '__main__':
+    main()
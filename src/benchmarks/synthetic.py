@@ -0,0 +1,65 @@
+"""Seeded synthetic corpus generator for the vector space model benchmarks. Word frequencies follow a Zipfian
+   distribution, like natural language text, so the postings and document frequencies look like a real corpus's.
+"""
+import random
+
+from itertools import accumulate
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+
+class ZipfianCorpus:
+    """This class generates reproducible documents and queries over a vocabulary of `vocabulary_size` words, where
+       the word of rank r is drawn with probability proportional to 1 / r ** `exponent`. Document lengths are drawn
+       uniformly around `doc_length`, and the same `seed` always generates the same documents and queries.
+
+       With `num_topics` set, the vocabulary is dealt round robin into that many topics, each document is about one
+       topic, and a `topic_share` of its words are drawn from the Zipfian distribution over that topic's words. This
+       gives the corpus the clusters of similar documents real collections have."""
+
+    def __init__(self, num_docs: int, doc_length: int, vocabulary_size: int, seed: int = 0, exponent: float = 1.0,
+                 num_topics: int = 0, topic_share: float = 0.5):
+        self._num_docs = num_docs
+        self._doc_length = doc_length
+        self._vocabulary = [f"w{rank:06d}" for rank in range(vocabulary_size)]
+        self._cum_weights = list(accumulate([1 / (rank + 1) ** exponent for rank in range(vocabulary_size)]))
+        self._seed = seed
+        self._topics = [self._vocabulary[topic::num_topics] for topic in range(num_topics)]
+        self._topic_cum_weights = [list(accumulate([1 / (rank + 1) ** exponent for rank in range(len(words))]))
+                                   for words in self._topics]
+        self._topic_share = topic_share
+
+    @property
+    def vocabulary(self):
+        return self._vocabulary
+
+    def documents(self) -> list[tuple[str, list[str]]]:
+        """Returns the (title, words) pairs of the corpus."""
+        rng = random.Random(self._seed)
+        return [(f"doc{doc_id:07d}", self._words(rng, rng.randint(self._doc_length // 2, self._doc_length * 3 // 2),
+                                                 rng.randrange(len(self._topics)) if self._topics else None))
+                for doc_id in range(self._num_docs)]
+
+    def topic(self, word: str) -> int | None:
+        """Returns the topic `word` belongs to, or None if the corpus has no topics."""
+        return int(word[1:]) % len(self._topics) if self._topics else None
+
+    def queries(self, num_queries: int, min_length: int = 1, max_length: int = 5) -> list[list[str]]:
+        """Returns `num_queries` queries of `min_length` to `max_length` words drawn from the same distribution."""
+        rng = random.Random(self._seed + 1)
+        return [self._words(rng, rng.randint(min_length, max_length)) for _ in range(num_queries)]
+
+    def _words(self, rng: random.Random, length: int, topic: int | None = None) -> list[str]:
+        """Draws `length` words from the Zipfian distribution with `rng`, a `topic_share` of them from the words of
+        `topic` if given."""
+        if topic is None:
+            return rng.choices(self._vocabulary, cum_weights=self._cum_weights, k=length)
+        num_topic_words = sum([rng.random() < self._topic_share for _ in range(length)])
+        words = rng.choices(self._topics[topic], cum_weights=self._topic_cum_weights[topic], k=num_topic_words)
+        words.extend(rng.choices(self._vocabulary, cum_weights=self._cum_weights, k=length - num_topic_words))
+        rng.shuffle(words)
+        return words
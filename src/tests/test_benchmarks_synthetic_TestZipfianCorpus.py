@@ -0,0 +1,44 @@
+import unittest
+from benchmarks.synthetic import ZipfianCorpus
+
+
+class TestZipfianCorpus(unittest.TestCase):
+    def setUp(self):
+        self.synthetic = ZipfianCorpus(num_docs=50, doc_length=40, vocabulary_size=500, seed=7)
+
+    def test_reproducible(self):
+        self.assertEqual(self.synthetic.documents(), ZipfianCorpus(50, 40, 500, seed=7).documents())
+        self.assertEqual(self.synthetic.queries(10), ZipfianCorpus(50, 40, 500, seed=7).queries(10))
+        self.assertNotEqual(self.synthetic.documents(), ZipfianCorpus(50, 40, 500, seed=8).documents())
+
+    def test_shape(self):
+        documents = self.synthetic.documents()
+        self.assertEqual(len(documents), 50)
+        self.assertEqual(len({title for title, _ in documents}), 50)
+        for _, words in documents:
+            self.assertTrue(20 <= len(words) <= 60)
+            self.assertTrue(set(words) <= set(self.synthetic.vocabulary))
+        for words in self.synthetic.queries(20, 2, 3):
+            self.assertIn(len(words), (2, 3))
+
+    def test_zipfian(self):
+        counts = {}
+        for _, words in self.synthetic.documents():
+            for word in words:
+                counts[word] = counts.get(word, 0) + 1
+        vocabulary = self.synthetic.vocabulary
+        self.assertGreater(counts[vocabulary[0]], counts.get(vocabulary[10], 0))
+        self.assertGreater(counts.get(vocabulary[10], 0), counts.get(vocabulary[400], 0))
+
+    def test_topics(self):
+        synthetic = ZipfianCorpus(40, 60, 400, seed=7, num_topics=4, topic_share=0.8)
+        self.assertEqual(synthetic.documents(),
+                         ZipfianCorpus(40, 60, 400, seed=7, num_topics=4, topic_share=0.8).documents())
+        self.assertIsNone(self.synthetic.topic("w000001"))
+        for _, words in synthetic.documents():
+            topics = [synthetic.topic(word) for word in words]
+            self.assertGreater(max([topics.count(topic) for topic in range(4)]), len(words) // 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
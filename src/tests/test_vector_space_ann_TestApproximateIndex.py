@@ -0,0 +1,74 @@
+import unittest
+from benchmarks.synthetic import ZipfianCorpus
+from vectorspace.vector_space_models import Document, Corpus
+from vectorspace.vector_space_ann import ApproximateIndex, exact_ranking, recall_at_k
+
+
+class TestApproximateIndex(unittest.TestCase):
+    def setUp(self):
+        self.synthetic = ZipfianCorpus(num_docs=300, doc_length=40, vocabulary_size=2000, seed=17, num_topics=8)
+        self.corpus = Corpus([Document(title, words) for title, words in self.synthetic.documents()], sparse=True)
+        self.index = ApproximateIndex(self.corpus, num_lists=8, num_probes=2, seed=3)
+        self.queries = [self.corpus[doc_id] for doc_id in range(0, 300, 10)]
+        self.queries.extend([Document("query", words) for words in self.synthetic.queries(20, 2, 6)])
+
+    def positive(self, query_doc: Document, k: int) -> list[tuple[str, float]]:
+        return [(title, score) for title, score in self.corpus.search(query_doc, k) if score > 0]
+
+    def test_build(self):
+        self.assertEqual(self.index.num_lists, 8)
+        self.assertEqual(sum(self.index.list_sizes), len(self.corpus))
+        self.assertEqual(len(ApproximateIndex(self.corpus).list_sizes), 17)
+        for num_lists, num_probes, centroid_terms in ((0, 1, 1), (2, 0, 1), (2, 1, 0)):
+            with self.assertRaises(ValueError):
+                ApproximateIndex(self.corpus, num_lists, num_probes, centroid_terms=centroid_terms)
+
+    def test_all_probes_are_exact(self):
+        for query in self.queries:
+            self.assertEqual(self.index.search(query, 10, num_probes=8), self.positive(query, 10))
+        self.assertEqual(self.index.search_batch(self.queries[:5], 3, 8), [self.positive(query, 3)
+                                                                           for query in self.queries[:5]])
+
+    def test_invalid_num_probes(self):
+        for num_probes in (0, -1, 9):
+            with self.subTest(num_probes=num_probes), self.assertRaises(ValueError):
+                self.index.search(self.queries[0], 10, num_probes=num_probes)
+        with self.assertRaises(ValueError):
+            self.index.search_batch(self.queries[:2], 10, 0)
+        self.assertEqual(self.index.search(self.queries[0], 10, num_probes=None),
+                         self.index.search(self.queries[0], 10, num_probes=2))
+
+    def test_approximate_search(self):
+        for query in self.queries:
+            results = self.index.search(query, 10)
+            self.assertLessEqual(len(results), 10)
+            self.assertEqual(results, sorted(results, key=lambda item: -item[1]))
+            exact = dict(self.positive(query, len(self.corpus)))
+            for title, score in results:
+                self.assertEqual(score, exact[title])
+        self.assertEqual(self.index.search(Document("query", ["unknown"])), [])
+
+    def test_recall_at_k(self):
+        similar = recall_at_k(self.index, self.corpus, self.queries[:30], 10)
+        self.assertGreaterEqual(similar["recall"], 0.9)
+        self.assertEqual(similar["queries"], 30)
+        self.assertEqual(recall_at_k(self.index, self.corpus, self.queries, 10, num_probes=8)["recall"], 1.0)
+
+    def test_exact_ranking(self):
+        for query in self.queries[::5]:
+            expected = self.positive(query, 10)
+            ranking = exact_ranking(self.corpus, query, 10)
+            self.assertEqual([title for title, _ in ranking], [title for title, _ in expected])
+            for (_, score), (_, expected_score) in zip(ranking, expected):
+                self.assertAlmostEqual(score, expected_score)
+
+    def test_rebuilt_after_corpus_change(self):
+        self.corpus.add_documents([Document("new", self.corpus[0].words)])
+        self.assertEqual(self.index.search(Document("query", self.corpus[0].words), 2, num_probes=8),
+                         self.positive(Document("query", self.corpus[0].words), 2))
+        self.assertEqual(sum(self.index.list_sizes), len(self.corpus))
+        self.assertIsInstance(self.corpus.to_approximate(4, 1), ApproximateIndex)
+
+
+if __name__ == '__main__':
+    unittest.main()
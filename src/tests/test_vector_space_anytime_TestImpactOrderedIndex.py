@@ -0,0 +1,77 @@
+import unittest
+from benchmarks.synthetic import ZipfianCorpus
+from vectorspace.vector_space_models import Document, Corpus
+from vectorspace.vector_space_anytime import ImpactOrderedIndex
+
+
+class TestImpactOrderedIndex(unittest.TestCase):
+    def setUp(self):
+        self.synthetic = ZipfianCorpus(num_docs=300, doc_length=40, vocabulary_size=2000, seed=17, num_topics=8)
+        self.corpus = Corpus([Document(title, words) for title, words in self.synthetic.documents()], sparse=True)
+        self.index = ImpactOrderedIndex(self.corpus)
+        self.queries = [self.corpus[doc_id] for doc_id in range(0, 300, 15)]
+        self.queries.extend([Document("query", words) for words in self.synthetic.queries(20, 2, 6)])
+
+    def test_layout(self):
+        self.assertEqual(self.index.levels, 255)
+        for term_id, postings in self.corpus.index.items():
+            segments = self.index.segments(term_id)
+            levels = [level for level, _ in segments]
+            self.assertEqual(levels, sorted(set(levels), reverse=True))
+            self.assertTrue(all(1 <= level <= 255 for level in levels))
+            self.assertEqual(sorted([posting for _, segment in segments for posting in segment]), postings)
+        self.assertEqual(self.index.segments(len(self.corpus.terms)), [])
+        with self.assertRaises(ValueError):
+            ImpactOrderedIndex(self.corpus, bits=0)
+
+    def test_exact(self):
+        for query in self.queries:
+            self.assertEqual(self.index.search_anytime(query, 10), (self.corpus.search(query, 10), True))
+        self.assertEqual(self.index.search_batch(self.queries[:3], 5), [self.corpus.search(query, 5)
+                                                                        for query in self.queries[:3]])
+        self.assertEqual(self.index.search_anytime(Document("query", ["unknown"]), 3),
+                         (self.corpus.search(Document("query", ["unknown"]), 3), True))
+
+    def test_postings_budget(self):
+        query = self.queries[0]
+        ranked, exact = self.index.search_anytime(query, 10, postings_budget=0)
+        self.assertFalse(exact)
+        self.assertEqual([score for _, score in ranked], [0.0] * 10)
+        num_postings = sum([len(self.corpus.index.get(self.corpus.terms[term], ()))
+                            for term in query.counts if term in self.corpus.terms])
+        self.assertEqual(self.index.search_anytime(query, 10, postings_budget=num_postings)[1], True)
+
+        # the highest impact segments are scored first, so a fraction of the postings finds most of the top 10
+        expected = {title for title, _ in self.corpus.search(query, 10)}
+        ranked, exact = self.index.search_anytime(query, 10, postings_budget=num_postings // 4)
+        self.assertFalse(exact)
+        self.assertGreaterEqual(len(expected & {title for title, _ in ranked}), 5)
+
+    def test_postings_budget_within_last_chunk(self):
+        # the 10 postings of "common" have the same impact, so they are a single segment scored in one chunk
+        corpus = Corpus([Document(f"d{doc_id}", ["common", f"w{doc_id}"]) for doc_id in range(10)]
+                        + [Document(f"other{doc_id}", ["rare"]) for doc_id in range(10)], sparse=True)
+        index = ImpactOrderedIndex(corpus)
+        query = Document("query", ["common"])
+        self.assertEqual([len(segment) for _, segment in index.segments(corpus.terms["common"])], [10])
+        ranked, exact = index.search_anytime(query, 10, postings_budget=5)
+        self.assertFalse(exact)
+        self.assertEqual(len([score for _, score in ranked if score > 0]), 5)
+        self.assertEqual(index.search_anytime(query, 10, postings_budget=10), (corpus.search(query, 10), True))
+
+    def test_time_budget(self):
+        self.index.time_budget = 0.0
+        self.assertEqual(self.index.search_anytime(self.queries[0], 10)[1], False)
+        self.assertEqual(self.index.search_anytime(self.queries[0], 10, time_budget=60.0)[1], True)
+        with self.assertRaises(ValueError):
+            self.index.time_budget = -1.0
+
+    def test_rebuild(self):
+        self.corpus.add_documents([Document("new", self.queries[0].words)])
+        ranked, exact = self.corpus.to_anytime().search_anytime(self.queries[0], 2)
+        self.assertEqual(self.index.search_anytime(self.queries[0], 2), (ranked, exact))
+        self.assertIn("new", [title for title, _ in ranked])
+
+
+if __name__ == '__main__':
+    unittest.main()
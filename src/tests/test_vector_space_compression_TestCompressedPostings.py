@@ -0,0 +1,64 @@
+import pickle
+import random
+import unittest
+from array import array
+from vectorspace.vector_space_compression import CompressedPostings, PositionalPostings, encode_varints, decode_varints
+
+
+class TestCompressedPostings(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(19)
+        self.index = {}
+        for term_id in range(0, 60, 2):
+            doc_ids = sorted(rng.sample(range(100000), rng.randint(1, 50)))
+            self.index[term_id] = [(doc_id, rng.random() * 5) for doc_id in doc_ids]
+        self.postings = CompressedPostings(self.index)
+
+    def test_varints(self):
+        values = [0, 1, 127, 128, 300, 16383, 16384, 2 ** 32 - 1, 2 ** 40]
+        buffer = encode_varints(values)
+        self.assertEqual(bytes(encode_varints([0, 127, 128, 300])), b"\x00\x7f\x80\x01\xac\x02")
+        self.assertEqual(decode_varints(buffer), values)
+        self.assertEqual(decode_varints(buffer, 1, 3), [1, 127])
+        with self.assertRaises(ValueError):
+            encode_varints([-1])
+
+    def test_mapping(self):
+        self.assertEqual(len(self.postings), len(self.index))
+        self.assertEqual(list(self.postings), sorted(self.index))
+        for term_id, postings in self.index.items():
+            self.assertIn(term_id, self.postings)
+            expected = [(doc_id, array('f', [weight])[0]) for doc_id, weight in postings]
+            self.assertEqual(self.postings[term_id], expected)
+        for term_id in (1, 61, -2, "0"):
+            self.assertNotIn(term_id, self.postings)
+            self.assertEqual(self.postings.get(term_id, ()), ())
+        with self.assertRaises(KeyError):
+            _ = self.postings[3]
+
+    def test_compressed(self):
+        num_postings = sum([len(postings) for postings in self.index.values()])
+        self.assertLess(self.postings.nbytes, 9 * num_postings)
+        self.assertEqual(pickle.loads(pickle.dumps(self.postings))[4], self.postings[4])
+        self.assertEqual(len(CompressedPostings({0: [], 1: [(5, 1.0)]})), 1)
+
+    def test_positional(self):
+        rng = random.Random(23)
+        documents = [[rng.randrange(40) for _ in range(rng.randint(0, 300))] for _ in range(50)]
+        positional = PositionalPostings(documents)
+        expected = {}
+        for doc_id, term_ids in enumerate(documents):
+            for position, term_id in enumerate(term_ids):
+                postings = expected.setdefault(term_id, [])
+                if not postings or postings[-1][0] != doc_id:
+                    postings.append((doc_id, []))
+                postings[-1][1].append(position)
+        self.assertEqual(list(positional), sorted(expected))
+        self.assertEqual(dict(positional), expected)
+        self.assertNotIn(40, positional)
+        self.assertLess(positional.nbytes, 2 * sum([len(term_ids) for term_ids in documents]))
+        self.assertEqual(pickle.loads(pickle.dumps(positional))[7], expected[7])
+
+
+if __name__ == '__main__':
+    unittest.main()
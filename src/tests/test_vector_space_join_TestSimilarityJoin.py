@@ -0,0 +1,116 @@
+import math
+import random
+import unittest
+from benchmarks.synthetic import ZipfianCorpus
+from vectorspace.vector_space_models import Document, Corpus
+from vectorspace.vector_space_join import SimilarityJoin, similarity_join, sparse
+from vectorspace.vector_space_weighting import WEIGHTING_SCHEMES
+
+
+class TestSimilarityJoin(unittest.TestCase):
+    def setUp(self):
+        synthetic = ZipfianCorpus(num_docs=80, doc_length=20, vocabulary_size=300, seed=9, num_topics=4)
+        documents = [Document(title, words) for title, words in synthetic.documents()]
+        documents.append(Document("copy", documents[3].words))  # an exact duplicate of doc0000003
+        documents.append(Document("empty", []))
+        self.corpus = Corpus(documents, sparse=True)
+
+    def expected(self, threshold: float, k: int | None) -> list[tuple[str, list[tuple[str, float]]]]:
+        expected = []
+        for doc in self.corpus:
+            neighbours = [(title, score) for title, score in self.corpus.search(doc, len(self.corpus))
+                          if title != doc.title and score > 0 and score >= threshold]
+            expected.append((doc.title, neighbours[:k]))
+        return expected
+
+    def assertJoinEqual(self, result, expected):
+        self.assertEqual([title for title, _ in result], [title for title, _ in expected])
+        for (_, neighbours), (_, expected_neighbours) in zip(result, expected):
+            self.assertEqual([title for title, _ in neighbours], [title for title, _ in expected_neighbours])
+            for (_, score), (_, expected_score) in zip(neighbours, expected_neighbours):
+                self.assertAlmostEqual(score, expected_score, places=9)
+
+    @staticmethod
+    def cosine(vector: dict[int, float], other: dict[int, float]) -> float:
+        norms = math.sqrt(math.fsum([weight ** 2 for weight in vector.values()])) * \
+                math.sqrt(math.fsum([weight ** 2 for weight in other.values()]))
+        products = [weight * other[term_id] for term_id, weight in vector.items() if term_id in other]
+        return math.fsum(products) / norms if norms else 0.0
+
+    def test_pure_python(self):
+        for threshold, k in [(0.0, None), (0.0, 4), (0.2, None), (0.2, 3), (0.9, None)]:
+            with self.subTest(threshold=threshold, k=k):
+                result = list(self.corpus.similarity_join(threshold, k, block_size=16, matrix=False))
+                self.assertJoinEqual(result, self.expected(threshold, k))
+
+    @unittest.skipIf(sparse is None, "requires scipy")
+    def test_matrix(self):
+        for threshold, k in [(0.0, None), (0.0, 4), (0.2, 3), (0.9, None)]:
+            with self.subTest(threshold=threshold, k=k):
+                result = list(self.corpus.similarity_join(threshold, k, block_size=16, matrix=True))
+                self.assertJoinEqual(result, self.expected(threshold, k))
+
+    def test_near_duplicates(self):
+        duplicates = {title: neighbours for title, neighbours in similarity_join(self.corpus, 0.99, matrix=False)
+                      if neighbours}
+        self.assertEqual(list(duplicates), ["doc0000003", "copy"])
+        self.assertEqual([title for title, _ in duplicates["copy"]], ["doc0000003"])
+        self.assertAlmostEqual(duplicates["copy"][0][1], 1.0)
+
+    def test_prefix_filtering_prunes(self):
+        join = SimilarityJoin(self.corpus, 0.5, matrix=False)
+        self.assertLess(sum([len(postings) for postings in join._prefix_index.values()]),
+                        sum([len(postings) for postings in self.corpus.index.values()]))
+
+    def test_processes(self):
+        self.assertJoinEqual(list(self.corpus.similarity_join(0.1, 5, block_size=8, processes=2, matrix=False)),
+                             self.expected(0.1, 5))
+
+    def test_term_in_every_document(self):
+        # the TF-IDF weight of a term in every document is negative, which the prefix bounds must account for
+        for seed in range(20):
+            rng = random.Random(seed)
+            word_lists = [["common"] + [f"w{rng.randrange(12)}" for _ in range(rng.randint(1, 6))]
+                          for _ in range(rng.randint(3, 12))]
+            documents = [Document(f"d{doc_id}", words) for doc_id, words in enumerate(word_lists)]
+            self.corpus = Corpus(documents, sparse=True)
+            self.assertLess(min([weight for _, weight in self.corpus.index[self.corpus.terms["common"]]]), 0)
+            for threshold in (0.1, 0.3, 0.5):
+                with self.subTest(seed=seed, threshold=threshold):
+                    result = self.corpus.similarity_join(threshold, matrix=False)
+                    expected = self.expected(threshold, None)
+                    self.assertEqual([(title, {other for other, _ in neighbours}) for title, neighbours in result],
+                                     [(title, {other for other, _ in neighbours}) for title, neighbours in expected])
+
+    def test_weighting_schemes(self):
+        # the join takes the cosine of the weights of any scheme, including those that are not cosine normalized
+        synthetic = ZipfianCorpus(num_docs=80, doc_length=5, vocabulary_size=40, seed=9, num_topics=4)
+        self.corpus = Corpus([Document(title, words) for title, words in synthetic.documents()], sparse=True)
+        for name, scheme in WEIGHTING_SCHEMES.items():
+            self.corpus.weighting = scheme()
+            vectors = [{} for _ in self.corpus]
+            for term_id, postings in self.corpus.index.items():
+                for doc_id, weight in postings:
+                    vectors[doc_id][term_id] = weight
+            for threshold, k in [(0.2, None), (0.0, 3)]:
+                with self.subTest(scheme=name, threshold=threshold, k=k):
+                    expected = []
+                    for doc_id, vector in enumerate(vectors):
+                        scores = [(other_id, self.cosine(vector, other)) for other_id, other in enumerate(vectors)
+                                  if other_id != doc_id]
+                        neighbours = sorted([item for item in scores if item[1] > 0 and item[1] >= threshold],
+                                            key=lambda item: (-item[1], item[0]))[:k]
+                        expected.append((self.corpus[doc_id].title,
+                                         [(self.corpus[other_id].title, score) for other_id, score in neighbours]))
+                    result = list(self.corpus.similarity_join(threshold, k, block_size=16, matrix=False))
+                    self.assertJoinEqual(result, expected)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            SimilarityJoin(self.corpus, threshold=1.5)
+        with self.assertRaises(ValueError):
+            SimilarityJoin(self.corpus, k=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from benchmarks.synthetic import ZipfianCorpus
+from vectorspace.vector_space_models import Document, Corpus
+from vectorspace.vector_space_lsa import LsaIndex, randomized_svd, np
+
+
+@unittest.skipIf(np is None, "requires numpy")
+class TestLsaIndex(unittest.TestCase):
+    def setUp(self):
+        self.synthetic = ZipfianCorpus(num_docs=120, doc_length=40, vocabulary_size=1500, seed=5, num_topics=6)
+        self.corpus = Corpus([Document(title, words) for title, words in self.synthetic.documents()], sparse=True)
+        self.queries = [self.corpus[doc_id] for doc_id in range(0, 120, 12)]
+        self.queries.extend([Document("query", words) for words in self.synthetic.queries(10, 3, 8)])
+
+    def test_randomized_svd(self):
+        matrix = np.random.default_rng(1).standard_normal((60, 40)) @ np.diag(0.8 ** np.arange(40))
+        left, singular_values, right = randomized_svd(matrix, 10, power_iterations=3)
+        self.assertEqual((left.shape, singular_values.shape, right.shape), ((60, 10), (10,), (10, 40)))
+        np.testing.assert_allclose(singular_values, np.linalg.svd(matrix, compute_uv=False)[:10], rtol=1e-3)
+        np.testing.assert_allclose(left.T @ left, np.eye(10), atol=1e-8)
+
+    def test_embeddings(self):
+        index = LsaIndex(self.corpus, rank=16)
+        self.assertEqual(index.rank, 16)
+        self.assertEqual(index.embeddings.shape, (120, 16))
+        self.assertEqual(index.embeddings.dtype, np.float32)
+        self.assertEqual(index.term_vectors.shape, (len(self.corpus.terms), 16))
+        self.assertEqual(index.nbytes, 4 * 16 * (120 + len(self.corpus.terms)))
+        np.testing.assert_allclose(np.linalg.norm(index.embeddings, axis=1), 1.0, rtol=1e-5)
+        self.assertEqual(LsaIndex(self.corpus, rank=1000).rank, 120)
+        with self.assertRaises(ValueError):
+            LsaIndex(self.corpus, rank=0)
+
+    def test_full_rank_matches_exact_cosine(self):
+        index = LsaIndex(self.corpus, rank=120)
+        documents = self.queries[:10]  # documents lie in the span of the full rank SVD, so no similarity is lost
+        np.testing.assert_allclose(index.score(documents), self.corpus.to_matrix().score(documents), atol=1e-4)
+
+    def test_search(self):
+        index = self.corpus.to_lsa(rank=24)
+        for query in self.queries[:10]:  # a document is its own nearest neighbour
+            self.assertEqual(index.search(query, 1)[0][0], query.title)
+        results = index.search_batch(self.queries, 5)
+        for query, ranked in zip(self.queries, results):
+            self.assertEqual(len(ranked), 5)
+            self.assertEqual(ranked, sorted(ranked, key=lambda item: -item[1]))
+            for (title, score), (expected_title, expected_score) in zip(ranked, index.search(query, 5)):
+                self.assertAlmostEqual(score, expected_score, places=5)
+        self.assertEqual([score for _, score in index.search(Document("query", ["unknown"]), 2)], [0.0, 0.0])
+
+    def test_rebuilt_after_corpus_change(self):
+        index = LsaIndex(self.corpus, rank=8)
+        self.corpus.add_documents([Document("new", self.corpus[0].words)])
+        self.assertEqual({title for title, _ in index.search(self.corpus[0], 2)}, {"new", self.corpus[0].title})
+        self.assertEqual(index.embeddings.shape, (121, 8))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from vectorspace.vector_space_models import Document, Corpus
+from vectorspace.vector_space_matrix import TfIdfMatrix, np, sparse
+
+
+@unittest.skipIf(np is None or sparse is None, "requires numpy and scipy")
+class TestTfIdfMatrix(unittest.TestCase):
+    def setUp(self):
+        self.new_doc1 = Document(title="doc1", words=["freedom", "liberty", "liberty"])
+        self.new_doc2 = Document(title="doc2", words=["liberty", "yelling", "crawled"])
+        self.new_doc4 = Document(title="doc4", words=["fleeing", "yelling", "crawled"])
+        self.new_doc5 = Document(title="doc5", words=["running", "jumping", "fleeing"])
+        self.corpus1 = Corpus(documents=[self.new_doc1, self.new_doc2, self.new_doc4, self.new_doc5])
+        self.matrix1 = TfIdfMatrix(self.corpus1)
+        self.queries = [Document(words=["liberty"]), Document(words=["yelling", "fleeing", "liberty"]),
+                        Document(words=["unknown"])]
+
+    def test_maps(self):
+        self.assertEqual(self.matrix1.shape, (4, len(self.corpus1.terms)))
+        self.assertEqual(self.matrix1.rows, ["doc1", "doc2", "doc4", "doc5"])
+        self.assertIs(self.matrix1.columns, self.corpus1.terms)
+
+    def test_rows_normalized(self):
+        norms = np.sqrt(np.asarray(self.matrix1.matrix.multiply(self.matrix1.matrix).sum(axis=1))).ravel()
+        for norm in norms:
+            self.assertAlmostEqual(norm, 1.0)
+
+    def test_score(self):
+        scores = self.matrix1.score(self.queries)
+        for query, row in zip(self.queries, scores):
+            query_vector = self.corpus1.compute_tf_idf_vector(query)
+            for doc_id, score in enumerate(row):
+                self.assertAlmostEqual(score, self.corpus1.tf_idf[self.corpus1[doc_id].title].cossim(query_vector))
+
+    def test_search_batch(self):
+        dense = TfIdfMatrix(self.corpus1, dense=True)
+        for query, result, dense_result in zip(self.queries, self.matrix1.search_batch(self.queries, 3),
+                                               dense.search_batch(self.queries, 3)):
+            expected = self.corpus1.search(query, 3)
+            self.assertEqual([title for title, _ in result], [title for title, _ in expected])
+            self.assertEqual([title for title, _ in dense_result], [title for title, _ in expected])
+
+    def test_corpus_changes(self):
+        dense = TfIdfMatrix(self.corpus1, dense=True)
+        self.corpus1.add_documents([Document(title="doc6", words=["escaping", "liberty", "running"])])
+        query = Document(words=["escaping", "running"])
+        for matrix in (self.matrix1, dense):
+            self.assertEqual(matrix.shape, (5, len(self.corpus1.terms)))
+            self.assertEqual([title for title, _ in matrix.search(query, 5)],
+                             [title for title, _ in self.corpus1.search(query, 5)])
+
+        self.corpus1.remove_documents(["doc6", "doc1"])
+        for matrix in (self.matrix1, dense):
+            self.assertEqual(matrix.rows, ["doc2", "doc4", "doc5"])
+            self.assertEqual([title for title, _ in matrix.search(query, 5)],
+                             [title for title, _ in self.corpus1.search(query, 5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import json
+import pickle
+import unittest
+from urllib.request import urlopen
+from vectorspace.vector_space_metrics import MetricsRecorder, NULL_METRICS
+from vectorspace.vector_space_models import Document, Corpus
+
+
+class TestMetricsRecorder(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsRecorder(buckets=(0.1, 1.0))
+        self.docs = [Document("doc1", ["apple", "banana", "apple"]),
+                     Document("doc2", ["banana", "cherry"]),
+                     Document("doc3", ["cherry", "durian", "durian"])]
+
+    def test_phase(self):
+        with self.metrics.phase("build"):
+            pass
+        self.metrics.record("build", 0.5, 0.25)
+        phase = self.metrics.to_dict()["phases"]["build"]
+        self.assertEqual(phase["count"], 2)
+        self.assertGreaterEqual(phase["wall_seconds"], 0.5)
+        self.assertGreaterEqual(phase["cpu_seconds"], 0.25)
+        self.assertEqual(phase["histogram"]["buckets"], [1, 1])
+
+    def test_counters_and_histograms(self):
+        self.metrics.count("queries")
+        self.metrics.count("queries", 2)
+        self.metrics.observe("latency", 0.05)
+        self.metrics.observe("latency", 5.0)
+        snapshot = self.metrics.to_dict()
+        self.assertEqual(snapshot["counters"], {"queries": 3})
+        self.assertEqual(snapshot["histograms"]["latency"]["buckets"], [1, 0])
+        self.assertEqual(snapshot["histograms"]["latency"]["count"], 2)
+        self.assertEqual(json.loads(self.metrics.to_json()), snapshot)
+
+    def test_to_prometheus(self):
+        self.metrics.record("corpus.weights", 0.5)
+        self.metrics.count("query.queries", 4)
+        self.metrics.observe("latency", 0.05)
+        text = self.metrics.to_prometheus()
+        self.assertIn('vectorspace_phase_seconds_bucket{phase="corpus.weights",le="0.1"} 0', text)
+        self.assertIn('vectorspace_phase_seconds_bucket{phase="corpus.weights",le="1.0"} 1', text)
+        self.assertIn('vectorspace_phase_seconds_count{phase="corpus.weights"} 1', text)
+        self.assertIn("vectorspace_query_queries_total 4", text)
+        self.assertIn('vectorspace_latency_bucket{le="+Inf"} 1', text)
+        self.assertIn("vectorspace_latency_count 1", text)
+
+    def test_serve(self):
+        self.metrics.count("query.queries")
+        server = self.metrics.serve(port=0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+            with urlopen(f"{url}/metrics") as response:
+                self.assertIn("vectorspace_query_queries_total 1", response.read().decode())
+            with urlopen(f"{url}/metrics.json") as response:
+                self.assertEqual(json.load(response)["counters"], {"query.queries": 1})
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_null_metrics(self):
+        with NULL_METRICS.phase("build"):
+            NULL_METRICS.count("queries")
+            NULL_METRICS.observe("latency", 1.0)
+        self.assertFalse(NULL_METRICS.enabled)
+        self.assertIs(Corpus(self.docs).metrics, NULL_METRICS)
+
+    def test_corpus_metrics(self):
+        corpus = Corpus(self.docs, metrics=self.metrics)
+        corpus.search(Document("query", ["apple", "cherry"]), 2)
+        corpus.search_batch([Document("query", ["banana"]), Document("query", ["durian"])], 2)
+        snapshot = self.metrics.to_dict()
+        for phase in ["corpus.terms_and_dfs", "corpus.weights", "corpus.impacts",
+                      "query.weights", "query.scoring", "query.ranking"]:
+            self.assertIn(phase, snapshot["phases"])
+        self.assertEqual(snapshot["counters"]["corpus.documents_indexed"], 3)
+        self.assertEqual(snapshot["counters"]["query.queries"], 3)
+        self.assertGreater(snapshot["counters"]["query.postings_touched"], 0)
+
+        loaded = pickle.loads(pickle.dumps(corpus))
+        self.assertIs(loaded.metrics, NULL_METRICS)
+        self.assertEqual(loaded.search(Document("query", ["apple"])), corpus.search(Document("query", ["apple"])))
+
+
+if __name__ == '__main__':
+    unittest.main()
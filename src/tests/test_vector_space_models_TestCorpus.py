@@ -1,6 +1,19 @@
+import copyreg
 from math import log10
+import pickle
+import random
 import unittest
-from vectorspace.vector_space_models import Document, Corpus, Vector
+from vectorspace.vector_space_models import Document, Corpus, LazyStemmer, Preprocessor, Vector
+
+
+class LegacyPickle:
+    """Pickles as an instance of `cls` with the dictionary `state`, like the classes before they had slots."""
+    def __init__(self, cls: type, state: dict):
+        self.cls = cls
+        self.state = state
+
+    def __reduce__(self):
+        return copyreg.__newobj__, (self.cls,), self.state
 
 
 class TestCorpus(unittest.TestCase):
@@ -30,6 +43,13 @@ class TestCorpus(unittest.TestCase):
         self.assertEqual(df1, 2)
         self.assertEqual(df2, 1)
 
+    def test_compute_term_statistics(self):
+        terms, dfs = self.corpus1._compute_term_statistics()
+        self.assertEqual(set(terms), set(dfs))
+        self.assertEqual(sorted(terms.values()), list(range(len(terms))))
+        self.assertEqual(dfs, {"freedom": 1, "liberty": 2, "yelling": 2, "crawled": 2, "fleeing": 2,
+                               "running": 1, "jumping": 1})
+
     # def test_check_membership(self):
     # For some reason I can't access the check_membership function
     #   *Make sure to ask Mike later and fix if needed*
@@ -61,6 +81,217 @@ class TestCorpus(unittest.TestCase):
 
         self.assertCountEqual(test_mat, expected_mat)
 
+    def test_index(self):
+        liberty_postings = self.corpus1.index[self.corpus1.terms["liberty"]]
+        self.assertEqual([doc_id for doc_id, _ in liberty_postings], [0, 1])
+        self.assertAlmostEqual(liberty_postings[0][1], self.corpus1._compute_tf_idf("liberty", self.new_doc1))
+        self.assertAlmostEqual(self.corpus1.norms[0], self.corpus1.tf_idf["doc1"].norm())
+
+    def test_search(self):
+        for words in (["liberty"], ["yelling", "fleeing", "liberty"], ["freedom", "jumping"], ["unknown"]):
+            query = Document(title="query", words=words)
+            query_vector = self.corpus1.compute_tf_idf_vector(query)
+            expected = sorted([(title, vector.cossim(query_vector)) for title, vector in self.corpus1.tf_idf.items()],
+                              key=lambda item: item[1], reverse=True)
+            result = self.corpus1.search(query, k=3)
+            self.assertEqual([title for title, _ in result], [title for title, _ in expected[:3]])
+            for (_, score), (_, expected_score) in zip(result, expected):
+                self.assertAlmostEqual(score, expected_score)
+        self.assertEqual(len(self.corpus1.search(Document(words=["liberty"]), k=10)), 4)
+
+    def test_search_top_k(self):
+        rng = random.Random(128)
+        vocabulary = [f"term{i}" for i in range(30)]
+        docs = [Document(title=f"doc{i}", words=rng.choices(vocabulary, weights=range(30, 0, -1), k=rng.randint(1, 25)))
+                for i in range(60)]
+        docs.append(Document(title="everything", words=vocabulary))
+        corpus = Corpus(docs)
+        for _ in range(50):
+            query_weights = corpus._compute_query_weights(Document(words=rng.sample(vocabulary, rng.randint(1, 6))))
+            expected = corpus._rank(corpus._score_exhaustive(query_weights), len(corpus))
+            for k in (1, 3, 10, 100):
+                self.assertEqual(corpus._search_top_k(query_weights, k), expected[:k])
+
+    def test_search_batch(self):
+        queries = [Document(words=["liberty"]), Document(words=["yelling", "fleeing", "liberty"]),
+                   Document(words=["unknown"]), Document(words=["liberty"]), Document(words=["running", "crawled"])]
+        for block_size in (1, 2, 256):
+            self.assertEqual(self.corpus1.search_batch(queries, 3, block_size),
+                             [self.corpus1.search(query, 3) for query in queries])
+
+    def test_query_cache(self):
+        corpus = Corpus([self.new_doc1, self.new_doc2, self.new_doc4], cache_size=2)
+        expected = corpus.search(Document(words=["liberty", "yelling"]))
+        self.assertEqual((corpus.cache.hits, corpus.cache.misses), (0, 1))
+        self.assertEqual(corpus.search(Document(words=["yelling", "liberty"])), expected)
+        self.assertEqual((corpus.cache.hits, corpus.cache.misses), (1, 1))
+
+        corpus.search(Document(words=["fleeing"]))
+        corpus.search(Document(words=["crawled"]))
+        self.assertEqual(len(corpus.cache), 2)
+        corpus.search(Document(words=["liberty", "yelling"]))
+        self.assertEqual(corpus.cache.misses, 4)
+
+        corpus.add_documents([self.new_doc5])
+        self.assertEqual(corpus.search(Document(words=["liberty", "yelling"])),
+                         Corpus([self.new_doc1, self.new_doc2, self.new_doc4, self.new_doc5]).search(
+                             Document(words=["liberty", "yelling"])))
+        self.assertEqual((corpus.cache.misses, len(corpus.cache)), (5, 1))
+        queries = [Document(words=["liberty", "yelling"]), Document(words=["fleeing"])]
+        self.assertEqual(corpus.search_batch(queries), [corpus.search(query) for query in queries])
+        self.assertIsNone(self.corpus1.cache)
+
+    def assertSameCorpus(self, corpus, expected):
+        def weights(c, title):
+            vector = c.tf_idf[title]
+            return {term: vector[term_id] for term, term_id in c.terms.items() if vector[term_id]}
+
+        self.assertEqual([doc.title for doc in corpus], [doc.title for doc in expected])
+        self.assertEqual(corpus.dfs, expected.dfs)
+        self.assertEqual(set(corpus.terms), set(expected.terms))
+        for doc in expected:
+            self.assertEqual(weights(corpus, doc.title), weights(expected, doc.title))
+        query = Document(words=["liberty", "yelling", "run", "fleeing"])
+        self.assertEqual(corpus.search(query), expected.search(query))
+
+    def test_add_documents(self):
+        corpus = Corpus([self.new_doc1, self.new_doc2])
+        version = corpus.version
+        corpus.add_documents([self.new_doc4, self.new_doc5])
+        self.assertTrue(corpus.stale)
+        self.assertGreater(corpus.version, version)
+        self.assertSameCorpus(corpus, self.corpus1)
+        self.assertFalse(corpus.stale)
+
+    def test_remove_documents(self):
+        corpus = Corpus([self.new_doc1, self.new_doc2, self.new_doc6, self.new_doc4, self.new_doc5])
+        corpus.remove_documents(["doc_test1"])
+        self.assertNotIn("run", corpus.dfs)
+        self.assertSameCorpus(corpus, self.corpus1)
+        with self.assertRaises(ValueError):
+            corpus.remove_documents(["doc_test1"])
+
+    def test_update_document(self):
+        corpus = Corpus([self.new_doc1, self.new_doc2, self.new_doc3, self.new_doc5])
+        corpus.update_document(Document(title="doc3", words=["fleeing", "yelling", "crawled"]))
+        self.assertSameCorpus(corpus, Corpus([self.new_doc1, self.new_doc2,
+                                              Document(title="doc3", words=["fleeing", "yelling", "crawled"]),
+                                              self.new_doc5]))
+        with self.assertRaises(ValueError):
+            corpus.update_document(Document(title="missing"))
+
+    def test_processes(self):
+        documents = [self.new_doc1, self.new_doc2, self.new_doc3, self.new_doc4, self.new_doc5,
+                     self.new_doc6, self.new_doc7, self.new_doc8]
+        for sparse in (False, True):
+            corpus = Corpus(documents, sparse=sparse, processes=2)
+            expected = Corpus(documents, sparse=sparse)
+            self.assertEqual(corpus.terms, expected.terms)
+            self.assertEqual(corpus.dfs, expected.dfs)
+            self.assertEqual(corpus.tf_idf, expected.tf_idf)
+            self.assertEqual(corpus.index, expected.index)
+            self.assertEqual(corpus.norms, expected.norms)
+        with self.assertRaises(TypeError):
+            Corpus([self.new_doc1, Document(title="unhashable", words=[["freedom"]])], processes=2)
+
+    def test_threads(self):
+        documents = [self.new_doc1, self.new_doc2, self.new_doc3, self.new_doc4, self.new_doc5,
+                     self.new_doc6, self.new_doc7, self.new_doc8]
+        for sparse in (False, True):
+            corpus = Corpus(documents, sparse=sparse, threads=3)
+            expected = Corpus(documents, sparse=sparse)
+            self.assertEqual(list(corpus.tf_idf.items()), list(expected.tf_idf.items()))
+            self.assertEqual(corpus.index, expected.index)
+        with self.assertRaises(ZeroDivisionError):
+            Corpus._compute_dict_multithread(2, lambda x: 1 / x, [2, 1, 0, 4])
+
+    def test_compact(self):
+        documents = [Document(doc.title, doc.words) for doc in
+                     (self.new_doc1, self.new_doc2, self.new_doc3, self.new_doc4, self.new_doc5)]
+        corpus = Corpus(documents, compact=True)
+        expected = Corpus([Document(doc.title, doc.words) for doc in documents])
+        self.assertTrue(all([doc.encoded for doc in corpus]))
+        self.assertEqual(corpus.terms, expected.terms)
+        self.assertEqual(dict(corpus.index.items()).keys(), expected.index.keys())
+        for term_id, postings in expected.index.items():
+            self.assertEqual([doc_id for doc_id, _ in corpus.index[term_id]], [doc_id for doc_id, _ in postings])
+            for (_, weight), (_, expected_weight) in zip(corpus.index[term_id], postings):
+                self.assertAlmostEqual(weight, expected_weight, places=6)
+        for query in [Document(words=["liberty"]), Document(words=["yelling", "fleeing", "oil"])] + documents:
+            ranked, expected_ranked = corpus.search(query, 5), expected.search(query, 5)
+            self.assertEqual([title for title, _ in ranked], [title for title, _ in expected_ranked])
+            for (_, score), (_, expected_score) in zip(ranked, expected_ranked):
+                self.assertAlmostEqual(score, expected_score, places=6)
+
+        corpus.remove_documents(["doc1"])
+        corpus.add_documents([Document("doc6", ["liberty", "oil", "freedom"])])
+        expected.remove_documents(["doc1"])
+        expected.add_documents([Document("doc6", ["liberty", "oil", "freedom"])])
+        self.assertEqual(corpus.terms, expected.terms)
+        self.assertEqual([doc.words for doc in corpus], [doc.words for doc in expected])
+        self.assertEqual([title for title, _ in corpus.search(Document(words=["oil"]), 3)],
+                         [title for title, _ in expected.search(Document(words=["oil"]), 3)])
+        self.assertEqual(pickle.loads(pickle.dumps(corpus)).search(Document(words=["oil"])),
+                         corpus.search(Document(words=["oil"])))
+
+    def test_lazy(self):
+        documents = [self.new_doc1, self.new_doc2, self.new_doc3, self.new_doc4, self.new_doc5]
+        expected = Corpus(documents)
+        corpus = Corpus(documents, lazy=True, vector_cache_size=2)
+        self.assertTrue(corpus.lazy and corpus.stale)
+        self.assertEqual(corpus.dfs, expected.dfs)
+        self.assertEqual(corpus.terms, expected.terms)
+        self.assertEqual(corpus.tf_idf["doc2"], expected.tf_idf["doc2"])
+        self.assertTrue(corpus.stale)  # computing a vector does not build the index
+
+        self.assertEqual(corpus.tf_idf, expected.tf_idf)
+        self.assertEqual(list(corpus.tf_idf), list(expected.tf_idf))
+        self.assertEqual(corpus.tf_idf.num_cached, 2)
+        with self.assertRaises(KeyError):
+            _ = corpus.tf_idf["missing"]
+
+        query = Document(words=["liberty", "yelling"])
+        self.assertEqual(corpus.search(query, 3), expected.search(query, 3))
+        self.assertFalse(corpus.stale)
+        self.assertEqual(corpus.index, expected.index)
+
+        corpus.materialize()
+        self.assertEqual(corpus.tf_idf.num_cached, len(documents))
+        corpus.add_documents([Document("doc6", ["liberty", "oil"])])
+        expected.add_documents([Document("doc6", ["liberty", "oil"])])
+        self.assertEqual(corpus.tf_idf.num_cached, 0)
+        self.assertEqual(corpus.tf_idf["doc1"], expected.tf_idf["doc1"])
+        self.assertEqual(pickle.loads(pickle.dumps(corpus)).search(query, 3), expected.search(query, 3))
+        with self.assertRaises(ValueError):
+            Corpus(documents, lazy=True, vector_cache_size=0)
+
+    def test_legacy_pickle(self):
+        corpus = self.corpus1
+        legacy = LegacyPickle(Corpus, {
+            "_docs": [LegacyPickle(Document, {"_iid": doc.iid, "_title": doc.title, "_words": doc.words})
+                      for doc in corpus],
+            "_threads": 1, "_debug": False, "_terms": dict(corpus.terms), "_dfs": dict(corpus.dfs),
+            "_tf_idf": {doc.title: LegacyPickle(Vector, {"_vec": corpus.tf_idf[doc.title].vec}) for doc in corpus}})
+        copy = pickle.loads(pickle.dumps(legacy, protocol=1))  # protocol 1 pickles `__newobj__` as a plain call
+        self.assertEqual(copy[0].counts, self.new_doc1.counts)
+        self.assertEqual(copy.tf_idf["doc2"], corpus.tf_idf["doc2"])
+        self.assertEqual(copy.search(Document(words=["liberty"])), corpus.search(Document(words=["liberty"])))
+        copy.add_documents([self.new_doc3])
+        corpus.add_documents([self.new_doc3])
+        self.assertEqual(copy.search(Document(words=["oil"])), corpus.search(Document(words=["oil"])))
+
+
+    def test_preprocessor(self):
+        corpus = Corpus([self.new_doc1, self.new_doc2, self.new_doc3])
+        self.assertIsNone(corpus.preprocessor)
+        corpus.preprocessor = Preprocessor({"and"}, LazyStemmer("snowball", "english"), stem_table={"and": "and", "oils": "oil"})
+        copy = pickle.loads(pickle.dumps(corpus))
+        self.assertEqual(copy.preprocessor.to_dict(), corpus.preprocessor.to_dict())
+        query = Document(words=["and", "oils"], processors=copy.preprocessor)
+        self.assertEqual(query.words, ["oil"])
+        self.assertEqual(copy.search(query), corpus.search(Document(words=["oil"])))
+        self.assertFalse(copy.preprocessor.stemmer.loaded)
+
 
 if __name__ == '__main__':
     unittest.main()
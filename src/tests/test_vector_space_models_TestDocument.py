@@ -32,6 +32,27 @@ class TestDocument(unittest.TestCase):
         self.assertEquals(self.new_doc3.tf("tea"), 0)
         self.assertNotEquals(self.new_doc3.tf("tea"), 1)
 
+    def test_counts(self):
+        self.assertEqual(self.new_doc3.counts, {"taxes": 2, "british": 1, "gunfire": 1})
+        self.new_doc3.filter_words({"taxes"})
+        self.assertEqual(self.new_doc3.counts, {"british": 1, "gunfire": 1})
+
+    def test_encode(self):
+        vocabulary = ["gunfire", "taxes", "british"]
+        terms = {term: term_id for term_id, term in enumerate(vocabulary)}
+        words = list(self.new_doc3.words)
+        self.new_doc3.encode(terms, vocabulary)
+        self.assertTrue(self.new_doc3.encoded)
+        self.assertEqual(list(self.new_doc3._words), [1, 2, 0, 1])
+        self.assertEqual(self.new_doc3.words, words)
+        self.assertEqual(self.new_doc3, Document(title=self.new_doc3.title, words=words))
+        self.assertEqual(self.new_doc3.counts, {"taxes": 2, "british": 1, "gunfire": 1})
+        self.new_doc3.filter_words({"taxes"})
+        self.assertFalse(self.new_doc3.encoded)
+        self.assertEqual(self.new_doc3.words, ["british", "gunfire"])
+        with self.assertRaises(AttributeError):
+            self.new_doc3.extra = True
+
 
 if __name__ == '__main__':
     unittest.main()
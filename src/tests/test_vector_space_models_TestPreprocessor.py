@@ -0,0 +1,112 @@
+import pickle
+import subprocess
+import sys
+import unittest
+from nltk.stem import PorterStemmer
+from nltk.stem.snowball import SnowballStemmer
+from vectorspace.vector_space_models import Document, LazyStemmer, Preprocessor
+
+
+class TestPreprocessor(unittest.TestCase):
+    def setUp(self):
+        self.stop_words = {"the", "and", "of"}
+        self.preprocessor = Preprocessor(self.stop_words, SnowballStemmer("english"), cache_size=4)
+        self.words1 = ["the", "running", "and", "jumping", "of", "the", "runners", "running"]
+        self.words2 = ["fleeing", "yelling", "crawled", "the"]
+
+    def test_constructor(self):
+        with self.assertRaises(ValueError):
+            Preprocessor(["the"], SnowballStemmer("english"))
+        with self.assertRaises(ValueError):
+            Preprocessor(self.stop_words, "stemmer")
+
+    def test_process(self):
+        self.assertEqual(self.preprocessor.process(self.words1), ["run", "jump", "runner", "run"])
+        self.assertEqual(self.preprocessor.process(self.words2), ["flee", "yell", "crawl"])
+
+    def test_cache(self):
+        preprocessor = Preprocessor(self.stop_words, SnowballStemmer("english"), cache_size=16)
+        preprocessor.process(self.words1)
+        self.assertEqual(preprocessor.cache_info().hits, 2)
+        self.assertEqual(preprocessor.cache_info().currsize, 6)
+        self.preprocessor.process(self.words1)
+        self.assertEqual(self.preprocessor.cache_info().currsize, 4)
+
+    def test_document_processors(self):
+        expected = Document(title="doc", words=self.words1, processors=(self.stop_words, SnowballStemmer("english")))
+        self.assertEqual(Document(title="doc", words=self.words1, processors=self.preprocessor), expected)
+        self.assertEqual(Document(title="doc", words=self.words1,
+                                  processors=Preprocessor(self.stop_words, PorterStemmer())).words,
+                         ["run", "jump", "runner", "run"])
+
+    def test_shared(self):
+        stemmer = SnowballStemmer("english")
+        shared = Preprocessor.shared(self.stop_words, stemmer)
+        self.assertIs(Preprocessor.shared(self.stop_words, stemmer), shared)
+        self.assertIsNot(Preprocessor.shared(self.stop_words, SnowballStemmer("english")), shared)
+        self.assertIsNotNone(shared.cache_info().maxsize)
+
+        Document(words=self.words1, processors=(self.stop_words, stemmer))
+        Document(words=self.words1, processors=(self.stop_words, stemmer))
+        self.assertEqual(shared.cache_info().misses, 6)  # the second document only hits the shared cache
+        for _ in range(Preprocessor.shared_size):
+            Preprocessor.shared(self.stop_words, SnowballStemmer("english"))
+        self.assertLessEqual(len(Preprocessor._shared), Preprocessor.shared_size)
+
+    def test_stem_words_uses_stemmer(self):
+        document = Document(words=["generously"])
+        document.stem_words(PorterStemmer())
+        self.assertEqual(document.words, [PorterStemmer().stem("generously")])
+
+    def test_process_batch(self):
+        expected = [self.preprocessor.process(self.words1), self.preprocessor.process(self.words2)]
+        self.assertEqual(self.preprocessor.process_batch([self.words1, self.words2]), expected)
+        self.assertEqual(self.preprocessor.process_batch([self.words1, self.words2], processes=2), expected)
+
+    def test_pickle(self):
+        copy = pickle.loads(pickle.dumps(self.preprocessor))
+        self.assertEqual(copy.exclude_words, self.stop_words)
+        self.assertEqual(copy.process(self.words2), ["flee", "yell", "crawl"])
+
+
+    def test_stem_table(self):
+        stemmer = LazyStemmer("snowball", "english")
+        preprocessor = Preprocessor(self.stop_words, stemmer, stem_table={"running": "run", "the": "the"})
+        self.assertEqual(preprocessor.process(["the", "running"]), ["run"])
+        self.assertFalse(stemmer.loaded)
+        self.assertEqual(preprocessor.process(["runners"]), ["runner"])
+        self.assertTrue(stemmer.loaded)
+
+        preprocessor.build_stem_table(self.words2)
+        self.assertEqual(preprocessor.stem_table["fleeing"], "flee")
+        self.assertEqual(preprocessor.process(self.words2), self.preprocessor.process(self.words2))
+
+    def test_lazy_stemmer(self):
+        with self.assertRaises(ValueError):
+            LazyStemmer("unknown")
+        stemmer = LazyStemmer("snowball", "english")
+        self.assertEqual(stemmer.stem("running"), SnowballStemmer("english").stem("running"))
+        copy = pickle.loads(pickle.dumps(stemmer))
+        self.assertEqual(copy.config, {"name": "snowball", "language": "english"})
+        self.assertFalse(copy.loaded)
+        self.assertEqual(LazyStemmer("porter").stem("generously"), PorterStemmer().stem("generously"))
+
+    def test_to_dict(self):
+        preprocessor = Preprocessor(self.stop_words, LazyStemmer("porter"), cache_size=8)
+        preprocessor.build_stem_table(self.words1)
+        copy = Preprocessor.from_dict(preprocessor.to_dict())
+        self.assertEqual(copy.to_dict(), preprocessor.to_dict())
+        self.assertEqual(copy.process(self.words1), preprocessor.process(self.words1))
+        self.assertFalse(copy.stemmer.loaded)
+        with self.assertRaises(ValueError):
+            self.preprocessor.to_dict()
+
+    def test_no_nltk_import(self):
+        code = ("import sys, vectorspace.vector_space_runner, vectorspace.vector_space_server; "
+                "print('nltk' in sys.modules)")
+        completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(completed.stdout.strip(), "False")
+
+
+if __name__ == '__main__':
+    unittest.main()
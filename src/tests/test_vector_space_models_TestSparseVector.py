@@ -0,0 +1,72 @@
+import unittest
+from vectorspace.vector_space_models import Document, Corpus, SparseVector, Vector
+
+
+class TestSparseVector(unittest.TestCase):
+    def setUp(self):
+        self.vec1 = SparseVector([0, 1], [3, 2])
+        self.vec2 = SparseVector([2, 0, 1], [3, 1, 2])
+        self.vec3 = SparseVector([1, 4, 8], [1, 6, 10], size=10)
+        self.vec4 = SparseVector()
+        self.dense1 = Vector([1, 2, 3])
+        self.dense2 = Vector([2, 1, 4, 3, 6, 5, 8, 7, 10, 9])
+
+    def test_constructor(self):
+        self.assertEqual(SparseVector([1, 0], [2, 3]), self.vec1)
+        self.assertEqual(SparseVector([0, 1, 2], [3, 2, 0]), SparseVector([0, 1], [3, 2], size=3))
+        self.assertEqual(self.vec3.nnz, 3)
+        self.assertEqual(list(self.vec2.indices), [0, 1, 2])
+        with self.assertRaises(ValueError):
+            SparseVector([1, 1], [2, 3])
+        with self.assertRaises(IndexError):
+            SparseVector([5], [1], size=3)
+
+    def test_getitem(self):
+        self.assertEqual(self.vec3[4], 6)
+        self.assertEqual(self.vec3[5], 0.0)
+        with self.assertRaises(IndexError):
+            self.vec3[10]
+
+    def test_dense_conversion(self):
+        self.assertEqual(self.vec2.to_dense(), self.dense1)
+        self.assertEqual(SparseVector.from_dense(self.dense1), self.vec2)
+
+    def test_euclidean_norm(self):
+        self.assertAlmostEqual(self.vec1.norm(), 3.605551275)
+        self.assertAlmostEqual(self.vec2.norm(), self.dense1.norm())
+        self.assertEqual(self.vec4.norm(), 0.0)
+
+    def test_dot_product(self):
+        self.assertEqual(self.vec1.dot(self.vec2), 7)
+        self.assertEqual(self.vec3.dot(self.dense2), 1 + 36 + 100)
+        self.assertEqual(self.dense2.dot(self.vec3), 1 + 36 + 100)
+        self.assertEqual(self.vec4.dot(self.vec1), 0)
+        with self.assertRaises(ValueError):
+            self.vec1.dot(int)
+
+    def test_cosine_similarity(self):
+        self.assertAlmostEqual(self.vec2.cossim(self.dense2), self.dense1.cossim(self.dense2))
+        self.assertAlmostEqual(self.dense2.cossim(self.vec2), self.dense1.cossim(self.dense2))
+        self.assertEqual(self.vec4.cossim(self.vec1), 0.0)
+        with self.assertRaises(ValueError):
+            self.vec1.cossim(int)
+
+    def test_boolean_intersect(self):
+        self.assertEqual(self.vec1.boolean_intersect(self.vec3), [(2, 1)])
+        self.assertEqual(self.dense2.boolean_intersect(self.vec3), [(1, 1), (6, 6), (10, 10)])
+
+    def test_corpus_sparse_matrix(self):
+        docs = [Document(title="doc1", words=["freedom", "liberty", "liberty"]),
+                Document(title="doc2", words=["liberty", "yelling", "crawled"]),
+                Document(title="doc3", words=["fleeing", "yelling", "crawled"])]
+        dense = Corpus(docs)
+        sparse = Corpus(docs, sparse=True)
+        for title, vector in sparse.tf_idf.items():
+            self.assertIsInstance(vector, SparseVector)
+            self.assertEqual(vector.to_dense(), dense.tf_idf[title])
+        query = Document(words=["liberty", "freedom"])
+        self.assertEqual(sparse.search(query), dense.search(query))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,8 +21,10 @@ class TestVector(unittest.TestCase):
 
     def test_getters_and_setters(self):
         vec = Vector([3, 9])
-        vec.object = [5, 12]
-        self.assertEqual([5, 12], vec.object)
+        vec[1] = 12
+        self.assertEqual([3, 12], vec.vec)
+        with self.assertRaises(AttributeError):  # vectors have __slots__, so no attributes can be added
+            vec.object = [5, 12]
 
     def test_euclidean_norm(self):
         # when two vectors are given, calculate that
@@ -0,0 +1,73 @@
+import unittest
+from vectorspace.vector_space_models import Document, Corpus
+from vectorspace.vector_space_phrases import Phrase, parse_query
+
+
+class TestPhrase(unittest.TestCase):
+    def setUp(self):
+        self.documents = [
+            Document("d0", "the civil war ended and the war was over".split()),
+            Document("d1", "war is civil when civil people fight".split()),
+            Document("d2", "a civil and costly war".split()),
+            Document("d3", "peace and war".split()),
+            Document("d4", []),
+        ]
+        self.corpus = Corpus(self.documents, positions=True)
+
+    def expected(self, query: str, titles: list[str]) -> list[tuple[str, float]]:
+        return [(title, score) for title, score in self.corpus.search(Document("query", query.split()), 10)
+                if title in titles]
+
+    def test_matches(self):
+        self.assertTrue(Phrase(["civil", "war"]).matches({"civil": [1, 5], "war": [2, 7]}))
+        self.assertFalse(Phrase(["civil", "war"]).matches({"civil": [3], "war": [2, 7]}))
+        self.assertTrue(Phrase(["civil", "war"], 1).matches({"civil": [3], "war": [2, 7]}))
+        self.assertTrue(Phrase(["a", "b", "c"], 4).matches({"a": [0, 10], "b": [5, 12], "c": [14]}))
+        self.assertFalse(Phrase(["a", "b", "c"], 3).matches({"a": [0, 10], "b": [5, 12], "c": [14]}))
+        with self.assertRaises(ValueError):
+            Phrase([])
+        with self.assertRaises(ValueError):
+            Phrase(["a"], -1)
+
+    def test_parse_query(self):
+        query, phrases = parse_query('peace "civil war"~3 over "the war"')
+        self.assertEqual(query.words, ["peace", "civil", "war", "over", "the", "war"])
+        self.assertEqual(phrases, [Phrase(["civil", "war"], 3), Phrase(["the", "war"])])
+        query, phrases = parse_query('unterminated "civil war')
+        self.assertEqual(query.words, ["unterminated", "civil", "war"])
+        self.assertEqual(phrases, [])
+        self.assertEqual(parse_query('""')[1], [])
+
+    def test_search_phrases(self):
+        query, phrases = parse_query('"civil war"')
+        self.assertEqual(self.corpus.search_phrases(query, phrases), self.expected("civil war", ["d0"]))
+        query, phrases = parse_query('"civil war"~3')
+        self.assertEqual(self.corpus.search_phrases(query, phrases), self.expected("civil war", ["d0", "d1", "d2"]))
+        query, phrases = parse_query('"civil war"~3 "and war"~2')
+        self.assertEqual(self.corpus.search_phrases(query, phrases), self.expected("civil war and war", ["d0", "d2"]))
+        query, phrases = parse_query('"war civil"')
+        self.assertEqual(self.corpus.search_phrases(query, phrases), [])
+        query, phrases = parse_query('"civil unrest"')
+        self.assertEqual(self.corpus.search_phrases(query, phrases), [])
+        self.assertEqual(self.corpus.search_phrases(Document("query", ["war"]), []),
+                         self.corpus.search(Document("query", ["war"])))
+
+    def test_refresh(self):
+        query, phrases = parse_query('"civil war"')
+        compact = Corpus(self.documents, compact=True, positions=True)
+        [(title, score)] = compact.search_phrases(query, phrases)  # compact weights are float32
+        [(expected_title, expected_score)] = self.expected("civil war", ["d0"])
+        self.assertEqual(title, expected_title)
+        self.assertAlmostEqual(score, expected_score, places=6)
+        self.corpus.add_documents([Document("d5", "civil war".split())])
+        self.assertEqual([title for title, _ in self.corpus.search_phrases(query, phrases)], ["d5", "d0"])
+
+    def test_without_positions(self):
+        corpus = Corpus(self.documents)
+        self.assertIsNone(corpus.positions)
+        with self.assertRaises(ValueError):
+            corpus.search_phrases(*parse_query('"civil war"'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import contextlib
+import io
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import unittest
+from benchmarks.synthetic import ZipfianCorpus
+from vectorspace.vector_space_models import Document, Corpus, LazyStemmer, Preprocessor
+from vectorspace.vector_space_runner import run_bulk_queries
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestRunner(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        synthetic = ZipfianCorpus(num_docs=40, doc_length=30, vocabulary_size=300, seed=3)
+        documents = synthetic.documents()
+        preprocessor = Preprocessor(set(synthetic.vocabulary[:5]), LazyStemmer("snowball", "english"))
+        preprocessor.build_stem_table({word for _, words in documents for word in words})
+        self.corpus = Corpus([Document(title, preprocessor.process(words)) for title, words in documents])
+        self.corpus.preprocessor = preprocessor
+        self.pickle_path = os.path.join(self.directory.name, "corpus.pkl")
+        with open(self.pickle_path, "wb") as pickle_file:
+            pickle.dump(self.corpus, pickle_file)
+        self.queries = [" ".join(words) for words in synthetic.queries(5, 1, 4)]
+        self.queries_path = os.path.join(self.directory.name, "queries.txt")
+        with open(self.queries_path, "w") as queries_file:
+            queries_file.write("\n".join(self.queries) + "\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_runner(self, *arguments: str) -> subprocess.CompletedProcess:
+        python_path = os.pathsep.join([PACKAGE_DIR, *filter(None, [os.environ.get("PYTHONPATH")])])
+        return subprocess.run([sys.executable, "-m", "vectorspace.vector_space_runner", "1", self.pickle_path,
+                               *arguments], capture_output=True, text=True, check=True,
+                              env=dict(os.environ, PYTHONPATH=python_path))
+
+    def test_bulk_queries_to_stdout_are_jsonl(self):
+        for arguments in (["-q", self.queries_path], ["-q", self.queries_path, "-d", "-k", "3"]):
+            with self.subTest(arguments=arguments):
+                completed = self.run_runner(*arguments)
+                lines = completed.stdout.splitlines()
+                self.assertEqual([json.loads(line)["query"] for line in lines], self.queries)
+                self.assertIn("Elapsed time for corpus load from pickle", completed.stderr)
+
+    def test_bulk_queries_to_stdout_are_jsonl_in_process(self):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            run_bulk_queries(self.corpus, self.corpus.preprocessor, self.queries_path, "-", 2)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual([json.loads(line)["query"] for line in lines], self.queries)
+        self.assertIn(f"Elapsed time for {len(self.queries)} queries", stderr.getvalue())
+
+    def test_bulk_anytime_queries_record_exactness(self):
+        unlimited = self.run_runner("-q", self.queries_path, "--time-budget", "60000").stdout.splitlines()
+        self.assertEqual([json.loads(line)["exact"] for line in unlimited], [True] * len(self.queries))
+        # queries matching no document have no postings to skip, so only the others are cut short
+        exhausted = self.run_runner("-q", self.queries_path, "--postings-budget", "0").stdout.splitlines()
+        self.assertEqual([json.loads(line)["exact"] for line in exhausted],
+                         [all([result["score"] <= 0 for result in json.loads(line)["results"]])
+                          for line in unlimited])
+        self.assertNotIn("exact", json.loads(self.run_runner("-q", self.queries_path).stdout.splitlines()[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import json
+import asyncio
+import unittest
+from nltk.stem.snowball import SnowballStemmer
+from vectorspace.vector_space_models import Document, Corpus, Preprocessor
+from vectorspace.vector_space_server import QueryServer
+
+
+class TestQueryServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.processors = Preprocessor({"the", "and"}, SnowballStemmer("english"))
+        self.corpus = Corpus([Document("doc1", "the apples and bananas".split(), processors=self.processors),
+                              Document("doc2", "bananas and cherries".split(), processors=self.processors),
+                              Document("doc3", "cherries and durians".split(), processors=self.processors)])
+        self.server = QueryServer(self.corpus, self.processors, workers=2, batch_window=0.01)
+        await self.server.start(port=0)
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def request(self, method: str, path: str, payload: dict | None = None,
+                      content_length: str | None = None) -> tuple[int, dict]:
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+        body = json.dumps(payload).encode() if payload is not None else b""
+        content_length = str(len(body)) if content_length is None else content_length
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                     f"Content-Length: {content_length}\r\n\r\n".encode() + body)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+        head, _, body = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(body)
+
+    def expected(self, raw_query: str, k: int) -> list[dict]:
+        results = self.corpus.search(Document("query", raw_query.split(), processors=self.processors), k)
+        return [{"title": title, "score": score} for title, score in results]
+
+    async def test_search(self):
+        status, response = await self.request("POST", "/search", {"query": "the bananas", "k": 1})
+        self.assertEqual(status, 200)
+        self.assertEqual(response["results"], self.expected("the bananas", 1))
+
+        status, response = await self.request("POST", "/search", {"queries": ["apples", "cherries durians"]})
+        self.assertEqual(status, 200)
+        self.assertEqual(response["results"], [self.expected("apples", 10), self.expected("cherries durians", 10)])
+
+    async def test_concurrent_requests_are_batched(self):
+        queries = ["apples", "bananas", "cherries", "durians"] * 4
+        responses = await asyncio.gather(*[self.request("POST", "/search", {"query": query, "k": 1 + i % 2})
+                                           for i, query in enumerate(queries)])
+        for i, (query, (status, response)) in enumerate(zip(queries, responses)):
+            self.assertEqual(status, 200)
+            self.assertEqual(response["results"], self.expected(query, 1 + i % 2))
+        stats = self.server.stats()
+        self.assertEqual(stats["queries"], len(queries))
+        self.assertLess(stats["batches"], len(queries))
+
+    async def test_health_and_stats(self):
+        self.corpus.metrics = self.server.metrics  # as `main` shares them
+        status, response = await self.request("GET", "/health")
+        self.assertEqual((status, response["status"], response["documents"]), (200, "ok", 3))
+        await self.request("POST", "/search", {"query": "apples"})
+        status, response = await self.request("GET", "/stats")
+        self.assertEqual(status, 200)
+        self.assertEqual(response["queries"], 1)
+        self.assertEqual(response["requests"], 3)
+        self.assertIn("query.scoring", response["metrics"]["phases"])
+
+    async def test_errors(self):
+        self.assertEqual((await self.request("GET", "/search"))[0], 405)
+        self.assertEqual((await self.request("GET", "/unknown"))[0], 404)
+        self.assertEqual((await self.request("POST", "/search", {"query": "apples", "k": 0}))[0], 400)
+        self.assertEqual((await self.request("POST", "/search", {"words": "apples"}))[0], 400)
+        self.assertEqual(self.server.stats()["errors"], 4)
+
+    async def test_invalid_content_length(self):
+        for content_length in ("-1", "ten"):
+            with self.subTest(content_length=content_length):
+                status, payload = await self.request("POST", "/search", {"query": "apples"}, content_length)
+                self.assertEqual(status, 400)
+                self.assertIn("Content-Length", payload["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
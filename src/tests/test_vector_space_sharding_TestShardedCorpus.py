@@ -0,0 +1,50 @@
+import random
+import unittest
+from vectorspace.vector_space_models import Document, Corpus
+from vectorspace.vector_space_sharding import ShardedCorpus
+
+
+class TestShardedCorpus(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(16)
+        self.vocabulary = [f"term{i}" for i in range(40)]
+        self.docs = [Document(title=f"doc{i}", words=rng.choices(self.vocabulary, weights=range(40, 0, -1),
+                                                                 k=rng.randint(1, 30)))
+                     for i in range(90)]
+        self.docs.append(Document(title="everything", words=self.vocabulary))
+        self.corpus = Corpus(self.docs)
+        self.queries = [Document(words=rng.sample(self.vocabulary, rng.randint(1, 6))) for _ in range(40)]
+        self.queries.append(Document(words=["unknown"]))
+
+    def assertMatchesCorpus(self, sharded: ShardedCorpus):
+        for k in (1, 5, 20, 200):
+            self.assertEqual([sharded.search(query, k) for query in self.queries],
+                             [self.corpus.search(query, k) for query in self.queries])
+            self.assertEqual(sharded.search_batch(self.queries, k), self.corpus.search_batch(self.queries, k))
+
+    def test_statistics(self):
+        sharded = ShardedCorpus(self.docs, num_shards=4)
+        self.assertEqual(len(sharded), len(self.corpus))
+        self.assertEqual(sharded.num_shards, 4)
+        self.assertEqual(sharded.terms, self.corpus.terms)
+        self.assertEqual(sharded.dfs, self.corpus.dfs)
+        for doc in self.docs[:10]:
+            self.assertEqual(sharded.compute_tf_idf_vector(doc, sparse=False), self.corpus.compute_tf_idf_vector(doc))
+
+    def test_search_matches_corpus(self):
+        for num_shards in (1, 3, 7, 200):
+            self.assertMatchesCorpus(ShardedCorpus(self.docs, num_shards=num_shards))
+
+    def test_search_processes(self):
+        with ShardedCorpus(self.docs, num_shards=3, processes=True) as sharded:
+            self.assertEqual(sharded.num_shards, 3)
+            self.assertEqual(sharded.shards, [])
+            self.assertMatchesCorpus(sharded)
+
+    def test_invalid_shards(self):
+        with self.assertRaises(ValueError):
+            ShardedCorpus(self.docs, num_shards=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
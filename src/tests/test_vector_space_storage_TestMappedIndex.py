@@ -0,0 +1,90 @@
+import os
+import random
+import tempfile
+import unittest
+from vectorspace.vector_space_models import Document, Corpus, LazyStemmer, Preprocessor
+from vectorspace.vector_space_storage import MappedIndex, build_index
+
+
+class TestMappedIndex(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(8)
+        vocabulary = [f"term{i}" for i in range(20)] + ["liberté", "ünïcode"]
+        self.corpus = Corpus([Document(title=f"doc{i}", words=rng.choices(vocabulary, k=rng.randint(1, 15)))
+                              for i in range(40)])
+        self.queries = [Document(words=rng.sample(vocabulary, rng.randint(1, 4))) for _ in range(20)]
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "corpus.vsi")
+        self.corpus.save_index(self.path)
+        self.index = Corpus.open_index(self.path)
+
+    def tearDown(self):
+        self.index.close()
+        self.directory.cleanup()
+
+    def test_header(self):
+        self.assertEqual(len(self.index), len(self.corpus))
+        self.assertEqual(self.index.num_terms, len(self.corpus.terms))
+        self.assertEqual(self.index.num_postings, sum([len(postings) for postings in self.corpus.index.values()]))
+
+    def test_dictionaries(self):
+        for term, df in self.corpus.dfs.items():
+            self.assertEqual(self.index.term(self.index.term_id(term)), term)
+            self.assertEqual(self.index.df(term), df)
+        self.assertIsNone(self.index.term_id("missing"))
+        self.assertEqual(self.index.df("missing"), 0)
+        self.assertEqual([self.index.title(doc_id) for doc_id in range(len(self.index))],
+                         [doc.title for doc in self.corpus])
+        with self.assertRaises(IndexError):
+            self.index.title(len(self.corpus))
+
+    def test_search(self):
+        for query in self.queries:
+            for k in (1, 5, 50):
+                self.assertEqual(self.index.search(query, k), self.corpus.search(query, k))
+
+    def test_search_batch(self):
+        self.assertEqual(self.index.search_batch(self.queries, 5, block_size=7),
+                         [self.corpus.search(query, 5) for query in self.queries])
+
+    def test_build_index(self):
+        path = os.path.join(self.directory.name, "streamed.vsi")
+        documents = ((doc.title, iter(doc.words)) for doc in self.corpus)
+        self.assertGreater(build_index(documents, path, memory_budget=2048, temp_dir=self.directory.name), 1)
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["corpus.vsi", "streamed.vsi"])
+        with MappedIndex(path) as streamed:
+            self.assertEqual(streamed.num_postings, self.index.num_postings)
+            for term, df in self.corpus.dfs.items():
+                self.assertEqual(streamed.df(term), df)
+            for query in self.queries:
+                result, expected = streamed.search(query, 10), self.corpus.search(query, 10)
+                self.assertEqual([title for title, _ in result], [title for title, _ in expected])
+                for (_, score), (_, expected_score) in zip(result, expected):
+                    self.assertAlmostEqual(score, expected_score)
+
+    def test_preprocessor(self):
+        self.assertIsNone(self.index.preprocessor)
+        preprocessor = Preprocessor({"the"}, LazyStemmer("porter"), stem_table={"the": "the", "running": "run"})
+        self.corpus.preprocessor = preprocessor
+        path = os.path.join(self.directory.name, "preprocessor.vsi")
+        self.corpus.save_index(path)
+        with MappedIndex(path) as index:
+            self.assertEqual(index.preprocessor.to_dict(), preprocessor.to_dict())
+            self.assertEqual(index.preprocessor.process(["the", "running"]), ["run"])
+            self.assertFalse(index.preprocessor.stemmer.loaded)
+
+        path = os.path.join(self.directory.name, "streamed.vsi")
+        build_index(((doc.title, doc.words) for doc in self.corpus), path, preprocessor=preprocessor)
+        with MappedIndex(path) as streamed:
+            self.assertEqual(streamed.preprocessor.to_dict(), preprocessor.to_dict())
+
+    def test_invalid_file(self):
+        path = os.path.join(self.directory.name, "invalid.vsi")
+        with open(path, "wb") as invalid_file:
+            invalid_file.write(b"not an index file at all, just some bytes")
+        with self.assertRaises(ValueError):
+            MappedIndex(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
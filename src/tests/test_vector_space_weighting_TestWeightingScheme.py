@@ -0,0 +1,173 @@
+import math
+import os
+import pickle
+import tempfile
+import unittest
+from benchmarks.synthetic import ZipfianCorpus
+from vectorspace.vector_space_models import Document, Corpus
+from vectorspace.vector_space_sharding import ShardedCorpus
+from vectorspace.vector_space_storage import write_index, build_index, MappedIndex
+from vectorspace.vector_space_weighting import CorpusStatistics, WeightingScheme, TfIdf, BM25, PivotedNormalization
+
+
+class TestWeightingScheme(unittest.TestCase):
+    def setUp(self):
+        self.synthetic = ZipfianCorpus(num_docs=120, doc_length=30, vocabulary_size=400, seed=5, num_topics=4)
+        self.corpus = Corpus([Document(title, words) for title, words in self.synthetic.documents()], sparse=True)
+        self.queries = [Document("query", words) for words in self.synthetic.queries(15, 1, 5)]
+
+    def brute_force(self, query_doc: Document, score, k: int = 10) -> list[tuple[str, float]]:
+        """Ranks the documents scoring above zero by `score(query terms, document)`, like `Corpus.search` ranks them
+        when the weights are not cosine normalized."""
+        scores = [(doc.title, score(query_doc, doc)) for doc in self.corpus]
+        return sorted([item for item in scores if item[1] > 0], key=lambda item: -item[1])[:k]
+
+    def assertRankingEqual(self, results, expected, norm: float = 1.0, places: int = 9):
+        results, expected = [[item for item in ranking if item[1] > 0] for ranking in (results, expected)]
+        self.assertEqual([title for title, _ in results], [title for title, _ in expected])
+        for (_, score), (_, expected_score) in zip(results, expected):
+            self.assertAlmostEqual(score * norm, expected_score, places=places)
+
+    def test_statistics(self):
+        docs = [Document("a", ["x", "y", "x"]), Document("b", []), Document("c", ["y", "z"])]
+        statistics = Corpus(docs).statistics
+        self.assertEqual((statistics.num_docs, statistics.num_terms, statistics.avg_doc_length), (3, 3, 5 / 3))
+        self.assertEqual(list(statistics.doc_offsets), [0, 2, 2, 4])
+        self.assertEqual(list(statistics.term_ids), [0, 1, 1, 2])
+        self.assertEqual(list(statistics.tfs), [2, 1, 1, 1])
+        self.assertEqual(list(statistics.doc_lengths), [3, 0, 2])
+        self.assertEqual(list(statistics.dfs), [1, 2, 1])
+        self.assertEqual(list(pickle.loads(pickle.dumps(statistics)).tfs), [2, 1, 1, 1])
+        self.assertIsInstance(statistics, CorpusStatistics)
+
+    def test_tf_idf(self):
+        statistics = self.corpus.statistics
+        weights = TfIdf().document_weights(statistics)
+        vocabulary = list(self.corpus.terms)
+        for position, (term_id, tf) in enumerate(zip(statistics.term_ids, statistics.tfs)):
+            df = self.corpus.dfs[vocabulary[term_id]]
+            self.assertEqual(weights[position], math.log10(1 + tf) * math.log10(len(self.corpus) / (1 + df)))
+        self.assertEqual(Corpus([Document("a", ["x"])]).index, {})
+        self.assertEqual(TfIdf(), TfIdf())
+        self.assertEqual(repr(BM25(k1=1.5)), "BM25(b=0.75, k1=1.5)")
+
+    def test_bm25(self):
+        k1, b = 1.5, 0.6
+        num_docs = len(self.corpus)
+        avg_doc_length = sum([len(doc.words) for doc in self.corpus]) / num_docs
+
+        def score(query_doc, doc):
+            total = 0.0
+            for term, query_tf in query_doc.counts.items():
+                tf, df = doc.tf(term), self.corpus.dfs.get(term, 0)
+                if tf:
+                    idf = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+                    total += query_tf * idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc.words) / avg_doc_length))
+            return total
+
+        self.corpus.weighting = BM25(k1, b)
+        for query in self.queries:
+            query_norm = math.sqrt(sum([tf ** 2 for term, tf in query.counts.items() if term in self.corpus.terms]))
+            self.assertRankingEqual(self.corpus.search(query), self.brute_force(query, score), query_norm)
+        with self.assertRaises(ValueError):
+            BM25(b=2)
+
+    def test_pivoted(self):
+        slope = 0.3
+        num_docs = len(self.corpus)
+        avg_doc_length = sum([len(doc.words) for doc in self.corpus]) / num_docs
+
+        def score(query_doc, doc):
+            total = 0.0
+            for term, query_tf in query_doc.counts.items():
+                tf = doc.tf(term)
+                if tf:
+                    total += (query_tf * (1 + math.log(1 + math.log(tf))) / (1 - slope + slope * len(doc.words)
+                                                                            / avg_doc_length)
+                              * math.log((num_docs + 1) / self.corpus.dfs[term]))
+            return total
+
+        self.corpus.weighting = PivotedNormalization(slope)
+        for query in self.queries:
+            query_norm = math.sqrt(sum([tf ** 2 for term, tf in query.counts.items() if term in self.corpus.terms]))
+            self.assertRankingEqual(self.corpus.search(query), self.brute_force(query, score), query_norm)
+
+    def test_switching(self):
+        tf_idf_results = [self.corpus.search(query) for query in self.queries]
+        index, version = self.corpus.index, self.corpus.version
+        self.corpus.weighting = BM25()
+        self.assertEqual(self.corpus.version, version + 1)
+        self.assertTrue(self.corpus.stale)
+        self.assertNotEqual([self.corpus.search(query) for query in self.queries], tf_idf_results)
+        self.assertTrue(all(norm in (0.0, 1.0) for norm in self.corpus.norms))
+
+        self.corpus.weighting = TfIdf()  # the weights of TF-IDF are cached
+        self.assertIs(self.corpus.index, index)
+        self.assertEqual([self.corpus.search(query) for query in self.queries], tf_idf_results)
+
+        self.corpus.add_documents([Document("new", self.queries[0].words)])
+        self.assertIsNot(self.corpus.index, index)
+        self.assertEqual(self.corpus.search(self.queries[0], 1)[0][0], "new")
+
+    def test_construction_modes(self):
+        documents = self.synthetic.documents()
+        expected = Corpus([Document(title, words) for title, words in documents], sparse=True, weighting=BM25())
+        for options in ({"processes": 2}, {"lazy": True}, {"compact": True}, {"threads": 2}):
+            with self.subTest(**options):
+                corpus = Corpus([Document(title, words) for title, words in documents], sparse=True,
+                                weighting=BM25(), **options)
+                places = 6 if options.get("compact") else 9  # compact weights are float32
+                for query in self.queries:
+                    self.assertRankingEqual(corpus.search(query), expected.search(query), places=places)
+                self.assertEqual(corpus.tf_idf[documents[0][0]], expected.tf_idf[documents[0][0]])
+
+    def test_lazy_statistics(self):
+        documents = self.synthetic.documents()
+        for weighting in (TfIdf(), BM25()):
+            with self.subTest(weighting=weighting):
+                expected = Corpus([Document(title, words) for title, words in documents], sparse=True,
+                                  weighting=weighting)
+                corpus = Corpus([Document(title, words) for title, words in documents], sparse=True, lazy=True,
+                                weighting=weighting)
+                self.assertEqual(corpus.tf_idf[documents[0][0]], expected.tf_idf[documents[0][0]])
+                self.assertIsNone(corpus._statistics)  # vectors only need the document count and average length
+
+    def test_persistence(self):
+        self.corpus.weighting = BM25(k1=2.0)
+        restored = pickle.loads(pickle.dumps(self.corpus))
+        self.assertEqual(restored.weighting, BM25(k1=2.0))
+        self.assertEqual(restored.search(self.queries[0]), self.corpus.search(self.queries[0]))
+        self.assertEqual(WeightingScheme.from_dict(BM25(k1=2.0).to_dict()), BM25(k1=2.0))
+        with self.assertRaises(ValueError):
+            WeightingScheme.from_dict({"scheme": "unknown", "parameters": {}})
+
+    def test_binary_index(self):
+        documents = self.synthetic.documents()
+        with tempfile.TemporaryDirectory() as directory:
+            for weighting in (TfIdf(), BM25(k1=2.0), PivotedNormalization()):
+                with self.subTest(weighting=weighting):
+                    self.corpus.weighting = weighting
+                    written, built = os.path.join(directory, "written.idx"), os.path.join(directory, "built.idx")
+                    write_index(self.corpus, written)
+                    build_index(documents, built, memory_budget=4096, weighting=weighting)
+                    with MappedIndex(written) as written_index, MappedIndex(built) as built_index:
+                        self.assertEqual(written_index.weighting, weighting)
+                        self.assertEqual(built_index.weighting, weighting)
+                        for query in self.queries:
+                            expected = self.corpus.search(query)
+                            self.assertRankingEqual(written_index.search(query), expected)
+                            self.assertRankingEqual(built_index.search(query), expected)
+
+    def test_sharded_corpus(self):
+        documents = [Document(title, words) for title, words in self.synthetic.documents()]
+        for weighting in (BM25(), PivotedNormalization(slope=0.3)):
+            with self.subTest(weighting=weighting):
+                self.corpus.weighting = weighting
+                sharded = ShardedCorpus(documents, num_shards=3, weighting=weighting)
+                for query in self.queries:
+                    self.assertRankingEqual(sharded.search(query), self.corpus.search(query))
+                self.assertEqual(sharded.compute_tf_idf_vector(documents[0]), self.corpus.tf_idf[documents[0].title])
+
+
+if __name__ == '__main__':
+    unittest.main()
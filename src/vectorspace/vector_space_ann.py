@@ -0,0 +1,240 @@
+"""Approximate nearest neighbour search for the vector space model with an inverted file (IVF) index. The unit length
+   TF-IDF vectors of a corpus are clustered with spherical k-means, and a query only scores the documents of the
+   `num_probes` clusters whose centroids are most similar to it, trading recall for latency. Probing more clusters
+   raises recall, and probing every cluster gives the exact ranking.
+"""
+import math
+import heapq
+import random
+import time
+
+from math import sqrt
+from typing import Iterable
+from vectorspace.vector_space_models import Document, Corpus, SparseVector
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+
+class ApproximateIndex:
+    """This class is an IVF index over the documents of `corpus`, with `num_lists` clusters (by default the square root
+       of the number of documents) trained with `iterations` rounds of spherical k-means from `seed`. Each centroid
+       keeps its `centroid_terms` heaviest terms, which bounds the cost of comparing a document or query to it.
+
+       Every cluster stores an inverted index of the TF-IDF weights of its documents, so the score of a candidate is
+       its exact cosine similarity, and results are ranked like `Corpus.search`; documents outside the probed
+       clusters are missed, and only documents scoring above zero are returned. The index is rebuilt the next time
+       it is searched after the documents of the corpus change."""
+
+    def __init__(self, corpus: Corpus, num_lists: int | None = None, num_probes: int = 4, iterations: int = 5,
+                 centroid_terms: int = 128, seed: int = 0):
+        if (num_lists is not None and num_lists < 1) or num_probes < 1 or centroid_terms < 1:
+            raise ValueError(f"Invalid num_lists, num_probes or centroid_terms: {num_lists}, {num_probes}, "
+                             f"{centroid_terms}")
+        self._corpus = corpus
+        self._requested_lists = num_lists
+        self._num_probes = num_probes
+        self._iterations = iterations
+        self._centroid_terms = centroid_terms
+        self._seed = seed
+        self._build()
+
+    def __len__(self):
+        return len(self._corpus)
+
+    @property
+    def num_lists(self) -> int:
+        return len(self._lists)
+
+    @property
+    def num_probes(self):
+        return self._num_probes
+
+    @num_probes.setter
+    def num_probes(self, num_probes: int) -> None:
+        if num_probes < 1:
+            raise ValueError(f"Invalid num_probes: {num_probes}")
+        self._num_probes = num_probes
+
+    @property
+    def list_sizes(self) -> list[int]:
+        """The number of documents assigned to each cluster."""
+        return [len(members) for members in self._members]
+
+    def search(self, query_doc: Document, k: int = 10, num_probes: int | None = None) -> list[tuple[str, float]]:
+        """Returns up to `k` of the best (document title, cosine similarity) pairs for `query_doc`, best first, among
+        the documents of the `num_probes` (by default `self.num_probes`) clusters closest to the query. An explicit
+        `num_probes` must be between 1 and `num_lists`."""
+        self._validate()
+        if num_probes is None:
+            num_probes = self._num_probes
+        elif not 1 <= num_probes <= self.num_lists:
+            raise ValueError(f"Invalid num_probes: {num_probes}, expected 1 to {self.num_lists}")
+        query_weights = self._corpus._compute_query_weights(query_doc)
+        query_norm = sqrt(math.fsum([weight ** 2 for weight in query_weights.values()]))
+        if not query_weights or not query_norm:
+            return []
+
+        probes = self._closest_lists(query_weights, num_probes)
+        contributions = {}
+        for list_id in probes:
+            list_index = self._lists[list_id]
+            for term_id, query_weight in query_weights.items():
+                for doc_id, weight in list_index.get(term_id, ()):
+                    contributions.setdefault(doc_id, []).append(query_weight * weight)
+
+        norms = self._corpus.norms
+        scores = []
+        for doc_id, products in contributions.items():
+            denominator = query_norm * norms[doc_id]
+            score = math.fsum(products) / denominator if denominator else 0.0
+            if score > 0:
+                scores.append((doc_id, score))
+        ranked = heapq.nsmallest(k, scores, key=lambda item: (-item[1], item[0]))
+        return [(self._corpus._title(doc_id), score) for doc_id, score in ranked]
+
+    def search_batch(self, query_docs: Iterable[Document], k: int = 10,
+                     num_probes: int | None = None) -> list[list[tuple[str, float]]]:
+        """Returns the results of `search` for each of `query_docs`."""
+        return [self.search(query_doc, k, num_probes) for query_doc in query_docs]
+
+    def _validate(self) -> None:
+        """Rebuilds the index if the documents of the corpus changed since it was built."""
+        if self._version != self._corpus.version:
+            self._build()
+
+    def _build(self) -> None:
+        """Clusters the unit length document vectors and builds the per-cluster inverted indexes."""
+        self._version = self._corpus.version
+        index, norms = self._corpus.index, self._corpus.norms
+        vectors = [{} for _ in range(len(self._corpus))]  # {term id: unit length weight} of each document
+        for term_id, postings in index.items():
+            for doc_id, weight in postings:
+                vectors[doc_id][term_id] = weight / norms[doc_id]
+
+        num_lists = self._requested_lists or max(1, round(sqrt(len(vectors))))
+        candidates = [doc_id for doc_id, vector in enumerate(vectors) if vector]
+        rng = random.Random(self._seed)
+        centroids = [self._truncate(dict(vectors[doc_id]))
+                     for doc_id in rng.sample(candidates, min(num_lists, len(candidates)))] or [{}]
+
+        assignments = self._assign(vectors, centroids)
+        for _ in range(self._iterations):
+            centroids = self._update_centroids(vectors, assignments, centroids)
+            updated = self._assign(vectors, centroids)
+            if updated == assignments:
+                break
+            assignments = updated
+
+        self._centroids = self._invert(centroids)
+        self._members = [[] for _ in centroids]
+        self._lists = [{} for _ in centroids]
+        for term_id, postings in index.items():
+            for doc_id, weight in postings:
+                self._lists[assignments[doc_id]].setdefault(term_id, []).append((doc_id, weight))
+        for doc_id, list_id in enumerate(assignments):
+            self._members[list_id].append(doc_id)
+
+    def _assign(self, vectors: list[dict[int, float]], centroids: list[dict[int, float]]) -> list[int]:
+        """Returns the id of the most similar centroid of each vector. Vectors similar to no centroid are spread over
+        the clusters round robin."""
+        inverted = self._invert(centroids)
+        assignments = []
+        for doc_id, vector in enumerate(vectors):
+            similarities = self._similarities(vector, inverted)
+            if similarities:
+                assignments.append(min(similarities.items(), key=lambda item: (-item[1], item[0]))[0])
+            else:
+                assignments.append(doc_id % len(centroids))
+        return assignments
+
+    def _update_centroids(self, vectors: list[dict[int, float]], assignments: list[int],
+                          centroids: list[dict[int, float]]) -> list[dict[int, float]]:
+        """Returns the normalized, truncated mean of the vectors assigned to each cluster. A cluster left without
+        vectors keeps its centroid."""
+        sums = [{} for _ in centroids]
+        for vector, list_id in zip(vectors, assignments):
+            centroid_sum = sums[list_id]
+            for term_id, weight in vector.items():
+                centroid_sum[term_id] = centroid_sum.get(term_id, 0.0) + weight
+        return [self._truncate(centroid_sum) if centroid_sum else centroid
+                for centroid_sum, centroid in zip(sums, centroids)]
+
+    def _truncate(self, centroid: dict[int, float]) -> dict[int, float]:
+        """Returns the `centroid_terms` heaviest terms of `centroid`, scaled to unit length."""
+        if len(centroid) > self._centroid_terms:
+            centroid = dict(heapq.nlargest(self._centroid_terms, centroid.items(), key=lambda item: item[1]))
+        norm = sqrt(math.fsum([weight ** 2 for weight in centroid.values()]))
+        return {term_id: weight / norm for term_id, weight in centroid.items()} if norm else centroid
+
+    def _closest_lists(self, query_weights: dict[int, float], num_probes: int) -> list[int]:
+        """Returns the ids of the `num_probes` clusters whose centroids are most similar to `query_weights`."""
+        similarities = self._similarities(query_weights, self._centroids)
+        ranked = sorted(similarities.items(), key=lambda item: (-item[1], item[0]))
+        probes = [list_id for list_id, similarity in ranked[:num_probes] if similarity > 0]
+        if len(probes) < num_probes:  # too few centroids share a term with the query, so probe the largest lists
+            probed = set(probes)
+            by_size = sorted(range(len(self._members)), key=lambda list_id: (-len(self._members[list_id]), list_id))
+            probes.extend([list_id for list_id in by_size if list_id not in probed][:num_probes - len(probes)])
+        return probes
+
+    @staticmethod
+    def _invert(centroids: list[dict[int, float]]) -> dict[int, list[tuple[int, float]]]:
+        """Returns the centroids as an inverted index of {term id: [(centroid id, weight)]}."""
+        inverted = {}
+        for list_id, centroid in enumerate(centroids):
+            for term_id, weight in centroid.items():
+                inverted.setdefault(term_id, []).append((list_id, weight))
+        return inverted
+
+    @staticmethod
+    def _similarities(weights: dict[int, float], inverted: dict[int, list[tuple[int, float]]]) -> dict[int, float]:
+        """Returns the dot product of `weights` with every centroid of `inverted` it shares a term with."""
+        similarities = {}
+        for term_id, weight in weights.items():
+            for list_id, centroid_weight in inverted.get(term_id, ()):
+                similarities[list_id] = similarities.get(list_id, 0.0) + weight * centroid_weight
+        return similarities
+
+
+def exact_ranking(corpus: Corpus, query_doc: Document, k: int = 10,
+                  doc_vectors: list[SparseVector] | None = None) -> list[tuple[str, float]]:
+    """Returns the `k` best (document title, cosine similarity) pairs scoring above zero for `query_doc`, computed
+    with `Vector.cossim` (through `SparseVector`) against every document. Pass the sparse TF-IDF vectors of the
+    documents as `doc_vectors` to reuse them across queries."""
+    if doc_vectors is None:
+        doc_vectors = [corpus.compute_tf_idf_vector(index=doc_id, sparse=True) for doc_id in range(len(corpus))]
+    query_vector = corpus.compute_tf_idf_vector(query_doc, sparse=True)
+    scores = [(doc_id, query_vector.cossim(doc_vector)) for doc_id, doc_vector in enumerate(doc_vectors)]
+    ranked = heapq.nsmallest(k, [item for item in scores if item[1] > 0], key=lambda item: (-item[1], item[0]))
+    return [(corpus[doc_id].title, score) for doc_id, score in ranked]
+
+
+def recall_at_k(index: ApproximateIndex, corpus: Corpus, query_docs: Iterable[Document], k: int = 10,
+                num_probes: int | None = None) -> dict:
+    """Measures `index` against the exact `Vector.cossim` ranking of `corpus` over `query_docs`.
+
+    Recall@k is the fraction of the exact top `k` documents (among those scoring above zero) the approximate index
+    also returns in its top `k`, averaged over the queries that match any document. The mean latency of both is
+    reported in seconds per query.
+
+    """
+    doc_vectors = [corpus.compute_tf_idf_vector(index=doc_id, sparse=True) for doc_id in range(len(corpus))]
+    recalls, exact_seconds, approximate_seconds = [], 0.0, 0.0
+    query_docs = list(query_docs)
+    for query_doc in query_docs:
+        start = time.perf_counter()
+        exact = {title for title, _ in exact_ranking(corpus, query_doc, k, doc_vectors)}
+        exact_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        approximate = {title for title, _ in index.search(query_doc, k, num_probes)}
+        approximate_seconds += time.perf_counter() - start
+        if exact:
+            recalls.append(len(exact & approximate) / len(exact))
+    num_queries = max(1, len(query_docs))
+    return {"k": k, "num_probes": index.num_probes if num_probes is None else num_probes, "num_lists": index.num_lists,
+            "queries": len(recalls), "recall": sum(recalls) / len(recalls) if recalls else 1.0,
+            "exact_seconds": exact_seconds / num_queries, "approximate_seconds": approximate_seconds / num_queries}
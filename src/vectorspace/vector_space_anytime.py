@@ -0,0 +1,178 @@
+"""Anytime ranking for the vector space model: a query that can be stopped when a latency budget runs out and still
+   returns the best ranking found so far. Each term's postings are laid out in segments of decreasing quantized
+   impact (normalized TF-IDF weight), and a query scores the segments that can contribute the most to a score first
+   (score-at-a-time), so the postings left unscored when the budget runs out are those that matter least. A query
+   that scores every segment before its budget runs out is exact.
+"""
+import math
+import heapq
+import time
+
+from array import array
+from math import sqrt
+from typing import Iterator
+from vectorspace.vector_space_models import Document, Corpus
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+_CHUNK_SIZE = 256  # postings scored between two checks of the budget
+
+
+class ImpactOrderedIndex:
+    """This class is an impact-ordered copy of the inverted index of `corpus`. The impact of a posting is its TF-IDF
+       weight divided by the norm of its document, quantized to one of 2 ** `bits` - 1 levels, rounding up; each
+       posting list is sorted by decreasing impact level (then document id) and split into one segment per level, so
+       the level of a segment bounds the contribution of each of its postings to a cosine similarity.
+
+       `search_anytime` scores segments in decreasing order of their bound times the query weight of their term, and
+       stops once `time_budget` seconds have passed or `postings_budget` postings were scored (either budget is
+       unlimited if None), checking the budget every 256 postings. Scores accumulate the exact TF-IDF weights, so an
+       exact query ranks documents like `Corpus.search`, and a query cut short ranks the documents found so far by
+       their partial cosine similarity. The index is rebuilt the next time it is searched after the documents of the
+       corpus change."""
+
+    def __init__(self, corpus: Corpus, bits: int = 8, time_budget: float | None = None,
+                 postings_budget: int | None = None):
+        if not 1 <= bits <= 16:
+            raise ValueError(f"Invalid bits: {bits}")
+        self._corpus = corpus
+        self._levels = 2 ** bits - 1
+        self.time_budget = time_budget
+        self.postings_budget = postings_budget
+        self._build()
+
+    def __len__(self):
+        return len(self._corpus)
+
+    @property
+    def levels(self):
+        """The number of impact levels above zero."""
+        return self._levels
+
+    @property
+    def time_budget(self):
+        """The default time budget of `search_anytime`, in seconds, or None if unlimited."""
+        return self._time_budget
+
+    @time_budget.setter
+    def time_budget(self, time_budget: float | None) -> None:
+        if time_budget is not None and time_budget < 0:
+            raise ValueError(f"Invalid time budget: {time_budget}")
+        self._time_budget = time_budget
+
+    @property
+    def postings_budget(self):
+        """The default postings budget of `search_anytime`, or None if unlimited."""
+        return self._postings_budget
+
+    @postings_budget.setter
+    def postings_budget(self, postings_budget: int | None) -> None:
+        if postings_budget is not None and postings_budget < 0:
+            raise ValueError(f"Invalid postings budget: {postings_budget}")
+        self._postings_budget = postings_budget
+
+    def segments(self, term_id: int) -> list[tuple[int, list[tuple[int, float]]]]:
+        """Returns the (impact level, [(document id, TF-IDF weight)]) segments of the posting list of `term_id`, in
+        the order they are scored in."""
+        self._validate()
+        doc_ids, weights, segments = self._postings.get(term_id, ((), (), ()))
+        return [(level, list(zip(doc_ids[start:end], weights[start:end]))) for level, start, end in segments]
+
+    def search(self, query_doc: Document, k: int = 10) -> list[tuple[str, float]]:
+        """Returns the ranked results of `search_anytime` within the default budgets."""
+        return self.search_anytime(query_doc, k)[0]
+
+    def search_batch(self, query_docs: list[Document], k: int = 10) -> list[list[tuple[str, float]]]:
+        """Returns the results of `search` for each of `query_docs`, each query having its own budgets."""
+        return [self.search(query_doc, k) for query_doc in query_docs]
+
+    def search_anytime(self, query_doc: Document, k: int = 10, time_budget: float | None = None,
+                       postings_budget: int | None = None) -> tuple[list[tuple[str, float]], bool]:
+        """Returns the `k` best (document title, cosine similarity) pairs for `query_doc` found within the budgets (by
+        default `time_budget` and `postings_budget`), best first, and whether every posting of the query terms was
+        scored, in which case the ranking is exact."""
+        self._validate()
+        time_budget = self._time_budget if time_budget is None else time_budget
+        postings_budget = self._postings_budget if postings_budget is None else postings_budget
+        metrics = self._corpus.metrics
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        remaining = math.inf if postings_budget is None else postings_budget
+
+        with metrics.phase("query.weights"):
+            query_weights = self._corpus._compute_query_weights(query_doc)
+            query_norm = sqrt(math.fsum([weight ** 2 for weight in query_weights.values()]))
+        with metrics.phase("query.scoring"):
+            contributions = {}
+            exact = True
+            for query_weight, doc_ids, weights, start, end in self._chunks(query_weights):
+                if remaining <= 0 or (deadline is not None and time.perf_counter() >= deadline):
+                    exact = False
+                    break
+                if start + remaining < end:  # the budget runs out within this chunk
+                    end = int(start + remaining)
+                    exact = False
+                for doc_id, weight in zip(doc_ids[start:end], weights[start:end]):
+                    contributions.setdefault(doc_id, []).append(query_weight * weight)
+                remaining -= end - start
+                metrics.count("query.postings_touched", end - start)
+
+            norms = self._corpus.norms
+            scores = {}
+            for doc_id, products in contributions.items():
+                denominator = query_norm * norms[doc_id]
+                scores[doc_id] = math.fsum(products) / denominator if denominator else 0.0
+            ranked = heapq.nsmallest(k, [(doc_id, score) for doc_id, score in scores.items() if score > 0],
+                                     key=lambda item: (-item[1], item[0]))
+            if len(ranked) < min(k, len(self)):  # zero and negative scores are ranked too, like `_rank` ranks them
+                ranked = self._corpus._rank(scores, k)
+        metrics.count("query.queries")
+        if not exact:
+            metrics.count("query.budget_exhausted")
+        return [(self._corpus._title(doc_id), score) for doc_id, score in ranked], exact
+
+    def _chunks(self, query_weights: dict[int, float]) -> Iterator[tuple[float, array, array, int, int]]:
+        """Yields the (query weight, document ids, weights, start, end) chunks of the segments of the query terms, at
+        most `_CHUNK_SIZE` postings each, the segments with the largest bound on their contributions first."""
+        segments = []
+        for term_id, query_weight in query_weights.items():
+            if term_id in self._postings:
+                doc_ids, weights, term_segments = self._postings[term_id]
+                segments.extend([(abs(query_weight) * level, term_id, start, end, query_weight, doc_ids, weights)
+                                 for level, start, end in term_segments])
+        segments.sort(key=lambda segment: (-segment[0], segment[1], segment[2]))
+        for _, _, start, end, query_weight, doc_ids, weights in segments:
+            for chunk_start in range(start, end, _CHUNK_SIZE):
+                yield query_weight, doc_ids, weights, chunk_start, min(end, chunk_start + _CHUNK_SIZE)
+
+    def _validate(self) -> None:
+        """Rebuilds the index if the documents of the corpus changed since it was built."""
+        if self._version != self._corpus.version:
+            self._build()
+
+    def _build(self) -> None:
+        """Quantizes the impacts of every posting of the corpus and lays out each posting list by decreasing level.
+
+        Levels are relative to the largest impact of the corpus, so the segments of different terms are comparable.
+        Every posting has a nonzero weight, hence a level of at least one.
+
+        """
+        self._version = self._corpus.version
+        index, norms = self._corpus.index, self._corpus.norms
+        largest = max([abs(weight) / norms[doc_id] for postings in index.values() for doc_id, weight in postings],
+                      default=0.0)
+        self._postings: dict[int, tuple[array, array, list[tuple[int, int, int]]]] = {}
+        for term_id, postings in index.items():
+            entries = sorted([(max(1, math.ceil(abs(weight) / norms[doc_id] / largest * self._levels)), doc_id, weight)
+                              for doc_id, weight in postings], key=lambda entry: (-entry[0], entry[1]))
+            segments = []
+            for position, (level, _, _) in enumerate(entries):
+                if not segments or segments[-1][0] != level:
+                    segments.append([level, position, position])
+                segments[-1][2] = position + 1
+            self._postings[term_id] = (array('I', [doc_id for _, doc_id, _ in entries]),
+                                       array('d', [weight for _, _, weight in entries]),
+                                       [tuple(segment) for segment in segments])
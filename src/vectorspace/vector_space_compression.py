@@ -0,0 +1,173 @@
+"""Compressed in-memory postings for the vector space model. The document ids of each posting list are stored as
+   variable-length (varint) encoded gaps in one contiguous byte buffer, and the weights are quantized to float32 in one
+   contiguous array, instead of a Python list of (document id, weight) tuples per term. Term positions, for phrase
+   and proximity queries, are stored the same way as varint encoded gaps.
+"""
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from itertools import accumulate
+from typing import Iterable, Iterator
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+
+def encode_varints(values: Iterable[int], buffer: bytearray | None = None) -> bytearray:
+    """Appends each of the non-negative `values` to `buffer` (a new one by default) as a little endian base 128
+    varint, 7 bits per byte with the high bit set on every byte but the last, and returns the buffer."""
+    buffer = bytearray() if buffer is None else buffer
+    for value in values:
+        if value < 0:
+            raise ValueError(f"Cannot varint encode a negative value: {value}")
+        while value >= 0x80:
+            buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+        buffer.append(value)
+    return buffer
+
+
+def decode_varints(buffer: bytes | bytearray, start: int = 0, end: int | None = None) -> list[int]:
+    """Returns the values of the varints encoded in `buffer[start:end]`."""
+    end = len(buffer) if end is None else end
+    values = []
+    value = shift = 0
+    for byte in buffer[start:end]:
+        if byte < 0x80:
+            values.append(value | (byte << shift))
+            value = shift = 0
+        else:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+    return values
+
+
+class CompressedPostings(Mapping):
+    """This class is a read-only mapping of {term id: posting list} holding the postings of `index` (a mapping of
+       {term id: [(document id, weight)]} with posting lists sorted by document id) in three contiguous buffers:
+       the varint encoded document id gaps of every list, the float32 weights of every list, and the start of each
+       list in both. A posting list is decoded into a list of (document id, weight) tuples when it is looked up, so
+       callers see the same posting lists as before, except for weights rounded to float32."""
+
+    __slots__ = ("_term_ids", "_byte_offsets", "_weight_offsets", "_doc_gaps", "_weights")
+
+    def __init__(self, index: Mapping[int, list[tuple[int, float]]]):
+        self._term_ids = array('I')
+        self._byte_offsets = array('Q', [0])
+        self._weight_offsets = array('Q', [0])
+        self._doc_gaps = bytearray()
+        self._weights = array('f')
+        for term_id in sorted(index):
+            postings = index[term_id]
+            if not postings:
+                continue
+            previous = 0
+            gaps = []
+            for doc_id, weight in postings:
+                gaps.append(doc_id - previous)
+                previous = doc_id
+                self._weights.append(weight)
+            encode_varints(gaps, self._doc_gaps)
+            self._term_ids.append(term_id)
+            self._byte_offsets.append(len(self._doc_gaps))
+            self._weight_offsets.append(len(self._weights))
+
+    def __getitem__(self, term_id: int) -> list[tuple[int, float]]:
+        position = self._position(term_id)
+        if position is None:
+            raise KeyError(term_id)
+        doc_ids = accumulate(decode_varints(self._doc_gaps, self._byte_offsets[position],
+                                            self._byte_offsets[position + 1]))
+        return list(zip(doc_ids, self._weights[self._weight_offsets[position]:self._weight_offsets[position + 1]]))
+
+    def __contains__(self, term_id) -> bool:
+        return self._position(term_id) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._term_ids)
+
+    def __len__(self) -> int:
+        return len(self._term_ids)
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the buffers holding the postings, in bytes."""
+        return (len(self._doc_gaps) + self._weights.itemsize * len(self._weights)
+                + self._term_ids.itemsize * len(self._term_ids)
+                + self._byte_offsets.itemsize * (len(self._byte_offsets) + len(self._weight_offsets)))
+
+    def _position(self, term_id) -> int | None:
+        """Returns the position of `term_id` among the terms with postings, or None if it has none."""
+        if not isinstance(term_id, int):
+            return None
+        position = bisect_left(self._term_ids, term_id)
+        return position if position < len(self._term_ids) and self._term_ids[position] == term_id else None
+
+
+class PositionalPostings(Mapping):
+    """This class is a read-only mapping of {term id: positional posting list}, where a positional posting list is a
+       list of (document id, [positions of the term in the document]) tuples sorted by document id. It is built from
+       `documents`, the term ids of each document's words in order, so the positions of a document are the indexes
+       of its words. Each list is stored as varints (the document id gap, the number of positions and the position
+       gaps of every posting) in one contiguous byte buffer, and is decoded when it is looked up."""
+
+    __slots__ = ("_term_ids", "_offsets", "_buffer")
+
+    def __init__(self, documents: Iterable[Iterable[int]]):
+        lists: dict[int, bytearray] = {}
+        previous_docs: dict[int, int] = {}
+        for doc_id, term_ids in enumerate(documents):
+            positions: dict[int, list[int]] = {}
+            for position, term_id in enumerate(term_ids):
+                positions.setdefault(term_id, []).append(position)
+            for term_id, term_positions in positions.items():
+                gaps = [doc_id - previous_docs.get(term_id, 0), len(term_positions), term_positions[0]]
+                gaps.extend([position - previous for previous, position in zip(term_positions, term_positions[1:])])
+                encode_varints(gaps, lists.setdefault(term_id, bytearray()))
+                previous_docs[term_id] = doc_id
+
+        self._term_ids = array('I', sorted(lists))
+        self._offsets = array('Q', [0])
+        self._buffer = bytearray()
+        for term_id in self._term_ids:
+            self._buffer.extend(lists.pop(term_id))
+            self._offsets.append(len(self._buffer))
+
+    def __getitem__(self, term_id: int) -> list[tuple[int, list[int]]]:
+        position = self._position(term_id)
+        if position is None:
+            raise KeyError(term_id)
+        values = decode_varints(self._buffer, self._offsets[position], self._offsets[position + 1])
+        postings = []
+        doc_id = cursor = 0
+        while cursor < len(values):
+            doc_id += values[cursor]
+            count = values[cursor + 1]
+            postings.append((doc_id, list(accumulate(values[cursor + 2:cursor + 2 + count]))))
+            cursor += 2 + count
+        return postings
+
+    def __contains__(self, term_id) -> bool:
+        return self._position(term_id) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._term_ids)
+
+    def __len__(self) -> int:
+        return len(self._term_ids)
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the buffers holding the positional postings, in bytes."""
+        return (len(self._buffer) + self._term_ids.itemsize * len(self._term_ids)
+                + self._offsets.itemsize * len(self._offsets))
+
+    def _position(self, term_id) -> int | None:
+        """Returns the position of `term_id` among the terms with postings, or None if it has none."""
+        if not isinstance(term_id, int):
+            return None
+        position = bisect_left(self._term_ids, term_id)
+        return position if position < len(self._term_ids) and self._term_ids[position] == term_id else None
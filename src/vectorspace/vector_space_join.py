@@ -0,0 +1,272 @@
+"""All-pairs similarity join for the vector space model: the cosine neighbours of every document of a corpus within
+   the corpus, for near-duplicate detection and "related documents". Documents are scored in blocks, so only
+   documents sharing a term are ever compared and the documents x documents similarity matrix is never held in
+   memory; blocks can be scored over a process pool, and results are yielded block by block. Blocks are sparse
+   matrix products when SciPy is installed, and are scored from an inverted index in pure Python otherwise.
+"""
+import math
+import heapq
+import collections
+import concurrent.futures
+
+from array import array
+from math import sqrt
+from typing import Iterator
+from vectorspace.vector_space_models import PostingsSearch
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+_SLACK = 1e-9  # keeps floating point error in the bounds from pruning a pair on the threshold
+
+
+class SimilarityJoin(PostingsSearch):
+    """This class finds the neighbours of every document of `searcher` (a `Corpus`, or any other `PostingsSearch`):
+       the other documents whose cosine similarity to it is above zero and at least `threshold`, best first, at most
+       `k` of them if `k` is set. Rankings break ties by document id. The postings of `searcher` are copied, so a
+       join can be sent to worker processes.
+
+       With `matrix` (the default when NumPy and SciPy are installed), the row-normalized TF-IDF matrix is stored as
+       a `scipy.sparse.csr_matrix`, and a block of documents is scored against every document with one sparse
+       (block x terms) by (terms x documents) product, like `TfIdfMatrix` scores queries.
+
+       Otherwise, scores are computed like `Corpus.search` scores a document used as a query, with document norms
+       summed the same way so that they are symmetric, and each strategy only visits pairs of documents that can
+       make it into the results:
+
+       - with a `threshold`, prefix filtering (Bayardo, Ma and Srikant, 2007): terms are ordered by decreasing
+         document frequency, and a document is only indexed under the terms that follow its longest prefix whose
+         largest possible contribution to a score (bounded over the impacts of each term, and by zero as a term may
+         be missing from the other document) stays below the threshold. A document scoring at least the
+         threshold against it must then share one of the indexed terms, so the long posting lists of frequent terms
+         are mostly left out of the candidate search.
+       - with only `k`, every document is a MaxScore top k query against the full index (`_search_top_k`).
+       - with neither, blocks of documents are scored together against the full index (`_score_block`)."""
+
+    def __init__(self, searcher: PostingsSearch, threshold: float = 0.0, k: int | None = None,
+                 matrix: bool | None = None):
+        if not 0.0 <= threshold <= 1.0 or (k is not None and k < 1):
+            raise ValueError(f"Invalid threshold or k: {threshold}, {k}")
+        if matrix and (np is None or sparse is None):
+            raise ImportError("A matrix SimilarityJoin requires numpy and scipy")
+        self._threshold = threshold
+        self._k = k
+        self._titles = [searcher._title(doc_id) for doc_id in range(len(searcher))]
+        self._index: dict[int, list[tuple[int, float]]] = {}
+        self._impacts: dict[int, tuple[float, float]] = {}
+        self._vectors: list[dict[int, float]] = []  # {term id: weight} of each document
+        self._norms: list[float] = []
+        self._prefix_index: dict[int, list[tuple[int, float]]] | None = None
+        self._matrix = self._transposed = None
+
+        if matrix if matrix is not None else sparse is not None:
+            self._matrix = self._compute_matrix(searcher._index)
+            self._transposed = self._matrix.T.tocsr()
+            return
+
+        self._index = {term_id: list(postings) for term_id, postings in searcher._index.items()}
+        self._vectors = [{} for _ in self._titles]
+        for term_id, postings in self._index.items():
+            for doc_id, weight in postings:
+                self._vectors[doc_id][term_id] = weight
+        # documents are normed like `_score_block` and `_search_top_k` norm a query, so that scores are symmetric
+        self._norms = [sqrt(math.fsum([weight ** 2 for weight in vector.values()])) for vector in self._vectors]
+        # the impacts of `searcher` are not normalized by these norms unless its weighting is cosine normalized
+        for term_id, postings in self._index.items():
+            normalized = [weight / self._norms[doc_id] for doc_id, weight in postings]
+            self._impacts[term_id] = (min(normalized), max(normalized))
+        if threshold > 0:
+            self._prefix_index = self._compute_prefix_index()
+
+    def __len__(self):
+        return len(self._titles)
+
+    @property
+    def threshold(self):
+        return self._threshold
+
+    @property
+    def k(self):
+        return self._k
+
+    @property
+    def matrix(self):
+        """The row-normalized (documents x terms) TF-IDF matrix, or None if blocks are scored in pure Python."""
+        return self._matrix
+
+    def join_block(self, start: int, end: int) -> list[tuple[int, list[tuple[int, float]]]]:
+        """Returns the (document id, [(neighbour id, score)]) neighbours of the documents `start` to `end`."""
+        doc_ids = range(start, end)
+        if self._matrix is not None:
+            return self._join_matrix_block(start, end)
+        elif self._prefix_index is not None:
+            scores = [self._score_candidates(doc_id) for doc_id in doc_ids]
+        elif self._k is not None:
+            return [(doc_id, self._neighbours(dict(self._search_top_k(self._vectors[doc_id], self._k + 1)), doc_id))
+                    for doc_id in doc_ids]
+        else:
+            scores = self._score_block([self._vectors[doc_id] for doc_id in doc_ids])
+        return [(doc_id, self._neighbours(doc_scores, doc_id)) for doc_id, doc_scores in zip(doc_ids, scores)]
+
+    def _title(self, doc_id: int) -> str:
+        return self._titles[doc_id]
+
+    def _neighbours(self, scores: dict[int, float], doc_id: int) -> list[tuple[int, float]]:
+        """Returns the best (neighbour id, score) pairs of `scores`, without `doc_id` itself and scores that are not
+        above zero or below the threshold."""
+        neighbours = [(other_id, score) for other_id, score in scores.items()
+                      if other_id != doc_id and score > 0 and score >= self._threshold]
+        if self._k is None:
+            return sorted(neighbours, key=lambda item: (-item[1], item[0]))
+        return heapq.nsmallest(self._k, neighbours, key=lambda item: (-item[1], item[0]))
+
+    def _compute_matrix(self, index):
+        """Returns the row-normalized (documents x terms) TF-IDF matrix of the postings of `index`."""
+        rows, columns, data = array('q'), array('q'), array('d')
+        for term_id, postings in index.items():
+            for doc_id, weight in postings:
+                rows.append(doc_id)
+                columns.append(term_id)
+                data.append(weight)
+        shape = (len(self._titles), max(columns, default=-1) + 1)
+        matrix = sparse.csr_matrix((np.frombuffer(data), (np.frombuffer(rows, dtype=np.int64),
+                                                           np.frombuffer(columns, dtype=np.int64))), shape=shape)
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        return sparse.csr_matrix(sparse.diags(1 / np.where(norms > 0, norms, 1)) @ matrix)
+
+    def _join_matrix_block(self, start: int, end: int) -> list[tuple[int, list[tuple[int, float]]]]:
+        """Returns the neighbours of the documents `start` to `end`, scored with one sparse matrix product.
+
+        Only the nonzero scores of each row are ranked: those below the k-th best score are dropped with a
+        partition, and the rest are sorted by (score, document id).
+
+        """
+        scores = (self._matrix[start:end] @ self._transposed).tocsr()
+        results = []
+        for row, doc_id in enumerate(range(start, end)):
+            columns = scores.indices[scores.indptr[row]:scores.indptr[row + 1]]
+            values = scores.data[scores.indptr[row]:scores.indptr[row + 1]]
+            kept = (values > 0) & (values >= self._threshold) & (columns != doc_id)
+            columns, values = columns[kept], values[kept]
+            if self._k is not None and len(values) > self._k:
+                kth_best = np.partition(values, len(values) - self._k)[len(values) - self._k]
+                kept = values >= kth_best
+                columns, values = columns[kept], values[kept]
+            ranked = np.lexsort((columns, -values))[:self._k]
+            results.append((doc_id, [(int(columns[position]), float(values[position])) for position in ranked]))
+        return results
+
+    def _compute_prefix_index(self) -> dict[int, list[tuple[int, float]]]:
+        """Returns the inverted index of {term id: [(document id, normalized weight)]} of the indexed (suffix) terms
+        of every document, and stores the bound of each document's prefix in `_prefix_bounds`."""
+        order = sorted(self._index, key=lambda term_id: (-len(self._index[term_id]), term_id))
+        rank = {term_id: position for position, term_id in enumerate(order)}
+        prefix_index = {}
+        self._prefix_bounds = [0.0] * len(self._vectors)
+        for doc_id, vector in enumerate(self._vectors):
+            norm = self._norms[doc_id]
+            if not norm:
+                continue
+            bound = 0.0
+            for term_id in sorted(vector, key=rank.__getitem__):
+                weight = vector[term_id] / norm
+                # weights are negative for terms in every document, so the product is bounded over both impacts
+                low, high = self._impacts[term_id]
+                term_bound = max(0.0, weight * low, weight * high)
+                if bound + term_bound + _SLACK < self._threshold:
+                    bound += term_bound
+                else:
+                    prefix_index.setdefault(term_id, []).append((doc_id, weight))
+            self._prefix_bounds[doc_id] = bound
+        return prefix_index
+
+    def _score_candidates(self, doc_id: int) -> dict[int, float]:
+        """Returns the scores of the documents that share an indexed term with document `doc_id` and whose score
+        could reach the threshold.
+
+        The normalized products of the indexed terms are accumulated while the candidates are found, and a candidate
+        is only scored if the accumulated products plus the bound of its prefix reach the threshold.
+
+        """
+        vector = self._vectors[doc_id]
+        norm = self._norms[doc_id]
+        if not norm:
+            return {}
+        accumulated = {}
+        for term_id, weight in vector.items():
+            weight /= norm
+            for candidate, candidate_weight in self._prefix_index.get(term_id, ()):
+                accumulated[candidate] = accumulated.get(candidate, 0.0) + weight * candidate_weight
+
+        scores = {}
+        for candidate, partial in accumulated.items():
+            if partial + self._prefix_bounds[candidate] + _SLACK < self._threshold:
+                continue
+            other = self._vectors[candidate]
+            if len(other) < len(vector):
+                products = [weight * vector[term_id] for term_id, weight in other.items() if term_id in vector]
+            else:
+                products = [weight * other[term_id] for term_id, weight in vector.items() if term_id in other]
+            scores[candidate] = math.fsum(products) / (norm * self._norms[candidate])
+        return scores
+
+
+def similarity_join(searcher: PostingsSearch, threshold: float = 0.0, k: int | None = None, block_size: int = 64,
+                    processes: int = 1, matrix: bool | None = None) -> Iterator[tuple[str, list[tuple[str, float]]]]:
+    """Yields the (document title, [(neighbour title, cosine similarity)]) neighbours of every document of
+    `searcher`, in document id order, as described by `SimilarityJoin`. Documents are joined in blocks of
+    `block_size`, over a pool of `processes` processes if more than one, with at most two blocks per process
+    waiting to be yielded."""
+    join = SimilarityJoin(searcher, threshold, k, matrix)
+    blocks = [(start, min(start + block_size, len(join))) for start in range(0, len(join), block_size)]
+    if processes <= 1:
+        for start, end in blocks:
+            yield from _to_titles(join, join.join_block(start, end))
+        return
+
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=processes, initializer=_init_join_worker,
+                                                      initargs=(join,))
+    try:
+        pending = collections.deque()
+        for start, end in blocks:
+            pending.append(executor.submit(_join_block, start, end))
+            if len(pending) >= 2 * processes:
+                yield from _to_titles(join, pending.popleft().result())
+        while pending:
+            yield from _to_titles(join, pending.popleft().result())
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _to_titles(join: SimilarityJoin, results: list[tuple[int, list[tuple[int, float]]]]
+               ) -> Iterator[tuple[str, list[tuple[str, float]]]]:
+    """Yields `results` with document ids replaced by titles."""
+    for doc_id, neighbours in results:
+        yield join._title(doc_id), [(join._title(other_id), score) for other_id, score in neighbours]
+
+
+_worker_join: SimilarityJoin | None = None
+
+
+def _init_join_worker(join: SimilarityJoin) -> None:
+    """Process pool initializer storing the join that `_join_block` runs in the worker."""
+    global _worker_join
+    _worker_join = join
+
+
+def _join_block(start: int, end: int) -> list[tuple[int, list[tuple[int, float]]]]:
+    """Process pool task returning the neighbours of the documents `start` to `end`."""
+    return _worker_join.join_block(start, end)
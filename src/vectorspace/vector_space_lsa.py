@@ -0,0 +1,150 @@
+"""Latent semantic analysis (LSA) backend for the vector space model. A rank-r truncated SVD of the TF-IDF matrix of a
+   corpus, computed with a randomized range finder, maps every document to r float32 numbers, and queries are folded
+   into the same space, so cosine scoring is one small dense matrix-vector product. Requires NumPy, and uses SciPy
+   for the sparse TF-IDF matrix when it is installed.
+"""
+from typing import Iterable
+
+from vectorspace.vector_space_models import Document, Corpus
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+
+class LsaIndex:
+    """This class stores a unit length float32 embedding of `rank` dimensions for every document of `corpus`. The
+       embeddings are the rows of U * S of the truncated SVD U * S * V^T of the row-normalized TF-IDF matrix, and a
+       query is folded in by multiplying its TF-IDF vector with V (stored as `term_vectors`, one row per term).
+
+       The SVD is computed with a randomized range finder (`oversampling` extra dimensions and `power_iterations`
+       subspace iterations, seeded by `seed`), which only multiplies the TF-IDF matrix by thin dense matrices. The
+       index is rebuilt the next time it is searched after the documents of the corpus change."""
+
+    def __init__(self, corpus: Corpus, rank: int = 100, oversampling: int = 10, power_iterations: int = 2,
+                 seed: int = 0):
+        if np is None:
+            raise ImportError("LsaIndex requires numpy")
+        if rank < 1:
+            raise ValueError(f"Invalid rank: {rank}")
+        self._corpus = corpus
+        self._requested_rank = rank
+        self._oversampling = oversampling
+        self._power_iterations = power_iterations
+        self._seed = seed
+        self._build()
+
+    def __len__(self):
+        return len(self._corpus)
+
+    @property
+    def rank(self) -> int:
+        return self._embeddings.shape[1]
+
+    @property
+    def embeddings(self):
+        """The (documents x rank) float32 array of unit length document embeddings."""
+        return self._embeddings
+
+    @property
+    def term_vectors(self):
+        """The (terms x rank) float32 array that folds a TF-IDF vector into the embedding space."""
+        return self._term_vectors
+
+    @property
+    def singular_values(self):
+        return self._singular_values
+
+    @property
+    def nbytes(self) -> int:
+        """The memory taken by the document embeddings and the term vectors, in bytes."""
+        return self._embeddings.nbytes + self._term_vectors.nbytes
+
+    def embed(self, query_docs: Iterable[Document]):
+        """Returns the (queries x rank) float32 array of unit length embeddings of `query_docs`."""
+        self._validate()
+        rows = []
+        for query_doc in query_docs:
+            weights = self._corpus._compute_query_weights(query_doc)
+            row = np.zeros(self.rank, dtype=np.float32)
+            if weights:
+                term_ids = np.fromiter(weights.keys(), dtype=np.int64, count=len(weights))
+                values = np.fromiter(weights.values(), dtype=np.float32, count=len(weights))
+                row = values @ self._term_vectors[term_ids]
+            rows.append(row)
+        return _normalize_rows(np.array(rows, dtype=np.float32).reshape(len(rows), self.rank))
+
+    def score(self, query_docs: Iterable[Document]):
+        """Returns the (queries x documents) array of cosine similarities between the embeddings of `query_docs` and
+        of every document."""
+        return self.embed(query_docs) @ self._embeddings.T
+
+    def search(self, query_doc: Document, k: int = 10) -> list[tuple[str, float]]:
+        """Returns the `k` best (document title, cosine similarity in the embedding space) pairs for `query_doc`."""
+        return self.search_batch([query_doc], k)[0]
+
+    def search_batch(self, query_docs: Iterable[Document], k: int = 10) -> list[list[tuple[str, float]]]:
+        """Returns the ranked results of `search` for each of `query_docs`, scored together in one matrix product.
+        Ties are broken by document id."""
+        results = []
+        for scores in self.score(query_docs):
+            ranked = np.argsort(-scores, kind="stable")[:k]
+            results.append([(self._corpus._title(doc_id), float(scores[doc_id])) for doc_id in ranked])
+        return results
+
+    def _validate(self) -> None:
+        """Rebuilds the index if the documents of the corpus changed since it was built."""
+        if self._version != self._corpus.version:
+            self._build()
+
+    def _build(self) -> None:
+        """Computes the truncated SVD of the TF-IDF matrix and the document embeddings."""
+        from vectorspace.vector_space_matrix import TfIdfMatrix
+
+        self._version = self._corpus.version
+        matrix = TfIdfMatrix(self._corpus, dense=sparse is None).matrix
+        rank = max(1, min(self._requested_rank, *matrix.shape))
+        left, singular_values, right = randomized_svd(matrix, rank, self._oversampling, self._power_iterations,
+                                                      self._seed)
+        self._singular_values = singular_values
+        self._term_vectors = np.ascontiguousarray(right.T, dtype=np.float32)
+        self._embeddings = _normalize_rows((left * singular_values).astype(np.float32))
+
+
+def randomized_svd(matrix, rank: int, oversampling: int = 10, power_iterations: int = 2, seed: int = 0):
+    """Returns the rank-`rank` truncated SVD (U, S, V^T) of `matrix`, a NumPy array or SciPy sparse matrix, computed
+    with the randomized range finder of Halko, Martinsson and Tropp (2011).
+
+    A Gaussian test matrix of `rank + oversampling` columns samples the range of `matrix`, `power_iterations` rounds
+    of (re-orthonormalized) subspace iteration sharpen it, and the exact SVD of the small projected matrix is lifted
+    back. Only products of `matrix` (and its transpose) with thin dense matrices are computed.
+
+    """
+    rng = np.random.default_rng(seed)
+    num_rows, num_columns = matrix.shape
+    width = min(rank + oversampling, num_rows, num_columns)
+    basis, _ = np.linalg.qr(np.asarray(matrix @ rng.standard_normal((num_columns, width))))
+    for _ in range(power_iterations):
+        basis, _ = np.linalg.qr(np.asarray(matrix.T @ basis))
+        basis, _ = np.linalg.qr(np.asarray(matrix @ basis))
+    projected = np.asarray((matrix.T @ basis).T)  # basis^T @ matrix, computed with a sparse-friendly product
+    small_left, singular_values, right = np.linalg.svd(projected, full_matrices=False)
+    return (basis @ small_left)[:, :rank], singular_values[:rank], right[:rank]
+
+
+def _normalize_rows(array):
+    """Returns `array` with every nonzero row scaled to unit length."""
+    norms = np.linalg.norm(array, axis=1, keepdims=True)
+    return array / np.where(norms > 0, norms, 1).astype(array.dtype)
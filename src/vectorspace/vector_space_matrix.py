@@ -0,0 +1,134 @@
+"""Matrix backend for the vector space model that scores cosine similarity queries with a single matrix product
+   over the row-normalized TF-IDF matrix of a corpus. Requires NumPy, and SciPy for the (default) sparse storage.
+"""
+from typing import Iterable
+
+from vectorspace.vector_space_models import Document, Corpus
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+
+class TfIdfMatrix:
+    """This class stores the TF-IDF matrix of a corpus as a `scipy.sparse.csr_matrix` (or a NumPy array when `dense`),
+       with one row per document and one column per term. Rows are normalized to unit length, so the cosine
+       similarity of a block of queries against every document is one matrix product. Column `j` holds the term
+       whose id is `j` in `Corpus.terms`, and row `i` holds the document whose id is `i` in the corpus. The matrix
+       is rebuilt the next time it is used after the documents of the corpus change."""
+
+    def __init__(self, corpus: Corpus, dense: bool = False):
+        if np is None:
+            raise ImportError("TfIdfMatrix requires numpy")
+        if sparse is None and not dense:
+            raise ImportError("A sparse TfIdfMatrix requires scipy, pass dense=True to use numpy only")
+
+        self._corpus = corpus
+        self._dense = dense
+        self._build()
+
+    @property
+    def columns(self):
+        self._validate()
+        return self._columns
+
+    @property
+    def rows(self):
+        self._validate()
+        return self._rows
+
+    @property
+    def matrix(self):
+        self._validate()
+        return self._matrix
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        self._validate()
+        return len(self._rows), len(self._columns)
+
+    def _validate(self) -> None:
+        """Rebuilds the matrix if the documents of the corpus changed since it was built."""
+        if self._version != self._corpus.version:
+            self._build()
+
+    def _build(self) -> None:
+        """Maps the rows and columns to the documents and terms of the corpus and computes the matrix."""
+        self._version = self._corpus.version
+        self._columns: dict[str, int] = self._corpus.terms
+        self._rows: list[str] = [doc.title for doc in self._corpus]
+        self._matrix = self._compute_matrix()
+
+    def _compute_matrix(self):
+        """Computes and returns the row-normalized (documents x terms) matrix from the inverted index of the corpus."""
+        norms = self._corpus.norms
+        rows, columns, data = [], [], []
+        for term_id, postings in self._corpus.index.items():
+            for doc_id, weight in postings:
+                if norms[doc_id]:
+                    rows.append(doc_id)
+                    columns.append(term_id)
+                    data.append(weight / norms[doc_id])
+
+        shape = (len(self._rows), len(self._columns))
+        if self._dense:
+            matrix = np.zeros(shape)
+            matrix[rows, columns] = data
+            return matrix
+        else:
+            return sparse.csr_matrix((data, (rows, columns)), shape=shape)
+
+    def vectorize(self, query_docs: Iterable[Document]):
+        """Returns the (queries x terms) matrix of unit length TF-IDF vectors of `query_docs`."""
+        self._validate()
+        rows, columns, data = [], [], []
+        num_queries = 0
+        for row, query_doc in enumerate(query_docs):
+            weights = self._corpus._compute_query_weights(query_doc)
+            norm = np.sqrt(sum([weight ** 2 for weight in weights.values()]))
+            for term_id, weight in weights.items():
+                rows.append(row)
+                columns.append(term_id)
+                data.append(weight / norm)
+            num_queries = row + 1
+
+        shape = (num_queries, len(self._columns))
+        if self._dense:
+            queries = np.zeros(shape)
+            queries[rows, columns] = data
+            return queries
+        else:
+            return sparse.csr_matrix((data, (rows, columns)), shape=shape)
+
+    def score(self, query_docs: Iterable[Document]):
+        """Returns the (queries x documents) array of cosine similarities between `query_docs` and every document."""
+        scores = self.vectorize(query_docs) @ self._matrix.T
+        return scores if self._dense else scores.toarray()
+
+    def search(self, query_doc: Document, k: int = 10) -> list[tuple[str, float]]:
+        """Returns the `k` best (document title, cosine similarity) pairs for `query_doc`, best first."""
+        return self.search_batch([query_doc], k)[0]
+
+    def search_batch(self, query_docs: Iterable[Document], k: int = 10) -> list[list[tuple[str, float]]]:
+        """Returns the ranked results of `search` for each of `query_docs`, scored together in one matrix product.
+
+        Ties are broken by document id, so rankings match `Corpus.search`.
+
+        """
+        results = []
+        for scores in self.score(query_docs):
+            ranked = np.argsort(-scores, kind="stable")[:k]
+            results.append([(self._rows[doc_id], float(scores[doc_id])) for doc_id in ranked])
+        return results
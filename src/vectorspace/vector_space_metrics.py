@@ -0,0 +1,189 @@
+"""Metrics and tracing for the vector space model. Components record the wall and CPU time of their phases, counters
+   and latency histograms through a `Metrics` object. The default `NULL_METRICS` discards everything at the cost of a
+   method call, while a `MetricsRecorder` aggregates them for export as JSON or in the Prometheus text format.
+"""
+import json
+import sys
+import threading
+import time
+
+from contextlib import contextmanager, nullcontext
+from typing import TYPE_CHECKING, ContextManager, TextIO
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+
+class Metrics:
+    """This class is the metrics interface, and also its disabled implementation: every method does nothing."""
+
+    enabled = False
+    _NULL_PHASE = nullcontext()
+
+    def phase(self, name: str) -> ContextManager:
+        """Returns a context manager recording the wall and CPU time spent in its block as phase `name`."""
+        return self._NULL_PHASE
+
+    def record(self, name: str, wall: float, cpu: float = 0.0) -> None:
+        """Records one run of phase `name` that took `wall` seconds of wall time and `cpu` seconds of CPU time."""
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Adds `value` to counter `name`."""
+
+    def observe(self, name: str, value: float) -> None:
+        """Adds the observation `value` (in seconds) to the latency histogram `name`."""
+
+
+NULL_METRICS = Metrics()
+
+
+class MetricsRecorder(Metrics):
+    """This class aggregates phases, counters and histograms in memory. Each phase keeps its run count, total wall
+       and CPU time and a histogram of its wall times. When a `log` stream is given, every recorded phase is also
+       printed to it, which is what the `debug` flag of `Corpus` uses. Recording is thread safe."""
+
+    enabled = True
+
+    def __init__(self, log: TextIO | None = None, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self._log = log
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self._phases: dict[str, dict] = {}
+        self._counters: dict[str, int] = {}
+        self._histograms: dict[str, dict] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - wall_start, time.process_time() - cpu_start)
+
+    def record(self, name: str, wall: float, cpu: float = 0.0) -> None:
+        with self._lock:
+            phase = self._phases.get(name)
+            if phase is None:
+                phase = self._phases[name] = {"count": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0,
+                                              "histogram": self._new_histogram()}
+            phase["count"] += 1
+            phase["wall_seconds"] += wall
+            phase["cpu_seconds"] += cpu
+            self._add_observation(phase["histogram"], wall)
+        if self._log is not None:
+            print(f"Elapsed time for {name}: {wall:0.4f} seconds ({cpu:0.4f} CPU)", file=self._log)
+            self._log.flush()
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = self._new_histogram()
+            self._add_observation(histogram, value)
+
+    def to_dict(self) -> dict:
+        """Returns a snapshot of every phase, counter and histogram recorded so far."""
+        with self._lock:
+            return json.loads(json.dumps({"phases": self._phases, "counters": self._counters,
+                                          "histograms": self._histograms}))
+
+    def to_json(self, indent: int | None = 2) -> str:
+        """Returns `to_dict` as a JSON string."""
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_prometheus(self, prefix: str = "vectorspace") -> str:
+        """Returns the recorded metrics in the Prometheus text exposition format."""
+        snapshot = self.to_dict()
+        lines = [f"# TYPE {prefix}_phase_seconds histogram"]
+        for name, phase in snapshot["phases"].items():
+            lines.extend(self._histogram_lines(f"{prefix}_phase_seconds", f'phase="{name}"', phase["histogram"]))
+        lines.append(f"# TYPE {prefix}_phase_cpu_seconds_total counter")
+        for name, phase in snapshot["phases"].items():
+            lines.append(f'{prefix}_phase_cpu_seconds_total{{phase="{name}"}} {phase["cpu_seconds"]}')
+        for name, value in snapshot["counters"].items():
+            metric = f"{prefix}_{_metric_name(name)}_total"
+            lines.extend([f"# TYPE {metric} counter", f"{metric} {value}"])
+        for name, histogram in snapshot["histograms"].items():
+            metric = f"{prefix}_{_metric_name(name)}"
+            lines.append(f"# TYPE {metric} histogram")
+            lines.extend(self._histogram_lines(metric, "", histogram))
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> "ThreadingHTTPServer":
+        """Starts serving `to_prometheus` at http://`host`:`port`/metrics (and `to_json` at /metrics.json) from a
+        daemon thread, and returns the server so that the caller can `shutdown` it."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        recorder = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path == "/metrics":
+                    body, content_type = recorder.to_prometheus().encode(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = recorder.to_json().encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def _new_histogram(self) -> dict:
+        return {"buckets": [0] * len(self._buckets), "bounds": list(self._buckets), "count": 0, "sum": 0.0}
+
+    def _add_observation(self, histogram: dict, value: float) -> None:
+        for position, bound in enumerate(self._buckets):
+            if value <= bound:
+                histogram["buckets"][position] += 1
+                break
+        histogram["count"] += 1
+        histogram["sum"] += value
+
+    @staticmethod
+    def _histogram_lines(metric: str, labels: str, histogram: dict) -> list[str]:
+        """Returns the cumulative bucket, sum and count lines of `histogram` in the Prometheus text format."""
+        separator = "," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(histogram["bounds"], histogram["buckets"]):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{{labels}{separator}le="+Inf"}} {histogram["count"]}')
+        selector = f"{{{labels}}}" if labels else ""
+        lines.append(f"{metric}_sum{selector} {histogram['sum']}")
+        lines.append(f"{metric}_count{selector} {histogram['count']}")
+        return lines
+
+
+def _metric_name(name: str) -> str:
+    """Returns `name` with the characters Prometheus does not allow in metric names replaced by underscores."""
+    return "".join([char if char.isalnum() or char == "_" else "_" for char in name])
+
+
+def debug_metrics(debug: bool, metrics: Metrics | None) -> Metrics:
+    """Returns `metrics` if given, else a recorder logging to stderr when `debug` is set, else `NULL_METRICS`."""
+    if metrics is not None:
+        return metrics
+    return MetricsRecorder(log=sys.stderr) if debug else NULL_METRICS
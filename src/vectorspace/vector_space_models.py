@@ -2,13 +2,21 @@
    cosine similarity queries using TF-IDF matrix built from the corpus.
 """
 import math
-import sys
+import heapq
+import functools
+import importlib
+import threading
 import concurrent.futures
 
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Mapping
 from math import sqrt, log10
-from typing import Callable, Iterable
-from nltk.stem import StemmerI
-from nltk.stem.snowball import SnowballStemmer
+from typing import TYPE_CHECKING, Callable, Iterable
+from vectorspace.vector_space_compression import CompressedPostings, PositionalPostings
+from vectorspace.vector_space_metrics import Metrics, NULL_METRICS, debug_metrics
+from vectorspace.vector_space_weighting import CorpusStatistics, TfIdf, WeightingScheme
 
 __author__ = "Garrett Buchanan"
 __copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
@@ -16,15 +24,24 @@ __credits__ = ["Garrett Buchanan", "Mike Ryu"]
 __license__ = "MIT"
 __email__ = "gbuchanan@westmont.edu"
 
+if TYPE_CHECKING:
+    from nltk.stem import StemmerI
+    from vectorspace.vector_space_phrases import Phrase
+
 
 class Vector:
     """This class is used to create and manipulate vectors and calculate different values on them, such as computing
        the euclidian norm of a vector, computing the dot product of two vectors, and calculating the cossimilarity of
        two vectors."""
 
+    __slots__ = ("_vec",)
+
     def __init__(self, elements: list[float] | None = None):
         self._vec = elements if elements else []
 
+    def __setstate__(self, state) -> None:
+        self._vec = _slots_state(state)["_vec"]  # vectors pickled before they had slots were pickled as a dict
+
     def __getitem__(self, index: int) -> float:
         if index < 0 or index >= len(self._vec):
             raise IndexError(f"Index out of range: {index}")
@@ -62,14 +79,16 @@ class Vector:
 
     def dot(self, other: object) -> float:
         """Computes the Dot product of `self` and `other` vectors."""
-        if not isinstance(other, Vector):
+        if isinstance(other, SparseVector):
+            return other.dot(self)
+        elif not isinstance(other, Vector):
             raise ValueError(self._get_cannot_compute_msg("dot product", other))
         else:
             return sum([v1 * v2 for v1, v2 in zip(self.vec, other.vec)])
 
     def cossim(self, other: object) -> float:
         """Computes the Cosine similarity of `self` and `other` vectors."""
-        if not isinstance(other, Vector):
+        if not isinstance(other, (Vector, SparseVector)):
             raise ValueError(self._get_cannot_compute_msg("cosine similarity", other))
         else:
             denominator = (self.norm() * other.norm())  # create a variable for the denominator
@@ -80,35 +99,319 @@ class Vector:
 
     def boolean_intersect(self, other: object) -> list[tuple[float, float]]:
         """Returns a list of tuples of elements where both `self` and `other` had nonzero values."""
-        if not isinstance(other, Vector):
+        if isinstance(other, SparseVector):
+            return [(e1, e2) for e2, e1 in other.boolean_intersect(self)]
+        elif not isinstance(other, Vector):
             raise ValueError(self._get_cannot_compute_msg("boolean intersection", other))
         else:
             return [(e1, e2) for e1, e2 in zip(self._vec, other._vec) if e1 and e2]
 
 
+class SparseVector:
+    """This class is a sparse counterpart of `Vector` that only stores nonzero elements, as sorted parallel arrays of
+       indices and values. It supports the same computations as `Vector` (euclidian norm, dot product, cossimilarity
+       and boolean intersection), each costing time proportional to the number of nonzero elements, and caches its
+       norm since its elements cannot be changed after construction."""
+
+    __slots__ = ("_indices", "_values", "_size", "_norm")
+
+    def __init__(self, indices: Iterable[int] | None = None, values: Iterable[float] | None = None,
+                 size: int | None = None):
+        indices = list(indices) if indices else []
+        pairs = sorted([(index, value) for index, value in zip(indices, values or []) if value])
+        self._indices = array('l', [index for index, _ in pairs])
+        self._values = array('d', [value for _, value in pairs])
+        if any(i1 == i2 for i1, i2 in zip(self._indices, self._indices[1:])):
+            raise ValueError(f"Duplicate indices in: {list(self._indices)}")
+        if self._indices and self._indices[0] < 0:
+            raise IndexError(f"Index out of range: {self._indices[0]}")
+
+        self._size = size if size is not None else (max(indices) + 1 if indices else 0)
+        if self._indices and self._indices[-1] >= self._size:
+            raise IndexError(f"Index out of range: {self._indices[-1]}")
+        self._norm = None
+
+    @classmethod
+    def from_dense(cls, vector: Vector) -> "SparseVector":
+        """Returns a `SparseVector` holding the same elements as the dense `vector`."""
+        return cls(range(len(vector.vec)), vector.vec, len(vector.vec))
+
+    def to_dense(self) -> Vector:
+        """Returns a dense `Vector` holding the same elements as `self`."""
+        elements = [0.0] * self._size
+        for index, value in self.items():
+            elements[index] = value
+        return Vector(elements)
+
+    def __getitem__(self, index: int) -> float:
+        if index < 0 or index >= self._size:
+            raise IndexError(f"Index out of range: {index}")
+        position = bisect_left(self._indices, index)
+        if position < len(self._indices) and self._indices[position] == index:
+            return self._values[position]
+        else:
+            return 0.0
+
+    def __eq__(self, other) -> bool:
+        if other is self:
+            return True
+        elif other is None or not isinstance(other, SparseVector):
+            return False
+        else:
+            return self._size == other.size and self._indices == other.indices and self._values == other.values
+
+    def __str__(self) -> str:
+        return str(dict(self.items()))
+
+    @property
+    def indices(self):
+        return self._indices
+
+    @property
+    def values(self):
+        return self._values
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def nnz(self):
+        return len(self._indices)
+
+    def items(self) -> Iterable[tuple[int, float]]:
+        """Returns an iterable of (index, value) pairs of the nonzero elements, sorted by index."""
+        return zip(self._indices, self._values)
+
+    def norm(self) -> float:
+        """Computes Euclidean norm of the vector, once."""
+        if self._norm is None:
+            self._norm = sqrt(sum([x ** 2 for x in self._values]))
+        return self._norm
+
+    def dot(self, other: object) -> float:
+        """Computes the Dot product of `self` and `other` vectors by walking their nonzero elements."""
+        if not isinstance(other, (Vector, SparseVector)):
+            raise ValueError(Vector._get_cannot_compute_msg("dot product", other))
+        return sum([v1 * v2 for v1, v2 in self.boolean_intersect(other)])
+
+    def cossim(self, other: object) -> float:
+        """Computes the Cosine similarity of `self` and `other` vectors."""
+        if not isinstance(other, (Vector, SparseVector)):
+            raise ValueError(Vector._get_cannot_compute_msg("cosine similarity", other))
+        else:
+            denominator = (self.norm() * other.norm())
+            if denominator:
+                return self.dot(other) / denominator
+            else:
+                return 0.0
+
+    def boolean_intersect(self, other: object) -> list[tuple[float, float]]:
+        """Returns a list of tuples of elements where both `self` and `other` had nonzero values."""
+        if isinstance(other, SparseVector):
+            intersection = []
+            i, j = 0, 0
+            indices1, indices2 = self._indices, other.indices
+            while i < len(indices1) and j < len(indices2):
+                if indices1[i] == indices2[j]:
+                    intersection.append((self._values[i], other.values[j]))
+                    i += 1
+                    j += 1
+                elif indices1[i] < indices2[j]:
+                    i += 1
+                else:
+                    j += 1
+            return intersection
+        elif isinstance(other, Vector):
+            elements = other.vec
+            return [(value, elements[index]) for index, value in self.items()
+                    if index < len(elements) and elements[index]]
+        else:
+            raise ValueError(Vector._get_cannot_compute_msg("boolean intersection", other))
+
+
+class LazyStemmer:
+    """This class stands in for the NLTK stemmer named `name` ("snowball", "porter" or "lancaster", of which only the
+       Snowball stemmer takes a `language`), importing NLTK and creating the stemmer the first time a word is stemmed.
+       It pickles as its configuration, so a saved `Preprocessor` is loaded without importing NLTK."""
+
+    STEMMERS = {
+        "snowball": ("nltk.stem.snowball", "SnowballStemmer"),
+        "porter": ("nltk.stem.porter", "PorterStemmer"),
+        "lancaster": ("nltk.stem.lancaster", "LancasterStemmer"),
+    }
+
+    def __init__(self, name: str = "snowball", language: str = "english"):
+        if name not in LazyStemmer.STEMMERS:
+            raise ValueError(f"Unknown stemmer: {name}")
+        self._name = name
+        self._language = language
+        self._stemmer: "StemmerI | None" = None
+
+    def __getstate__(self) -> dict:
+        return self.config
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["name"], state["language"])
+
+    @property
+    def config(self) -> dict[str, str]:
+        """The name and language of the stemmer, as passed to the constructor."""
+        return {"name": self._name, "language": self._language}
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the NLTK stemmer has been created (and NLTK imported)."""
+        return self._stemmer is not None
+
+    def stem(self, word: str) -> str:
+        """Returns the stem of `word`, creating the NLTK stemmer on first use."""
+        if self._stemmer is None:
+            module, class_name = LazyStemmer.STEMMERS[self._name]
+            stemmer_class = getattr(importlib.import_module(module), class_name)
+            self._stemmer = stemmer_class(self._language) if self._name == "snowball" else stemmer_class()
+        return self._stemmer.stem(word)
+
+
+class Preprocessor:
+    """This class is a reusable preprocessing pipeline that stems words and then removes the excluded (stop) words.
+       Stems are memoized in a bounded LRU cache shared by every document processed with the same pipeline, since
+       natural language text repeats the same words constantly, and excluded words are removed in a single pass.
+       Batches of documents can be processed over a process pool, each worker holding its own copy of the cache.
+       Words found in the `stem_table` of {word: stem} are never passed to the stemmer; a pipeline saved with the
+       table of every word of a corpus (see `build_stem_table`) and a `LazyStemmer` processes queries made of those
+       words without importing NLTK.
+       Documents given a legacy (exclude words, stemmer) tuple share the pipeline returned by `shared` for it."""
+
+    shared_size = 8  # number of pipelines kept by `shared`
+    _shared: OrderedDict = OrderedDict()  # {(id(exclude words), id(stemmer)): (exclude words, stemmer, pipeline)}
+
+    def __init__(self, exclude_words: set[str], stemmer: "StemmerI", cache_size: int | None = 2 ** 16,
+                 stem_table: dict[str, str] | None = None):
+        if not isinstance(exclude_words, set) or not callable(getattr(stemmer, "stem", None)):
+            raise ValueError(f"Invalid processor type(s): ({type(exclude_words)}, {type(stemmer)})")
+        self._exclude_words = exclude_words
+        self._stemmer = stemmer
+        self._cache_size = cache_size
+        self._stem_table: dict[str, str] = dict(stem_table) if stem_table else {}
+        self._stem = functools.lru_cache(maxsize=cache_size)(self._stem_word)
+
+    def __getstate__(self) -> dict:
+        return {"exclude_words": self._exclude_words, "stemmer": self._stemmer, "cache_size": self._cache_size,
+                "stem_table": self._stem_table}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["exclude_words"], state["stemmer"], state["cache_size"], state.get("stem_table"))
+
+    @classmethod
+    def shared(cls, exclude_words: set[str], stemmer: "StemmerI") -> "Preprocessor":
+        """Returns a pipeline of `exclude_words` and `stemmer` with the default bounded cache, the same one for every
+        call with these two objects as long as it is among the `shared_size` most recently used."""
+        key = (id(exclude_words), id(stemmer))
+        entry = cls._shared.get(key)
+        if entry is None or entry[0] is not exclude_words or entry[1] is not stemmer:
+            entry = cls._shared[key] = (exclude_words, stemmer, cls(exclude_words, stemmer))
+            if len(cls._shared) > cls.shared_size:
+                cls._shared.popitem(last=False)
+        cls._shared.move_to_end(key)
+        return entry[2]
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "Preprocessor":
+        """Returns the pipeline described by `state`, a dictionary returned by `to_dict`, with a `LazyStemmer`."""
+        return cls(set(state["exclude_words"]), LazyStemmer(**state["stemmer"]), state["cache_size"],
+                   state["stem_table"])
+
+    def to_dict(self) -> dict:
+        """Returns the excluded words, stemmer configuration, cache size and stem table of this pipeline as a JSON
+        serializable dictionary. Only the configuration of a `LazyStemmer` can be stored."""
+        if not isinstance(self._stemmer, LazyStemmer):
+            raise ValueError(f"Cannot store the configuration of stemmer: {type(self._stemmer)}")
+        return {"exclude_words": sorted(self._exclude_words), "stemmer": self._stemmer.config,
+                "cache_size": self._cache_size, "stem_table": self._stem_table}
+
+    @property
+    def exclude_words(self):
+        return self._exclude_words
+
+    @property
+    def stemmer(self):
+        return self._stemmer
+
+    @property
+    def stem_table(self):
+        return self._stem_table
+
+    def cache_info(self):
+        """Returns the hits, misses, maximum size and current size of the stem cache."""
+        return self._stem.cache_info()
+
+    def build_stem_table(self, words: Iterable[str]) -> None:
+        """Adds the stems of `words` to the stem table."""
+        stem = self._stem
+        for word in words:
+            if word not in self._stem_table:
+                self._stem_table[word] = stem(word)
+
+    def stem(self, word: str) -> str:
+        """Returns the stem of `word`, from the cache when it was stemmed before."""
+        return self._stem(word)
+
+    def _stem_word(self, word: str) -> str:
+        """Returns the stem of `word` from the stem table, or from the stemmer if it is not in the table."""
+        stem = self._stem_table.get(word)
+        return self._stemmer.stem(word) if stem is None else stem
+
+    def process(self, words: Iterable[str]) -> list[str]:
+        """Returns the stems of `words` that are not excluded words, in order."""
+        stem = self._stem
+        exclude_words = self._exclude_words
+        return [stemmed for stemmed in [stem(word) for word in words] if stemmed not in exclude_words]
+
+    def process_batch(self, word_lists: Iterable[Iterable[str]], processes: int = 1) -> list[list[str]]:
+        """Returns `process` applied to each of `word_lists`, over a pool of `processes` processes if more than one."""
+        word_lists = [list(words) for words in word_lists]
+        if processes <= 1:
+            return [self.process(words) for words in word_lists]
+
+        chunk_size = max(1, -(-len(word_lists) // (processes * 4)))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes, initializer=_init_preprocess_worker,
+                                                    initargs=(self,)) as executor:
+            return list(executor.map(_preprocess, word_lists, chunksize=chunk_size))
+
+
 class Document:
     """This class creates a Document containing a title and a list of words. There are methods that allow for
        things like filtration of a set of words, and stemming of words in a Document. There is also a method
-       that when given a term will the term frequency of that term in a Document."""
-    _iid = 0
+       that when given a term will the term frequency of that term in a Document.
+       A document can be `encode`d as an array of term ids against the vocabulary of a corpus, which is how a
+       compact `Corpus` stores its documents; `words` decodes them back."""
+
+    __slots__ = ("_iid", "_title", "_words", "_counts", "_vocabulary")
+    _next_iid = 0
 
-    def __init__(self, title: str = None, words: list[str] = None, processors: tuple[set[str], StemmerI] = None):
-        Document._iid += 1
-        self._iid = Document._iid
+    def __init__(self, title: str = None, words: list[str] = None,
+                 processors: Preprocessor | tuple[set[str], "StemmerI"] = None):
+        Document._next_iid += 1
+        self._iid = Document._next_iid
         self._title = title if title else f"(Untitled {self._iid})"
-        self._words = list(words) if words else []
+        self._words: list[str] | array = list(words) if words else []
+        self._counts: dict[str, int] | None = None
+        self._vocabulary: list[str] | None = None
 
         if processors:
-            exclude_words = processors[0]
-            stemmer = processors[1]
-            if not isinstance(exclude_words, set) or not isinstance(stemmer, StemmerI):
-                raise ValueError(f"Invalid processor type(s): ({type(exclude_words)}, {type(stemmer)})")
-            else:
-                self.stem_words(stemmer)
-                self.filter_words(exclude_words)
+            if not isinstance(processors, Preprocessor):
+                processors = Preprocessor.shared(processors[0], processors[1])
+            self._words = processors.process(self._words)
+
+    def __setstate__(self, state) -> None:
+        # documents pickled before they had slots were pickled as a dict, which lacks the newer slots
+        self._counts = self._vocabulary = None
+        for name, value in _slots_state(state).items():
+            setattr(self, name, value)
 
     def __iter__(self):
-        return iter(self._words)
+        return iter(self.words)
 
     def __eq__(self, other) -> bool:
         if other is self:
@@ -116,18 +419,19 @@ class Document:
         elif other is None or not isinstance(other, Document):
             return False
         else:
-            return self._title == other.title and self._words == other.words
+            return self._title == other.title and self.words == other.words
 
     def __hash__(self) -> int:
-        return hash((self._title, tuple(self._words)))
+        return hash((self._title, tuple(self.words)))
 
     def __str__(self) -> str:
         words_preview = ["["]
         preview_size = 5
         index = 0
+        words = self.words
 
-        while index < len(self._words) and index < preview_size:
-            words_preview.append(f"{self._words[index]}, ")
+        while index < len(words) and index < preview_size:
+            words_preview.append(f"{words[index]}, ")
             index += 1
         words_preview.append("... ]")
 
@@ -146,62 +450,451 @@ class Document:
         return self._title
 
     @property
-    def words(self):
-        return self._words
+    def words(self) -> list[str]:
+        if self._vocabulary is None:
+            return self._words
+        vocabulary = self._vocabulary
+        return [vocabulary[term_id] for term_id in self._words]
+
+    @property
+    def encoded(self) -> bool:
+        """Whether the words of this document are stored as an array of term ids, see `encode`."""
+        return self._vocabulary is not None
+
+    @property
+    def counts(self) -> dict[str, int]:
+        """The term-count table of this document as a dictionary of {term: number of occurrences in `_words`}.
+
+        The table is computed once and kept until `_words` is changed by `filter_words`, `stem_words` or `encode`.
+
+        """
+        if self._counts is None:
+            counts = {}
+            for word in self._words:
+                counts[word] = counts.get(word, 0) + 1
+            if self._vocabulary is not None:  # the table was counted over term ids
+                vocabulary = self._vocabulary
+                counts = {vocabulary[term_id]: count for term_id, count in counts.items()}
+            self._counts = counts
+        return self._counts
+
+    def encode(self, terms: dict[str, int], vocabulary: list[str]) -> None:
+        """Stores the words of this document as an `array('I')` of their ids in `terms`, and drops the term-count
+        table. `vocabulary` is the list of the terms by id, which is shared by every document encoded with it and is
+        used to decode `words`. Every word of the document must be in `terms`."""
+        if self._vocabulary is not vocabulary:
+            self._words = array('I', [terms[word] for word in self.words])
+            self._vocabulary = vocabulary
+        self._counts = None
 
     def filter_words(self, exclude_words: set[str]) -> None:
-        """Removes any words from `_words` that appear in `exclude_words` passed in."""
-        counter = 0
-        words = self._words
-        while counter < len(words):  # check that words isn't empty
-            if words[counter] in exclude_words:
-                words.remove(words[counter])
-                # if an item is removed don't advance counter because it shifts the index back one
-                counter += 0
-            else:
-                # if no item is removed advance the counter
-                counter += 1
+        """Removes any words from `_words` that appear in `exclude_words` passed in, in a single pass."""
+        self._words = [word for word in self.words if word not in exclude_words]
+        self._vocabulary = None
+        self._counts = None
 
-    def stem_words(self, stemmer: StemmerI) -> None:
-        """Stems each word in `_words` using SnowballStemmer that gets passed in."""
-        stemmer = SnowballStemmer(language='english')  # create a variable for the stemmer
+    def stem_words(self, stemmer: "StemmerI") -> None:
+        """Stems each word in `_words` using the stemmer that gets passed in."""
         stemmed_words = []  # create an empty list to append the stemmed word to
-        words = self._words
+        words = self.words
         for word in words:
-            stem_word = stemmer.stem(word)  # stem the word using the SnowballStemmer
+            stem_word = stemmer.stem(word)  # stem the word using the stemmer passed in
             stemmed_words.append(stem_word)  # add the stemmed word to the stemmed words list
         self._words = stemmed_words
+        self._vocabulary = None
+        self._counts = None
 
     def tf(self, term: str) -> int:
-        """Computes and return the term frequency of the `term` passed in among `_words`."""
-        counter = 0
-        words = self._words
-        # if not type None and if the word matches the term add 1 to the counter
-        if not None:
-            for word in words:
-                if word == term:
-                    counter += 1
-            return counter
-
-
-class Corpus:
+        """Returns the term frequency of the `term` passed in among `_words`, looked up in the term-count table."""
+        return self.counts.get(term, 0)
+
+
+class QueryCache:
+    """This class is a bounded LRU cache of ranked query results. Entries are tagged with the version of the corpus
+       they were computed against, and the whole cache is cleared as soon as it is used with a different version.
+       Lookups and insertions are thread safe, so a corpus can be searched from several threads at once."""
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError(f"Invalid cache capacity: {capacity}")
+        self._capacity = capacity
+        self._entries: OrderedDict = OrderedDict()
+        self._version: int | None = None
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    @staticmethod
+    def key(query_doc: "Document", k: int) -> tuple[tuple[str, ...], int]:
+        """Returns the cache key of `query_doc`: its sorted (processed) words, which only depend on the term multiset,
+        and the number of results `k`."""
+        return tuple(sorted(query_doc.words)), k
+
+    def get(self, key: tuple, version: int) -> list | None:
+        """Returns the results cached for `key` against corpus `version`, or None on a miss."""
+        with self._lock:
+            self._validate(version)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return list(self._entries[key])
+            else:
+                self._misses += 1
+                return None
+
+    def put(self, key: tuple, version: int, results: list) -> None:
+        """Caches `results` for `key` against corpus `version`, evicting the least recently used entry if full."""
+        with self._lock:
+            self._validate(version)
+            self._entries[key] = list(results)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Removes every entry from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def _validate(self, version: int) -> None:
+        """Clears the cache if its entries were computed against a different corpus version."""
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+
+class TfIdfView(Mapping):
+    """This class is the read-only {document title: TF-IDF vector} mapping of a lazy `Corpus`. A vector is computed
+       from the document's term counts and the current document frequencies the first time it is looked up, and the
+       `capacity` most recently used vectors are kept. `materialize` computes and keeps every vector. The view
+       follows the corpus: its vectors are dropped as soon as the documents of the corpus change."""
+
+    def __init__(self, corpus: "Corpus", capacity: int):
+        if capacity <= 0:
+            raise ValueError(f"Invalid cache capacity: {capacity}")
+        self._corpus = corpus
+        self._capacity = capacity
+        self._entries: OrderedDict = OrderedDict()
+        self._doc_ids: dict[str, int] | None = None
+        self._version: int | None = None
+        self._materialized = False
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state.update({"_entries": OrderedDict(), "_doc_ids": None, "_version": None, "_materialized": False})
+        return state
+
+    def __getitem__(self, title: str) -> "Vector | SparseVector":
+        self._validate()
+        if title in self._entries:
+            self._entries.move_to_end(title)
+            return self._entries[title]
+        vector = self._corpus.compute_tf_idf_vector(index=self._doc_ids[title])
+        self._entries[title] = vector
+        if not self._materialized and len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+        return vector
+
+    def __contains__(self, title) -> bool:
+        self._validate()
+        return title in self._doc_ids
+
+    def __iter__(self):
+        self._validate()
+        return iter(self._doc_ids)
+
+    def __len__(self) -> int:
+        self._validate()
+        return len(self._doc_ids)
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def num_cached(self) -> int:
+        """The number of vectors currently kept."""
+        self._validate()
+        return len(self._entries)
+
+    def materialize(self) -> None:
+        """Computes the vector of every document and keeps them all until the documents of the corpus change."""
+        self._validate()
+        self._materialized = True
+        for title in self._doc_ids:
+            self[title]
+
+    def _validate(self) -> None:
+        """Drops the kept vectors if the documents of the corpus changed since they were computed."""
+        if self._version != self._corpus.version:
+            self._entries.clear()
+            self._materialized = False
+            self._doc_ids = {doc.title: doc_id for doc_id, doc in enumerate(self._corpus.docs)}
+            self._version = self._corpus.version
+
+
+class PostingsSearch:
+    """This class holds the ranking logic shared by the searchable indexes of this package. Subclasses provide
+       `_index`, a mapping of {term id: posting list of (document id, weight) tuples sorted by document id},
+       `_norms`, a sequence of document norms indexed by document id, `_impacts`, a mapping of
+       {term id: (min impact, max impact)}, `__len__`, the number of documents, `_title`, which maps a document id to
+       its title, and `_compute_query_weights`, which maps a query document to its {term id: weight} dictionary.
+       Query phases and the postings they touch are recorded in `metrics`."""
+
+    _metrics: Metrics = NULL_METRICS
+
+    @property
+    def metrics(self) -> Metrics:
+        return self._metrics
+
+    @metrics.setter
+    def metrics(self, metrics: Metrics | None) -> None:
+        self._metrics = metrics if metrics is not None else NULL_METRICS
+
+    def search_batch(self, query_docs: Iterable[Document], k: int = 10,
+                     block_size: int = 256) -> list[list[tuple[str, float]]]:
+        """Returns the ranked results of `search` for each of `query_docs`, scoring blocks of queries together.
+
+        Each block visits the posting list of every distinct query term once, accumulating the scores of all
+        queries of the block that use the term, and identical queries in a block are only scored once.
+
+        """
+        results = []
+        query_docs = list(query_docs)
+        for start in range(0, len(query_docs), block_size):
+            with self._metrics.phase("query.weights"):
+                block = [tuple(sorted(self._compute_query_weights(query_doc).items()))
+                         for query_doc in query_docs[start:start + block_size]]
+                distinct = list(dict.fromkeys(block))
+            with self._metrics.phase("query.scoring"):
+                block_scores = self._score_block([dict(query) for query in distinct])
+            with self._metrics.phase("query.ranking"):
+                ranked = {query: [(self._title(doc_id), score) for doc_id, score in self._rank(scores, k)]
+                          for query, scores in zip(distinct, block_scores)}
+                results.extend([list(ranked[query]) for query in block])
+        self._metrics.count("query.queries", len(query_docs))
+        return results
+
+    def _score_block(self, block: list[dict[int, float]]) -> list[dict[int, float]]:
+        """Returns the scores `_score_exhaustive` gives each query weights dictionary of `block`, visiting each posting
+        list once for the whole block."""
+        users = {}  # {term id: [(position of the query in the block, query weight)]}
+        for position, query_weights in enumerate(block):
+            for term_id, query_weight in query_weights.items():
+                users.setdefault(term_id, []).append((position, query_weight))
+
+        contributions = [{} for _ in block]
+        touched = 0
+        for term_id, term_users in users.items():
+            postings = self._index.get(term_id, ())
+            touched += len(postings)
+            for doc_id, weight in postings:
+                for position, query_weight in term_users:
+                    contributions[position].setdefault(doc_id, []).append(query_weight * weight)
+        self._metrics.count("query.postings_touched", touched)
+
+        scores = []
+        for query_weights, query_contributions in zip(block, contributions):
+            query_norm = sqrt(math.fsum([weight ** 2 for weight in query_weights.values()]))
+            query_scores = {}
+            for doc_id, products in query_contributions.items():
+                denominator = query_norm * self._norms[doc_id]
+                query_scores[doc_id] = math.fsum(products) / denominator if denominator else 0.0
+            scores.append(query_scores)
+        return scores
+
+    def _score_exhaustive(self, query_weights: dict[int, float]) -> dict[int, float]:
+        """Returns the cosine similarity of every document matching `query_weights` as a dictionary of {doc id: score}.
+
+        All postings of the query terms are visited, and the products of each document are summed with `math.fsum`
+        so that the score does not depend on the order the terms are visited in.
+
+        """
+        return self._score_block([query_weights])[0]
+
+    def _search_top_k(self, query_weights: dict[int, float], k: int) -> list[tuple[int, float]]:
+        """Returns the `k` best (document id, score) pairs for `query_weights`, exactly as `_rank` would rank the
+        scores of `_score_exhaustive`.
+
+        Documents are visited in document id order (document-at-a-time) while a bounded heap keeps the best `k`.
+        Query terms are sorted by the largest contribution they can make to a score, computed from the impacts of
+        their posting lists (MaxScore). Once the heap is full, the terms whose summed bounds cannot lift a document
+        above the k-th best score are no longer used to find candidates, and are only probed for documents whose
+        score could still enter the heap. Since later documents lose ties, the ranking stays exact.
+
+        """
+        k = min(k, len(self))
+        query_norm = sqrt(math.fsum([weight ** 2 for weight in query_weights.values()]))
+        if not k or not query_norm:
+            return self._rank({}, k)
+
+        lists = []
+        for term_id, query_weight in query_weights.items():
+            if term_id in self._index:
+                low, high = self._impacts[term_id]
+                bound = max(0.0, query_weight * low, query_weight * high) / query_norm
+                lists.append((bound, query_weight, self._index[term_id]))
+        lists.sort(key=lambda item: item[0])
+        upper_bounds = []  # upper_bounds[i] bounds the score a document can get from lists[0] to lists[i]
+        for bound, _, _ in lists:
+            upper_bounds.append(bound + (upper_bounds[-1] if upper_bounds else 0.0))
+        slack = 1e-12  # keeps floating point error in the bounds from pruning a document on the threshold
+
+        heap = []  # (score, -doc id) of the best documents found so far, worst first
+        threshold = 0.0  # only documents that score above zero are kept in the heap
+        essential = 0  # only lists[essential:] can produce candidates
+        positions = [0] * len(lists)
+
+        while True:
+            candidate = min([postings[positions[i]][0] for i, (_, _, postings) in enumerate(lists)
+                             if i >= essential and positions[i] < len(postings)], default=None)
+            if candidate is None:
+                break
+
+            products = []
+            for i in range(essential, len(lists)):
+                _, query_weight, postings = lists[i]
+                if positions[i] < len(postings) and postings[positions[i]][0] == candidate:
+                    products.append(query_weight * postings[positions[i]][1])
+                    positions[i] += 1
+
+            denominator = query_norm * self._norms[candidate]
+            for i in range(essential - 1, -1, -1):
+                if sum(products) / denominator + upper_bounds[i] + slack < threshold:
+                    break
+                _, query_weight, postings = lists[i]
+                positions[i] = bisect_left(postings, (candidate,), positions[i])
+                if positions[i] < len(postings) and postings[positions[i]][0] == candidate:
+                    products.append(query_weight * postings[positions[i]][1])
+                    positions[i] += 1
+            else:
+                score = math.fsum(products) / denominator
+                if len(heap) < k and score > 0:
+                    heapq.heappush(heap, (score, -candidate))
+                elif len(heap) == k and score > heap[0][0]:
+                    heapq.heapreplace(heap, (score, -candidate))
+                if len(heap) == k:
+                    threshold = heap[0][0]
+                    while essential < len(lists) and upper_bounds[essential] + slack < threshold:
+                        essential += 1
+
+        self._metrics.count("query.postings_touched", sum(positions))
+        if len(heap) < k:  # fewer than k documents scored above zero, so zero and negative scores are ranked too
+            return self._rank(self._score_exhaustive(query_weights), k)
+        return [(-negated_doc_id, score) for score, negated_doc_id in sorted(heap, reverse=True)]
+
+    def _rank(self, scores: dict[int, float], k: int) -> list[tuple[int, float]]:
+        """Returns the `k` best (document id, score) pairs given the `scores` of the matched documents.
+
+        Documents missing from `scores` score 0.0. Ties are broken by document id, which is the order a stable sort
+        over every document in the corpus would produce; unmatched documents are only enumerated when fewer than
+        `k` documents scored above zero.
+
+        """
+        k = min(k, len(self))
+        ranked = sorted([(doc_id, score) for doc_id, score in scores.items() if score > 0],
+                        key=lambda item: (-item[1], item[0]))
+        if len(ranked) < k:
+            ranked.extend([(doc_id, 0.0) for doc_id in range(len(self)) if not scores.get(doc_id, 0.0)])
+            ranked.extend(sorted([(doc_id, score) for doc_id, score in scores.items() if score < 0],
+                                 key=lambda item: (-item[1], item[0])))
+        return ranked[:k]
+
+
+class Corpus(PostingsSearch):
     """This Class creates a Corpus, which is a list of Documents, and uses the implemented methods
        to perform tasks such as computing a unique, stemmed, and filtered corpus, computing the
        document frequencies of a term, computing the document frequencies of all terms in a document
        and returning an indexed dictionary, computing tf-idf score of a term in a document, computing
-       the tf-idf vector for a given document, and computing the tf-idf matrix for an entire corpus."""
+       the tf-idf vector for a given document, and computing the tf-idf matrix for an entire corpus.
+       Documents can be added, removed and updated after construction, in which case the weights that depend
+       on the IDF are recomputed in one batch (`refresh`) the next time they are needed.
+       A `compact` corpus trades exactness of the last float digits for memory: its documents are encoded as term id
+       arrays against `terms`, its inverted index is stored as `CompressedPostings` with float32 weights, and its
+       TF-IDF vectors are sparse.
+       A `lazy` corpus returns from construction once the term statistics are computed: `tf_idf` is a `TfIdfView`
+       computing vectors on demand and keeping the `vector_cache_size` most recently used, and the inverted index is
+       built the first time it is needed (or by `materialize`).
+       A corpus built with `positions` also stores the positions of every term in every document as
+       `PositionalPostings`, which `search_phrases` intersects to answer phrase and proximity queries.
+       Weights are computed by the `weighting` scheme (`TfIdf` by default, see `vector_space_weighting`) from the
+       `statistics` of the corpus. Setting another scheme recomputes the weights from the statistics, and the
+       weights of the `weights_cache_size` most recently used schemes are kept until the documents change."""
+
+    weights_cache_size = 4
 
-    def __init__(self, documents: list[Document], threads=1, debug=False):
-        self._docs: list[Document] = documents
+    def __init__(self, documents: list[Document], threads=1, debug=False, sparse=False, processes=1, cache_size=0,
+                 metrics: Metrics | None = None, compact=False, lazy=False, vector_cache_size=1024, positions=False,
+                 weighting: WeightingScheme | None = None):
+        self._docs: list[Document] = list(documents)
 
         # Setting flags.
         self._threads: int = threads
         self._debug: bool = debug
+        self._sparse: bool = sparse or compact
+        self._compact: bool = compact
+        self._lazy: bool = lazy
+        self._store_positions: bool = positions
+        self._positions: PositionalPostings | None = None
+        self._processes: int = processes
+        self._version: int = 0
+        self._terms_version: int = 0
+        self._stale: bool = lazy
+        self._cache: QueryCache | None = QueryCache(cache_size) if cache_size else None
+        self._metrics: Metrics = debug_metrics(debug, metrics)
+        self._preprocessor: Preprocessor | None = None
+        self._weighting: WeightingScheme = weighting if weighting is not None else TfIdf()
+        self._statistics: CorpusStatistics | None = None
+        self._total_length: int | None = None
+        self._weights_cache: OrderedDict = OrderedDict()  # {scheme key: (tf-idf, index, norms, impacts)}
 
         # Bulk of the processing (and runtime) occurs here.
-        self._terms = self._compute_terms()
-        self._dfs = self._compute_dfs()
-        self._tf_idf = self._compute_tf_idf_matrix()
+        with self._metrics.phase("corpus.terms_and_dfs"):
+            self._terms, self._dfs = self._compute_term_statistics()
+        if lazy:
+            self._tf_idf: dict[str, Vector | SparseVector] | TfIdfView = TfIdfView(self, vector_cache_size)
+        else:
+            self._build_weights()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state.pop("_metrics", None)  # metrics belong to the running process, not to the persisted corpus
+        state.update({"_statistics": None, "_weights_cache": OrderedDict()})  # both are recomputed on demand
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        # corpora pickled before these were stored use the defaults, and those pickled before the inverted index
+        # compute their weights again the next time they are used
+        self.__dict__.update({"_sparse": False, "_compact": False, "_lazy": False, "_store_positions": False,
+                              "_positions": None, "_processes": 1, "_version": 0, "_terms_version": 0,
+                              "_stale": "_index" not in state, "_cache": None, "_preprocessor": None,
+                              "_weighting": TfIdf(), "_statistics": None, "_total_length": None,
+                              "_weights_cache": OrderedDict()})
+        self.__dict__.update(state)
 
     def __getitem__(self, index) -> Document:
         if 0 <= index < len(self._docs):
@@ -221,6 +914,7 @@ class Corpus:
 
     @property
     def terms(self):
+        self._refresh_terms()
         return self._terms
 
     @property
@@ -229,72 +923,357 @@ class Corpus:
 
     @property
     def tf_idf(self):
+        """The TF-IDF matrix, as a dictionary of {document title: TF-IDF vector}, or a `TfIdfView` if `lazy`."""
+        if self._lazy:
+            self._refresh_terms()
+        else:
+            self.refresh()
         return self._tf_idf
 
+    @property
+    def lazy(self):
+        return self._lazy
+
+    @property
+    def index(self):
+        self.refresh()
+        return self._index
+
+    @property
+    def norms(self):
+        self.refresh()
+        return self._norms
+
+    @property
+    def weighting(self):
+        """The `WeightingScheme` of the weights of this corpus."""
+        return self._weighting
+
+    @weighting.setter
+    def weighting(self, weighting: WeightingScheme) -> None:
+        """Switches to the `weighting` scheme, whose weights are computed from the statistics of the corpus (or
+        taken from the cache) by the next `refresh`. The version is bumped, so cached results are invalidated."""
+        self._weighting = weighting
+        self._stale = True
+        self._version += 1
+
+    @property
+    def statistics(self):
+        """The `CorpusStatistics` (term counts, document lengths and document frequencies) of this corpus, which are
+        kept once built. Vectors and query weights only need the document count and average document length, so
+        computing them does not build the statistics."""
+        self._refresh_terms()
+        if self._statistics is None:
+            with self._metrics.phase("corpus.statistics"):
+                self._statistics = CorpusStatistics([doc.counts for doc in self._docs], self._terms, self._dfs)
+        return self._statistics
+
+    @property
+    def positions(self):
+        """The `PositionalPostings` of {term id: [(document id, positions)]}, or None unless built with `positions`."""
+        self.refresh()
+        return self._positions
+
+    @property
+    def cache(self):
+        """The `QueryCache` of ranked results of `search` and `search_batch`, or None if caching is disabled."""
+        return self._cache
+
+    @property
+    def preprocessor(self):
+        """The `Preprocessor` the documents were processed with, which is saved with the corpus so that queries can
+        be processed the same way when it is loaded, or None if it was not set."""
+        return getattr(self, "_preprocessor", None)  # corpora pickled before it was stored have none
+
+    @preprocessor.setter
+    def preprocessor(self, preprocessor: Preprocessor | None) -> None:
+        self._preprocessor = preprocessor
+
+    @property
+    def version(self):
+        """A counter that is incremented every time the documents of this corpus change."""
+        return self._version
+
+    @property
+    def stale(self):
+        """Whether the IDF-dependent weights are out of date and will be recomputed by the next `refresh`."""
+        return self._stale
+
+    def add_documents(self, documents: Iterable[Document]) -> None:
+        """Appends `documents` to the corpus, updating the document frequencies from their term-count tables."""
+        for doc in documents:
+            self._docs.append(doc)
+            self._add_statistics(doc)
+        self._invalidate()
+
+    def remove_documents(self, titles: Iterable[str]) -> None:
+        """Removes every document whose title is in `titles` from the corpus, updating the document frequencies."""
+        titles = set(titles)
+        missing = titles - {doc.title for doc in self._docs}
+        if missing:
+            raise ValueError(f"No document(s) titled: {sorted(missing)}")
+
+        kept = []
+        for doc in self._docs:
+            if doc.title in titles:
+                self._remove_statistics(doc)
+            else:
+                kept.append(doc)
+        self._docs = kept
+        self._invalidate()
+
+    def update_document(self, document: Document) -> None:
+        """Replaces the first document titled `document.title` with `document`, keeping its position (document id)."""
+        for doc_id, doc in enumerate(self._docs):
+            if doc.title == document.title:
+                self._remove_statistics(doc)
+                self._docs[doc_id] = document
+                self._add_statistics(document)
+                self._invalidate()
+                return
+        raise ValueError(f"No document titled: {document.title}")
+
+    def refresh(self) -> None:
+        """Recomputes the terms, TF-IDF matrix, inverted index and impacts from the stored statistics if any document
+        was added, removed or updated since they were last computed. Documents are not re-tokenized or re-counted."""
+        if self._stale:
+            self._stale = False
+            self._refresh_terms()
+            self._build_weights()
+
+    def materialize(self) -> None:
+        """Computes everything a lazy corpus defers: the inverted index and the TF-IDF vector of every document."""
+        self.refresh()
+        if self._lazy:
+            self._tf_idf.materialize()
+
+    def _refresh_terms(self) -> None:
+        """Re-indexes the terms from the document frequencies if any document changed since they were indexed."""
+        if self._terms_version != self._version:
+            self._terms = self._build_index_dict(list(self._dfs))
+            self._terms_version = self._version
+
+    def _build_weights(self) -> None:
+        """Computes the IDF-dependent state of this corpus: TF-IDF matrix, inverted index, norms and impacts, or
+        takes them from the cache if the weighting scheme was used since the documents last changed."""
+        key = self._weighting.key
+        if key in self._weights_cache:
+            self._weights_cache.move_to_end(key)
+            self._tf_idf, self._index, self._norms, self._impacts = self._weights_cache[key]
+            self._metrics.count("corpus.weights_cache_hits")
+            return
+
+        with self._metrics.phase("corpus.weights"):
+            self._tf_idf, self._index, self._norms = self._compute_weights()
+        if self._compact:
+            with self._metrics.phase("corpus.compaction"):
+                self._compact_index()
+        if self._store_positions and self._positions is None:
+            with self._metrics.phase("corpus.positions"):
+                terms = self._terms
+                self._positions = PositionalPostings([terms[word] for word in doc.words] for doc in self._docs)
+        with self._metrics.phase("corpus.impacts"):
+            self._impacts = self._compute_impacts()
+        self._weights_cache[key] = (self._tf_idf, self._index, self._norms, self._impacts)
+        if len(self._weights_cache) > self.weights_cache_size:
+            self._weights_cache.popitem(last=False)
+        self._metrics.count("corpus.documents_indexed", len(self._docs))
+        self._metrics.count("corpus.postings_indexed", sum([len(postings) for postings in self._index.values()]))
+
+    def _compact_index(self) -> None:
+        """Compresses the inverted index, recomputes the norms from its float32 weights so that a document is still
+        similar to itself, and encodes every document against the terms."""
+        self._index = CompressedPostings(self._index)
+        if self._weighting.cosine_normalized:
+            squares = [0.0] * len(self._docs)
+            for term_id in self._index:
+                for doc_id, weight in self._index[term_id]:
+                    squares[doc_id] += weight ** 2
+            self._norms = array('d', [sqrt(square) for square in squares])
+        else:
+            self._norms = array('d', self._norms)
+
+        vocabulary = list(self._terms)
+        for doc in self._docs:
+            doc.encode(self._terms, vocabulary)
+
+    def _add_statistics(self, doc: Document) -> None:
+        """Adds the terms of `doc` to the document frequencies of this corpus."""
+        for term in doc.counts:
+            self._dfs[term] = self._dfs.get(term, 0) + 1
+
+    def _remove_statistics(self, doc: Document) -> None:
+        """Removes the terms of `doc` from the document frequencies of this corpus, dropping terms no longer used."""
+        for term in doc.counts:
+            if self._dfs[term] > 1:
+                self._dfs[term] -= 1
+            else:
+                del self._dfs[term]
+
+    def _invalidate(self) -> None:
+        """Marks the IDF-dependent weights as out of date, drops the statistics, positions and weights computed from
+        the documents, and bumps the version of this corpus."""
+        self._stale = True
+        self._version += 1
+        self._statistics = self._positions = self._total_length = None
+        self._weights_cache.clear()
+
+    def _compute_term_statistics(self) -> tuple[dict[str, int], dict[str, int]]:
+        """Computes and returns the terms and the document frequencies of the corpus in a single pass.
+
+        Each document contributes one to the document frequency of every entry of its term-count table, so the cost
+        is proportional to the total number of tokens. Terms are indexed in order of first occurrence. When more
+        than one process is used, documents are sharded across a process pool that counts terms and partial document
+        frequencies, which are then merged in shard order.
+
+        """
+        dfs = {}
+        if self._processes > 1:
+            shards = Corpus._shard(self._docs, self._processes)
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self._processes) as executor:
+                results = executor.map(_count_terms, [[doc.words for doc in shard] for shard in shards])
+                for shard, (shard_counts, shard_dfs) in zip(shards, results):
+                    for doc, counts in zip(shard, shard_counts):
+                        doc._counts = counts
+                    for term, df in shard_dfs.items():
+                        dfs[term] = dfs.get(term, 0) + df
+        else:
+            for doc in self._docs:
+                for term in doc.counts:
+                    dfs[term] = dfs.get(term, 0) + 1
+        return self._build_index_dict(list(dfs)), dfs
+
     def _compute_terms(self) -> dict[str, int]:
         """Computes and returns the terms (unique, stemmed, and filtered words) of the corpus."""
-        new_set = set()  # create a set so that values are unique
-        for document in self._docs:
-            new_set.update(document.words)  # update the set with the words in the current document
-        new_set = list(new_set)  # make the set into a list
-        return self._build_index_dict(new_set)  # return the list of words as an indexed dictionary
+        return self._compute_term_statistics()[0]
 
     def _compute_df(self, term) -> int:
         """Computes and returns the document frequency of the `term` in the context of this corpus (`self`)."""
-        if self._debug:
-            print(f"Started working on DF for '{term}'")
-            sys.stdout.flush()
-
-        def check_membership(t: str, doc: Document) -> bool:
-            """An efficient method to check if the term `t` occurs in a list of words `doc`."""
-            for word in doc:
-                if word == t:
-                    return True
-            return False
-
-        return sum([1 if check_membership(term, doc) else 0 for doc in self._docs])
+        return sum([1 if term in doc.counts else 0 for doc in self._docs])
 
     def _compute_dfs(self) -> dict[str, int]:
         """Computes document frequencies for each term in this corpus and returns a dictionary of {term: df}s."""
-        if self._threads > 1:
-            return Corpus._compute_dict_multithread(self._threads, self._compute_df, self._terms.keys())
-        else:
-            return {term: self._compute_df(term) for term in self._terms.keys()}
+        return self._compute_term_statistics()[1]
 
     def _compute_tf_idf(self, term, doc=None, index=None):
-        """Computes and returns the TF-IDF score for the term and a given document.
+        """Computes and returns the TF-IDF score (the weight of the weighting scheme) for the term and a given
+        document.
 
         An arbitrary document may be passed in directly (`doc`) or be passed as an `index` within the corpus.
 
         """
         dfs = self._dfs
         doc = self._get_doc(doc, index)
-        if term in doc.words and len(self.docs) > 1:  # if a term is in a doc and not at end of doc
-            tf_idf = (math.log10(1 + doc.tf(term))) * (math.log10(len(self.docs) / (1 + dfs[term])))  # tf-idf formula
-            return tf_idf  # return score
-        else:
-            return 0.0  # if the term is not present in the doc, return a score of 0
+        tf = doc.tf(term)
+        return self._weighting.document_weight(tf, dfs[term] if tf else 0, sum(doc.counts.values()), len(self._docs),
+                                               self._avg_doc_length())
 
-    def compute_tf_idf_vector(self, doc=None, index=None) -> Vector:
+    def compute_tf_idf_vector(self, doc=None, index=None, sparse=None) -> Vector | SparseVector:
         """Computes and returns the TF-IDF vector for the given document.
         An arbitrary document may be passed in directly (`doc`) or be passed as an `index` within the corpus.
+        A `SparseVector` is returned when `sparse` is set, which defaults to the `sparse` flag of this corpus.
         """
+        terms = self.terms
+        weighting = self._weighting
+        num_docs = len(self._docs)
         doc = self._get_doc(doc, index)
-        tf_idf_list = []    # create a list to store tf-idf scores
-        for term in self._terms:
-            tf_idfs = self._compute_tf_idf(term, doc)   # compute the tf-idf for the current doc
-            tf_idf_list.append(tf_idfs)  # append the tf-idf score to the tf-idfs score list
+        document_factor = weighting.document_factor(sum(doc.counts.values()), self._avg_doc_length())
+        term_ids, tf_idfs = [], []
+        for term, tf in doc.counts.items():  # only the terms of the doc can have a nonzero tf-idf score
+            if term in terms:
+                term_ids.append(terms[term])
+                tf_idfs.append(weighting.weight(tf, weighting.term_factor(self._dfs[term], num_docs), document_factor))
+
+        return self._to_vector(term_ids, tf_idfs, sparse)
+
+    def _to_vector(self, term_ids: list[int], tf_idfs: list[float], sparse=None) -> Vector | SparseVector:
+        """Returns the TF-IDF vector holding `tf_idfs` at `term_ids`, sparse as in `compute_tf_idf_vector`."""
+        if self._sparse if sparse is None else sparse:
+            return SparseVector(term_ids, tf_idfs, len(self._terms))
+        tf_idf_list = [0.0] * len(self._terms)    # create a list to store tf-idf scores
+        for term_id, tf_idf in zip(term_ids, tf_idfs):
+            tf_idf_list[term_id] = tf_idf
         return Vector(tf_idf_list)  # return the list as a vector
 
-    def _compute_tf_idf_matrix(self) -> dict[str, Vector]:
+    def _compute_weights(self) -> tuple[dict[str, Vector | SparseVector], dict[int, list[tuple[int, float]]],
+                                        list[float]]:
+        """Computes and returns the TF-IDF matrix, the inverted index and the document norms of this corpus.
+
+        The weights of every document are computed in one pass over the `statistics` of the corpus by the weighting
+        scheme, and the matrix, index and norms are assembled from them; the vectors of the matrix are assembled by
+        `threads` threads if more than one. When more than one process is used, the rows of the documents are
+        computed by a process pool, whose workers receive the terms and their factors once. Exceptions raised by a
+        worker are propagated.
+
+        The inverted index is a dictionary of {term id: posting list}, where a posting list holds a
+        (document id, TF-IDF weight) tuple for every document the term has a nonzero weight in, sorted by document
+        id. A document id is the position of the document within the corpus, and `norms[document id]` is the
+        Euclidean norm of that document's TF-IDF vector (see `WeightingScheme.norm` for schemes that are not cosine
+        normalized).
+
+        """
+        if self._processes <= 1:
+            statistics = self.statistics
+            weights = self._weighting.document_weights(statistics)
+            offsets = statistics.doc_offsets
+            rows = [(statistics.term_ids[offsets[doc_id]:offsets[doc_id + 1]],
+                     weights[offsets[doc_id]:offsets[doc_id + 1]]) for doc_id in range(len(self._docs))]
+        else:
+            rows = self._compute_weight_rows()
+
+        if self._lazy:
+            tf_idf = self._tf_idf
+        elif self._threads > 1:
+            tf_idf = Corpus._compute_dict_multithread(self._threads,
+                                                      lambda row: self._to_vector(list(row[0]), list(row[1])),
+                                                      zip(self._docs, rows), lambda item: item[1],
+                                                      lambda item: item[0].title)
+        else:
+            tf_idf = {}
+        assemble = not self._lazy and self._threads <= 1
+        index, norms = {}, []
+        for doc_id, (doc, (term_ids, tf_idfs)) in enumerate(zip(self._docs, rows)):
+            if assemble:
+                tf_idf[doc.title] = self._to_vector(list(term_ids), list(tf_idfs))
+            squares = 0.0
+            for term_id, weight in zip(term_ids, tf_idfs):
+                if weight:
+                    index.setdefault(term_id, []).append((doc_id, weight))
+                    squares += weight ** 2
+            norms.append(self._weighting.norm(squares))
+        return tf_idf, index, norms
+
+    def _compute_weight_rows(self) -> list[tuple[list[int], list[float]]]:
+        """Computes and returns the (term ids, weights) row of every document over a pool of `processes` processes."""
+        weighting = self._weighting
+        num_docs = len(self._docs)
+        term_factors = {term: weighting.term_factor(self._dfs[term], num_docs) for term in self._terms}
+        shards = Corpus._shard(self._docs, self._processes)
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=self._processes, initializer=_init_weights_worker,
+                initargs=(self._terms, term_factors, weighting, self._avg_doc_length())) as executor:
+            return [row for shard_rows in executor.map(_compute_weight_rows, [[doc.counts for doc in shard]
+                                                                              for shard in shards])
+                    for row in shard_rows]
+
+    def _avg_doc_length(self) -> float:
+        """Returns the average number of words of the documents of this corpus, or 0.0 if the weighting scheme does not
+        use document lengths. It is taken from the `statistics` if they were built, and otherwise computed from the
+        term-count tables and kept until the documents change."""
+        if not self._weighting.uses_document_length or not self._docs:
+            return 0.0
+        if self._statistics is not None:
+            return self._statistics.avg_doc_length
+        if self._total_length is None:
+            self._total_length = sum([sum(doc.counts.values()) for doc in self._docs])
+        return self._total_length / len(self._docs)
+
+    def _compute_tf_idf_matrix(self) -> dict[str, Vector | SparseVector]:
         """Computes and returns the TF-IDF matrix for the whole corpus.
         The TF-IDF matrix is a dictionary of {document title: TF-IDF vector for the document}.
         """
 
         def tf_idf(document):
-            if self._debug:
-                print(f"Processing '{document.title}'")
-                sys.stdout.flush()
             vector = self.compute_tf_idf_vector(doc=document)
             return vector
 
@@ -305,10 +1284,148 @@ class Corpus:
         else:
             for doc in self._docs:  # look at one doc at a time
                 matrix[doc.title] = self.compute_tf_idf_vector(doc, None)   # update the doc's title and tf-idf
-                if self._debug:
-                    print(f"Done with doc {doc.title}")
         return matrix
 
+    def _compute_query_weights(self, query_doc: Document) -> dict[int, float]:
+        """Computes and returns the nonzero TF-IDF weights (query weights of the weighting scheme) of `query_doc` as a
+        dictionary of {term id: weight}."""
+        weighting = self._weighting
+        num_docs = len(self._docs)
+        weights = {}
+        for term, tf in query_doc.counts.items():
+            if term in self._terms:
+                weight = weighting.query_weight(tf, weighting.term_factor(self._dfs[term], num_docs))
+                if weight:
+                    weights[self._terms[term]] = weight
+        return weights
+
+    def _compute_impacts(self) -> dict[int, tuple[float, float]]:
+        """Computes and returns the smallest and largest normalized weight (TF-IDF weight / document norm) of each
+        term's posting list as a dictionary of {term id: (min impact, max impact)}."""
+        impacts = {}
+        for term_id, postings in self._index.items():
+            normalized = [weight / self._norms[doc_id] for doc_id, weight in postings]
+            impacts[term_id] = (min(normalized), max(normalized))
+        return impacts
+
+    def search(self, query_doc: Document, k: int = 10) -> list[tuple[str, float]]:
+        """Returns the `k` best (document title, cosine similarity) pairs for `query_doc`, best first.
+
+        Only the posting lists of the query terms are visited, so the cost depends on the postings touched rather
+        than on the size of the vocabulary. The ranking matches scoring every document with `Vector.cossim`.
+
+        """
+        if self._cache is not None:
+            results = self._cache.get(QueryCache.key(query_doc, k), self._version)
+            if results is not None:
+                self._metrics.count("query.cache_hits")
+                return results
+
+        self.refresh()
+        with self._metrics.phase("query.weights"):
+            query_weights = self._compute_query_weights(query_doc)
+        with self._metrics.phase("query.scoring"):
+            results = [(self._title(doc_id), score) for doc_id, score in self._search_top_k(query_weights, k)]
+        self._metrics.count("query.queries")
+        if self._cache is not None:
+            self._cache.put(QueryCache.key(query_doc, k), self._version, results)
+        return results
+
+    def search_phrases(self, query_doc: Document, phrases: Iterable["Phrase"], k: int = 10) -> list[tuple[str, float]]:
+        """Returns the `k` best (document title, cosine similarity) pairs for `query_doc` among the documents
+        satisfying every one of `phrases` (see `vector_space_phrases`), best first. Requires a corpus built with
+        `positions`.
+
+        Only the positional postings of the phrase terms and the postings of the query terms are visited. Matching
+        documents are ranked like `search` ranks them, including those scoring zero, and no other document is.
+
+        """
+        from vectorspace.vector_space_phrases import match_documents
+
+        if not self._store_positions:
+            raise ValueError("Phrase queries require a corpus built with positions")
+        phrases = list(phrases)
+        if not phrases:
+            return self.search(query_doc, k)
+
+        self.refresh()
+        with self._metrics.phase("query.phrases"):
+            matched = match_documents(self._positions, self._terms, phrases[0])
+            for phrase in phrases[1:]:
+                if not matched:
+                    break
+                matched &= match_documents(self._positions, self._terms, phrase)
+        with self._metrics.phase("query.weights"):
+            query_weights = self._compute_query_weights(query_doc)
+        with self._metrics.phase("query.scoring"):
+            scores = self._score_exhaustive(query_weights) if query_weights and matched else {}
+            ranked = heapq.nsmallest(k, [(doc_id, scores.get(doc_id, 0.0)) for doc_id in matched],
+                                     key=lambda item: (-item[1], item[0]))
+        self._metrics.count("query.queries")
+        return [(self._title(doc_id), score) for doc_id, score in ranked]
+
+    def search_batch(self, query_docs: Iterable[Document], k: int = 10,
+                     block_size: int = 256) -> list[list[tuple[str, float]]]:
+        self.refresh()
+        if self._cache is None:
+            return super().search_batch(query_docs, k, block_size)
+
+        query_docs = list(query_docs)
+        results = [self._cache.get(QueryCache.key(query_doc, k), self._version) for query_doc in query_docs]
+        misses = [position for position, result in enumerate(results) if result is None]
+        for position, result in zip(misses, super().search_batch([query_docs[position] for position in misses],
+                                                                 k, block_size)):
+            results[position] = result
+            self._cache.put(QueryCache.key(query_docs[position], k), self._version, result)
+        return results
+
+    def _title(self, doc_id: int) -> str:
+        return self._docs[doc_id].title
+
+    def save_index(self, path: str) -> None:
+        """Writes the inverted index of this corpus to `path` in the binary format of `vector_space_storage`."""
+        from vectorspace.vector_space_storage import write_index
+        write_index(self, path)
+
+    @staticmethod
+    def open_index(path: str):
+        """Opens the binary index file at `path` with `mmap` and returns it as a searchable `MappedIndex`."""
+        from vectorspace.vector_space_storage import MappedIndex
+        return MappedIndex(path)
+
+    def to_matrix(self, dense: bool = False):
+        """Returns a `TfIdfMatrix` backend over this corpus, which requires NumPy (and SciPy unless `dense`)."""
+        from vectorspace.vector_space_matrix import TfIdfMatrix
+        return TfIdfMatrix(self, dense)
+
+    def to_lsa(self, rank: int = 100, **kwargs):
+        """Returns an `LsaIndex` over this corpus, which embeds documents and queries in `rank` dimensions with a
+        truncated SVD of the TF-IDF matrix, and requires NumPy."""
+        from vectorspace.vector_space_lsa import LsaIndex
+        return LsaIndex(self, rank, **kwargs)
+
+    def to_approximate(self, num_lists: int | None = None, num_probes: int = 4, **kwargs):
+        """Returns an `ApproximateIndex` (IVF) over this corpus, searched like this corpus but with approximate
+        recall, see `vector_space_ann`."""
+        from vectorspace.vector_space_ann import ApproximateIndex
+        return ApproximateIndex(self, num_lists, num_probes, **kwargs)
+
+    def to_anytime(self, bits: int = 8, time_budget: float | None = None, postings_budget: int | None = None):
+        """Returns an `ImpactOrderedIndex` over this corpus, whose queries stop when a time or postings budget runs
+        out and return the best ranking found so far, see `vector_space_anytime`."""
+        from vectorspace.vector_space_anytime import ImpactOrderedIndex
+        return ImpactOrderedIndex(self, bits, time_budget, postings_budget)
+
+    def similarity_join(self, threshold: float = 0.0, k: int | None = None, block_size: int = 64,
+                        processes: int | None = None, matrix: bool | None = None):
+        """Yields the (document title, [(neighbour title, cosine similarity)]) neighbours of every document within
+        this corpus, scoring above zero and at least `threshold`, at most `k` per document if set, joined in blocks
+        over `processes` processes (by default the processes of this corpus), see `vector_space_join`."""
+        from vectorspace.vector_space_join import similarity_join
+        self.refresh()
+        return similarity_join(self, threshold, k, block_size, self._processes if processes is None else processes,
+                               matrix)
+
     def _get_doc(self, document, index):
         """A helper function to None-guard the `document` argument and fetch documents per `index` argument."""
         if document is not None and index is None:
@@ -337,21 +1454,84 @@ class Corpus:
             key_arg_func: a function that maps an item of the `iterable` to the key to use in the resulting dict.
 
         Returns:
-            A dictionary of {key_arg_func(an item of `iterable`): op(p_arg_func(an item of `iterable`))}.
+            A dictionary of {key_arg_func(an item of `iterable`): op(p_arg_func(an item of `iterable`))}, in the order
+            of `iterable`.
+
+        Raises:
+            The first exception raised by `op`, in the order of `iterable`.
 
         """
         result = {}
         with concurrent.futures.ThreadPoolExecutor(max_workers=num_threads) as executor:
             future_to_keys = {executor.submit(op, op_arg_func(item)): key_arg_func(item) for item in iterable}
-            for future in concurrent.futures.as_completed(future_to_keys):
-                key = future_to_keys[future]
-                try:
-                    result[key] = future.result()
-                except Exception as e:
-                    print(f"Key '{key}' generated exception:", e, file=sys.stderr)
+            for future, key in future_to_keys.items():
+                result[key] = future.result()
         return result
 
+    @staticmethod
+    def _shard(items: list, num_workers: int) -> list[list]:
+        """Splits `items` into contiguous shards, a few per worker so that uneven shards balance out."""
+        shard_size = max(1, -(-len(items) // (num_workers * 4)))
+        return [items[start:start + shard_size] for start in range(0, len(items), shard_size)]
+
     @staticmethod
     def _build_index_dict(lst: list) -> dict:
         """Given a list, returns a dictionary of {item from list: index of item}."""
         return {item: index for (index, item) in enumerate(lst)}
+
+
+def _slots_state(state: dict | tuple[dict | None, dict | None]) -> dict:
+    """Returns the {attribute: value} dictionary of the pickled `state` of an object with slots, which is either the
+    (`__dict__`, slots) pair pickled for objects with slots, or the `__dict__` pickled before the class had slots."""
+    if isinstance(state, tuple):
+        return {**(state[0] or {}), **(state[1] or {})}
+    return state
+
+
+def _count_terms(word_lists: list[list[str]]) -> tuple[list[dict[str, int]], dict[str, int]]:
+    """Process pool task computing the term-count table of each word list and their partial document frequencies."""
+    counts_list = []
+    dfs = {}
+    for words in word_lists:
+        counts = {}
+        for word in words:
+            counts[word] = counts.get(word, 0) + 1
+        counts_list.append(counts)
+        for term in counts:
+            dfs[term] = dfs.get(term, 0) + 1
+    return counts_list, dfs
+
+
+_worker_statistics: tuple[dict[str, int], dict[str, float], WeightingScheme, float] | None = None
+
+
+def _init_weights_worker(terms: dict[str, int], term_factors: dict[str, float], weighting: WeightingScheme,
+                         avg_doc_length: float) -> None:
+    """Process pool initializer storing the corpus statistics that `_compute_weight_rows` needs in the worker."""
+    global _worker_statistics
+    _worker_statistics = (terms, term_factors, weighting, avg_doc_length)
+
+
+def _compute_weight_rows(counts_list: list[dict[str, int]]) -> list[tuple[list[int], list[float]]]:
+    """Process pool task computing the (term ids, weights) row of each term-count table."""
+    terms, term_factors, weighting, avg_doc_length = _worker_statistics
+    rows = []
+    for counts in counts_list:
+        document_factor = weighting.document_factor(sum(counts.values()), avg_doc_length)
+        rows.append(([terms[term] for term in counts],
+                     [weighting.weight(tf, term_factors[term], document_factor) for term, tf in counts.items()]))
+    return rows
+
+
+_worker_preprocessor: Preprocessor | None = None
+
+
+def _init_preprocess_worker(preprocessor: Preprocessor) -> None:
+    """Process pool initializer storing the pipeline that `_preprocess` applies in the worker."""
+    global _worker_preprocessor
+    _worker_preprocessor = preprocessor
+
+
+def _preprocess(words: list[str]) -> list[str]:
+    """Process pool task applying the worker's pipeline to `words`."""
+    return _worker_preprocessor.process(words)
@@ -0,0 +1,112 @@
+"""Phrase and proximity queries for the vector space model. A `Phrase` constrains the documents a query matches to
+   those where its terms occur consecutively, or within a number of words of each other, which is checked by
+   intersecting the positional postings of its terms (see `Corpus.search_phrases`), so a phrase costs time in
+   proportion to the postings of its terms rather than to the length of the corpus.
+"""
+import re
+
+from collections.abc import Mapping
+from typing import Iterable
+from vectorspace.vector_space_models import Document, Preprocessor
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+_QUOTED = re.compile(r'"([^"]*)"(?:~(\d+))?')
+
+
+class Phrase:
+    """This class is a positional constraint on the documents of a query: its `terms` must occur consecutively and in
+       order, or, with a `distance`, all within `distance` words of each other in any order (the first and last of
+       them at most `distance` positions apart). Terms are matched against the processed words of the documents, so
+       stop words removed from both do not count as words in between."""
+
+    def __init__(self, terms: Iterable[str], distance: int | None = None):
+        self._terms = list(terms)
+        if not self._terms or (distance is not None and distance < 0):
+            raise ValueError(f"Invalid phrase terms or distance: {self._terms}, {distance}")
+        self._distance = distance
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Phrase) and self._terms == other.terms and self._distance == other.distance
+
+    def __hash__(self) -> int:
+        return hash((tuple(self._terms), self._distance))
+
+    def __repr__(self) -> str:
+        return f"Phrase({self._terms}, distance={self._distance})"
+
+    @property
+    def terms(self):
+        return self._terms
+
+    @property
+    def distance(self):
+        return self._distance
+
+    def matches(self, positions: dict[str, list[int]]) -> bool:
+        """Returns whether the sorted `positions` of each term of this phrase in a document satisfy it."""
+        if self._distance is None:
+            following = [set(positions[term]) for term in self._terms[1:]]
+            return any(all(start + offset in term_positions for offset, term_positions in enumerate(following, 1))
+                       for start in positions[self._terms[0]])
+        return _shortest_span(list(positions.values())) <= self._distance
+
+
+def match_documents(positional: Mapping[int, list[tuple[int, list[int]]]], terms: dict[str, int],
+                    phrase: Phrase) -> set[int]:
+    """Returns the ids of the documents satisfying `phrase`, given the `positional` postings of {term id:
+    [(document id, positions)]} and the {term: term id} dictionary `terms` of a corpus. Only the positional postings
+    of the terms of the phrase are decoded, and only the documents of the rarest of them are checked."""
+    if any(term not in terms for term in phrase.terms):
+        return set()
+    postings = {term: dict(positional.get(terms[term], ())) for term in phrase.terms}
+    rarest = min(postings.values(), key=len)
+    return {doc_id for doc_id in rarest
+            if all(doc_id in term_postings for term_postings in postings.values())
+            and phrase.matches({term: term_postings[doc_id] for term, term_postings in postings.items()})}
+
+
+def parse_query(raw_query: str, processors: Preprocessor | None = None) -> tuple[Document, list[Phrase]]:
+    """Returns the query document and the phrases of `raw_query`. Text in double quotes is a phrase, and a phrase
+    followed by `~N` (as in `"civil war"~5`) has a distance of N words. The words of the phrases are words of the
+    query document too, and every word is processed with `processors` if given; a phrase left without words by
+    processing is dropped."""
+    words, phrases = [], []
+    position = 0
+    for quoted in _QUOTED.finditer(raw_query):
+        words.extend(raw_query[position:quoted.start()].split())
+        phrase_words = quoted.group(1).split()
+        words.extend(phrase_words)
+        phrase_terms = processors.process(phrase_words) if processors is not None else phrase_words
+        if phrase_terms:
+            phrases.append(Phrase(phrase_terms, None if quoted.group(2) is None else int(quoted.group(2))))
+        position = quoted.end()
+    words.extend(raw_query[position:].replace('"', " ").split())
+    return Document("query", words, processors=processors), phrases
+
+
+def _shortest_span(positions: list[list[int]]) -> float:
+    """Returns the smallest distance between the first and last position of a window holding a position of every
+    one of the sorted `positions` lists, or infinity if one of them is empty."""
+    if not all(positions):
+        return float("inf")
+    events = sorted([(position, list_id) for list_id, list_positions in enumerate(positions)
+                     for position in list_positions])
+    counts = [0] * len(positions)
+    covered = 0
+    left = 0
+    shortest = float("inf")
+    for position, list_id in events:
+        counts[list_id] += 1
+        covered += counts[list_id] == 1
+        while covered == len(positions):
+            left_position, left_id = events[left]
+            shortest = min(shortest, position - left_position)
+            counts[left_id] -= 1
+            covered -= counts[left_id] == 0
+            left += 1
+    return shortest
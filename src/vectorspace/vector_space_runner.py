@@ -1,14 +1,21 @@
-"""Query driver for the vector space model using NLTK's Inaugural corpus.
+"""Query driver for the vector space model using NLTK's Inaugural corpus. NLTK is only imported to build the index;
+   the stop words and stemmer configuration are saved with it, so querying an existing index does not load NLTK.
 """
 
+import gc
 import sys
+import json
 import time
 import pickle
 import argparse
+import functools
 
-from nltk.corpus import inaugural, stopwords
-from nltk.stem.snowball import SnowballStemmer
-from vectorspace.vector_space_models import Document, Corpus
+from typing import TYPE_CHECKING
+from vectorspace.vector_space_metrics import Metrics, MetricsRecorder, NULL_METRICS
+from vectorspace.vector_space_models import Document, Corpus, LazyStemmer, Preprocessor
+from vectorspace.vector_space_phrases import Phrase, parse_query
+from vectorspace.vector_space_storage import MappedIndex, write_index
+from vectorspace.vector_space_weighting import WEIGHTING_SCHEMES
 
 __author__ = "Mike Ryu"
 __copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
@@ -16,27 +23,114 @@ __credits__ = ["Mike Ryu"]
 __license__ = "MIT"
 __email__ = "mryu@westmont.edu"
 
+if TYPE_CHECKING:  # the backends import NumPy and SciPy, so they are only imported when selected
+    from vectorspace.vector_space_ann import ApproximateIndex
+    from vectorspace.vector_space_anytime import ImpactOrderedIndex
+    from vectorspace.vector_space_lsa import LsaIndex
+    from vectorspace.vector_space_matrix import TfIdfMatrix
+
+    Searcher = Corpus | TfIdfMatrix | MappedIndex | ApproximateIndex | LsaIndex | ImpactOrderedIndex
+
 
 def main() -> None:
     pars = setup_argument_parser()
     args = pars.parse_args()
-    timer = Timer()
+    metrics = setup_metrics(args)
+    timer = Timer(metrics)
+
+    if args.binary:
+        searcher = index = load_binary_index(args, timer, metrics)
+        if args.weighting and index.weighting != WEIGHTING_SCHEMES[args.weighting]():
+            pars.error(f"the binary index {args.pickle_file_path} is weighted with {index.weighting}, "
+                       f"delete it to rebuild it with {args.weighting}")
+    else:
+        corpus = index = load_pickled_corpus(args, timer, metrics)
+        if args.weighting:
+            corpus.weighting = WEIGHTING_SCHEMES[args.weighting]()
+            timer.run_with_timer(corpus.refresh, label=f"{args.weighting} weights")
+        if args.matrix:
+            searcher = timer.run_with_timer(corpus.to_matrix, label="TF-IDF matrix backend")
+        elif args.lsa:
+            searcher = timer.run_with_timer(corpus.to_lsa, [args.lsa], label=f"rank {args.lsa} LSA index")
+        elif args.approximate:
+            searcher = timer.run_with_timer(corpus.to_approximate, label="approximate (IVF) index")
+        elif args.time_budget is not None or args.postings_budget is not None:
+            time_budget = None if args.time_budget is None else args.time_budget / 1000
+            searcher = timer.run_with_timer(corpus.to_anytime, [8, time_budget, args.postings_budget],
+                                            label="impact-ordered (anytime) index")
+            gc.freeze()  # keeps full collections of the long-lived index from stalling budgeted queries
+        else:
+            searcher = corpus
+    document_processors = index.preprocessor or setup_processors()  # indexes saved without one need NLTK
+    try:
+        if args.queries:
+            run_bulk_queries(searcher, document_processors, args.queries, args.output, args.num_results,
+                             metrics=metrics)
+        else:
+            keep_querying(searcher, document_processors, args.num_results, metrics)
+    finally:
+        if args.metrics:
+            with open(args.metrics, "w") as metrics_file:
+                metrics_file.write(metrics.to_json())
+
+
+def setup_metrics(args: argparse.Namespace) -> Metrics:
+    if not (args.metrics or args.metrics_port):
+        return NULL_METRICS
+    metrics = MetricsRecorder()
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+        print(f"Serving metrics at http://127.0.0.1:{args.metrics_port}/metrics", file=sys.stderr)
+    return metrics
+
 
-    document_processors = (set(stopwords.words('english')), SnowballStemmer('english'))
+def setup_processors() -> Preprocessor:
+    from nltk.corpus import stopwords
+    return Preprocessor(set(stopwords.words('english')), LazyStemmer('snowball', 'english'))
 
+
+def build_corpus(args: argparse.Namespace, timer: "Timer", metrics: Metrics = NULL_METRICS) -> Corpus:
+    from nltk.corpus import inaugural
+
+    processors = setup_processors()
+    file_ids = inaugural.fileids()
+    raw_words = [inaugural.words(file_id) for file_id in file_ids]
+    corpus_words = timer.run_with_timer(processors.process_batch, [raw_words, args.processes],
+                                        label="document preprocessing")
+    timer.run_with_timer(processors.build_stem_table, [{word for words in raw_words for word in words}],
+                         label="stem table")
+    corpus_documents = [Document(file_id, words) for file_id, words in zip(file_ids, corpus_words)]
+    corpus = timer.run_with_timer(functools.partial(Corpus, positions=args.positions),
+                                  [corpus_documents, args.num_threads, args.debug, False, args.processes, 0,
+                                   metrics if metrics.enabled else None],
+                                  label="corpus instantiation (includes TF-IDF matrix)")
+    corpus.preprocessor = processors
+    return corpus
+
+
+def load_pickled_corpus(args: argparse.Namespace, timer: "Timer", metrics: Metrics = NULL_METRICS) -> Corpus:
     try:
         with open(args.pickle_file_path, "rb") as pickle_file:
             corpus = timer.run_with_timer(pickle.load, [pickle_file],
                                           label="corpus load from pickle")
+        corpus.metrics = metrics
     except FileNotFoundError:
-        corpus_documents = [Document(file_id, inaugural.words(file_id), document_processors)
-                            for file_id in inaugural.fileids()]
-        corpus = timer.run_with_timer(Corpus, [corpus_documents, args.num_threads, args.debug],
-                                      label="corpus instantiation (includes TF-IDF matrix)")
+        corpus = build_corpus(args, timer, metrics)
         with open(args.pickle_file_path, "wb") as pickle_file:
             pickle.dump(corpus, pickle_file)
+    return corpus
 
-    keep_querying(corpus, document_processors, 10)
+
+def load_binary_index(args: argparse.Namespace, timer: "Timer", metrics: Metrics = NULL_METRICS) -> MappedIndex:
+    try:
+        return timer.run_with_timer(MappedIndex, [args.pickle_file_path, metrics],
+                                    label="index open (memory-mapped)")
+    except FileNotFoundError:
+        corpus = build_corpus(args, timer, metrics)
+        if args.weighting:
+            corpus.weighting = WEIGHTING_SCHEMES[args.weighting]()
+        timer.run_with_timer(write_index, [corpus, args.pickle_file_path], label="index write (binary format)")
+        return MappedIndex(args.pickle_file_path, metrics)
 
 
 def setup_argument_parser() -> argparse.ArgumentParser:
@@ -44,46 +138,146 @@ def setup_argument_parser() -> argparse.ArgumentParser:
     pars.add_argument("num_threads", type=int,
                       help="required integer indicating how many threads to utilize")
     pars.add_argument("pickle_file_path", type=str,
-                      help="required string containing the path to a pickle (data) file")
+                      help="required string containing the path to a pickle (data) file, or a binary index file")
+    pars.add_argument("-p", "--processes", type=int, default=1,
+                      help="integer indicating how many processes to build the corpus with (default: 1)")
     pars.add_argument("-d", "--debug", action="store_true",
                       help="flag to enable printing debug statements to console output")
+    pars.add_argument("-m", "--matrix", action="store_true",
+                      help="flag to score queries with the NumPy/SciPy matrix backend")
+    pars.add_argument("-l", "--lsa", type=int, metavar="RANK",
+                      help="integer rank of the latent semantic (truncated SVD) embeddings to score queries with")
+    pars.add_argument("-a", "--approximate", action="store_true",
+                      help="flag to score queries with the approximate nearest neighbour (IVF) index")
+    pars.add_argument("--time-budget", type=float, metavar="MILLISECONDS",
+                      help="latency budget of a query, after which the best ranking found so far is returned")
+    pars.add_argument("--postings-budget", type=int, metavar="POSTINGS",
+                      help="number of postings a query may score before the best ranking so far is returned")
+    pars.add_argument("-w", "--weighting", choices=sorted(WEIGHTING_SCHEMES),
+                      help="weighting scheme to score queries with, computed from the stored term statistics "
+                           "(default: the scheme of the corpus, tfidf when it is built); a binary index keeps the "
+                           "scheme it was written with")
+    pars.add_argument("--positions", action="store_true",
+                      help="flag to build the corpus with term positions, for \"phrase\" and \"proximity\"~N queries")
+    pars.add_argument("-b", "--binary", action="store_true",
+                      help="flag to persist the index in the memory-mapped binary format instead of a pickle")
+    pars.add_argument("-k", "--num-results", type=int, default=10,
+                      help="integer indicating how many results to return per query (default: 10)")
+    pars.add_argument("-q", "--queries", type=str,
+                      help="path to a file of queries, one per line ('-' for stdin), to answer non-interactively")
+    pars.add_argument("-o", "--output", type=str, default="-",
+                      help="path to write the ranked results of --queries to as JSON lines (default: '-' for stdout)")
+    pars.add_argument("--metrics", type=str,
+                      help="path to write the recorded phase timings, counters and histograms to as JSON on exit")
+    pars.add_argument("--metrics-port", type=int,
+                      help="port to serve the recorded metrics on in the Prometheus text format (at /metrics)")
     return pars
 
 
-def keep_querying(corpus: Corpus, processors: tuple[set[str], SnowballStemmer], num_results: int) -> None:
+def keep_querying(corpus: "Searcher", processors: Preprocessor, num_results: int,
+                  metrics: Metrics = NULL_METRICS) -> None:
     again_response = 'y'
 
     while again_response == 'y':
         raw_query = input("Your query? ")
-        query_document = Document("query", raw_query.split(), processors=processors)
-        query_vector = corpus.compute_tf_idf_vector(query_document)
+        with metrics.phase("query.parse"):
+            query_document, phrases = parse_query(raw_query, processors)
+        with metrics.phase("query.total"):
+            ranked_result = search(corpus, query_document, phrases, num_results)
 
-        query_result = {}
-        for title, doc_vector in corpus.tf_idf.items():
-            query_result[title] = doc_vector.cossim(query_vector)
-
-        display_query_result(raw_query, query_result, corpus, num_results)
+        display_ranked_result(raw_query, ranked_result)
         again_response = input("Again (y/N)? ").lower()
 
 
-def display_query_result(query: str, query_result: dict, corpus: Corpus, num_results) -> None:
-    if num_results > len(corpus):
-        num_results = len(corpus)
+def run_bulk_queries(corpus: "Searcher", processors: Preprocessor, queries_path: str,
+                     output_path: str, num_results: int, block_size: int = 1024,
+                     metrics: Metrics = NULL_METRICS) -> None:
+    queries_file = sys.stdin if queries_path == "-" else open(queries_path)
+    output_file = sys.stdout if output_path == "-" else open(output_path, "w")
+    num_queries = 0
+    timer = Timer(metrics)
+    timer.start()
+    try:
+        block = []
+        for line in queries_file:
+            block.append(line.rstrip("\n"))
+            if len(block) == block_size:
+                num_queries += write_ranked_results(corpus, processors, block, output_file, num_results, metrics)
+                block = []
+        num_queries += write_ranked_results(corpus, processors, block, output_file, num_results, metrics)
+    finally:
+        if queries_file is not sys.stdin:
+            queries_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+    timer.stop()
+    timer.record("bulk queries")
+
+    timer.print_elapsed(label=f"{num_queries} queries")
+    if timer.get_elapsed():
+        print(f"Throughput: {num_queries / timer.get_elapsed():0.1f} queries per second", file=sys.stderr)
+
+
+def write_ranked_results(corpus: "Searcher", processors: Preprocessor, raw_queries: list[str],
+                         output_file, num_results: int, metrics: Metrics = NULL_METRICS) -> int:
+    with metrics.phase("query.parse"):
+        queries = [parse_query(raw_query, processors) for raw_query in raw_queries]
+    if hasattr(corpus, "search_anytime"):  # each query has its own budget, and records whether it ran out
+        for raw_query, (query_document, _) in zip(raw_queries, queries):
+            ranked_result, exact = corpus.search_anytime(query_document, num_results)
+            write_ranked_result(output_file, raw_query, ranked_result, exact=exact)
+        return len(raw_queries)
+
+    phrase_search = supports_phrases(corpus)
+    ranked_results = [None] * len(queries)
+    batch = [position for position, (_, phrases) in enumerate(queries) if not (phrases and phrase_search)]
+    for position, ranked_result in zip(batch, corpus.search_batch([queries[position][0] for position in batch],
+                                                                  num_results)):
+        ranked_results[position] = ranked_result
+    for position, (query_document, phrases) in enumerate(queries):
+        if ranked_results[position] is None:
+            ranked_results[position] = corpus.search_phrases(query_document, phrases, num_results)
+    for raw_query, ranked_result in zip(raw_queries, ranked_results):
+        write_ranked_result(output_file, raw_query, ranked_result)
+    return len(raw_queries)
+
 
-    sorted_result = sorted([(title, score) for title, score in query_result.items()],
-                           key=lambda item: item[1], reverse=True)
+def write_ranked_result(output_file, raw_query: str, ranked_result: list[tuple[str, float]], **fields) -> None:
+    """Writes the ranked result of `raw_query` to `output_file` as a JSON line, along with any extra `fields`."""
+    results = [{"title": title, "score": score} for title, score in ranked_result]
+    output_file.write(json.dumps({"query": raw_query, "results": results, **fields}) + "\n")
 
+
+def supports_phrases(corpus: "Searcher") -> bool:
+    return isinstance(corpus, Corpus) and corpus.positions is not None
+
+
+def search(corpus: "Searcher", query_document: Document, phrases: list[Phrase],
+           num_results: int) -> list[tuple[str, float]]:
+    """Answers the query with `search_phrases` if it has phrases and `corpus` stores positions, and with `search`
+    (ignoring the phrases but not their words) otherwise; an anytime index warns when its ranking is approximate."""
+    if phrases and supports_phrases(corpus):
+        return corpus.search_phrases(query_document, phrases, num_results)
+    if hasattr(corpus, "search_anytime"):
+        ranked_result, exact = corpus.search_anytime(query_document, num_results)
+        if not exact:
+            print("Budget exhausted: the ranking is approximate.", file=sys.stderr)
+        return ranked_result
+    return corpus.search(query_document, num_results)
+
+
+def display_ranked_result(query: str, ranked_result: list[tuple[str, float]]) -> None:
     print(f"\nFor query : {query}")
-    for i in range(num_results):
-        title, score = sorted_result[i]
+    for i, (title, score) in enumerate(ranked_result):
         print(f"Result {i + 1:02d} : [{score:0.6f}] {title}")
     print()
 
 
 class Timer:
-    def __init__(self):
+    def __init__(self, metrics: Metrics = NULL_METRICS):
         self._start = 0.0
         self._stop = 0.0
+        self._metrics = metrics
 
     def run_with_timer(self, op, op_args=None, label="operation"):
         if not op_args:
@@ -93,11 +287,16 @@ class Timer:
         result = op(*op_args)
         self.stop()
 
+        self.record(label)
         self.print_elapsed(label=label)
         return result
 
-    def print_elapsed(self, label: str = "operation", file=sys.stdout):
-        print(f"Elapsed time for {label}: {self.get_elapsed():0.4f} seconds", file=file)
+    def record(self, label: str) -> None:
+        self._metrics.record(f"runner.{label}", self.get_elapsed())
+
+    def print_elapsed(self, label: str = "operation", file=None):
+        # timings go to stderr by default, so that results written to stdout stay machine-readable
+        print(f"Elapsed time for {label}: {self.get_elapsed():0.4f} seconds", file=file or sys.stderr)
 
     def get_elapsed(self) -> float:
         return self._stop - self._start
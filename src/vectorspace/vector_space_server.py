@@ -0,0 +1,358 @@
+"""HTTP/JSON query server for the vector space model. The index is loaded once and kept warm in memory, requests are
+   handled concurrently on an asyncio event loop, and the CPU-bound scoring runs on worker threads. Requests that
+   arrive within a short window of each other are micro-batched into a single `search_batch` call. Scoring holds the
+   GIL, so the worker threads keep the event loop responsive but do not score batches in parallel: throughput comes
+   from batching, and scaling across cores means running one server process per core over the same mapped index.
+
+   Endpoints (all on localhost by default):
+     POST /search   {"query": "some words", "k": 10}        -> {"query": ..., "results": [{"title", "score"}, ...]}
+     POST /search   {"queries": ["some", "words"], "k": 10} -> {"results": [[{"title", "score"}, ...], ...]}
+     GET  /health                                            -> {"status": "ok", "documents": ..., ...}
+     GET  /stats                                             -> request, batch and latency statistics
+"""
+import sys
+import json
+import time
+import pickle
+import asyncio
+import argparse
+import concurrent.futures
+
+from vectorspace.vector_space_metrics import Metrics, MetricsRecorder
+from vectorspace.vector_space_models import Document, Corpus, LazyStemmer, Preprocessor
+from vectorspace.vector_space_storage import MappedIndex
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+MAX_BODY_SIZE = 1 << 20
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    """Raised while handling a request to answer it with the HTTP status `status`."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class QueryServer:
+    """This class serves searches over a loaded `Corpus` or `MappedIndex` (anything with `search_batch` and `len`).
+       Each query is queued with its `k`, and a single batcher task drains the queue: it waits up to `batch_window`
+       seconds for up to `max_batch` queries, groups them by `k` and scores each group with one `search_batch` call
+       on a pool of `workers` threads, so that the event loop keeps accepting connections while scoring runs. The
+       threads share the GIL, so more than one worker only overlaps scoring with request handling."""
+
+    def __init__(self, searcher: Corpus | MappedIndex, processors: Preprocessor | None = None, workers: int = 1,
+                 max_batch: int = 64, batch_window: float = 0.002, default_k: int = 10, max_k: int = 1000,
+                 metrics: Metrics | None = None):
+        if workers < 1 or max_batch < 1:
+            raise ValueError(f"Invalid workers or max_batch: {workers}, {max_batch}")
+        self._searcher = searcher
+        self._processors = processors
+        self._workers = workers
+        self._max_batch = max_batch
+        self._batch_window = batch_window
+        self._default_k = default_k
+        self._max_k = max_k
+        self._metrics: Metrics = metrics if metrics is not None else MetricsRecorder()
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+        self._queue: asyncio.Queue | None = None
+        self._batcher: asyncio.Task | None = None
+        self._server: asyncio.Server | None = None
+        self._started = time.time()
+        self._requests = 0
+        self._queries = 0
+        self._batches = 0
+        self._errors = 0
+
+    @property
+    def metrics(self):
+        return self._metrics
+
+    @property
+    def port(self) -> int | None:
+        """The port the server is listening on, which is useful when it was started on port 0."""
+        return self._server.sockets[0].getsockname()[1] if self._server else None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        """Starts the worker pool and the batcher, and starts listening on `host`:`port`."""
+        if isinstance(self._searcher, Corpus):
+            self._searcher.refresh()  # rebuild any stale weights once, not concurrently from the workers
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._workers)
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._run_batcher())
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        self._started = time.time()
+
+    async def serve_forever(self) -> None:
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stops listening, cancels the batcher and shuts the worker pool down."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    async def search(self, raw_queries: list[str], k: int) -> list[list[tuple[str, float]]]:
+        """Queues `raw_queries` for the batcher and returns their ranked results once they have been scored."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for raw_query in raw_queries:
+            future = loop.create_future()
+            self._queue.put_nowait((raw_query, k, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    def health(self) -> dict:
+        return {"status": "ok", "documents": len(self._searcher), "backend": type(self._searcher).__name__,
+                "uptime_seconds": time.time() - self._started}
+
+    def stats(self) -> dict:
+        stats = {"requests": self._requests, "queries": self._queries, "batches": self._batches,
+                 "errors": self._errors, "mean_batch_size": self._queries / self._batches if self._batches else 0.0,
+                 "pending": self._queue.qsize() if self._queue else 0, "workers": self._workers}
+        if isinstance(self._metrics, MetricsRecorder):
+            stats["metrics"] = self._metrics.to_dict()
+        return stats
+
+    async def _run_batcher(self) -> None:
+        """Collects queued queries into batches and dispatches each batch to the worker pool."""
+        loop = asyncio.get_running_loop()
+        workers = asyncio.Semaphore(self._workers)
+        running = set()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._batch_window
+            while len(batch) < self._max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await workers.acquire()
+            task = asyncio.create_task(self._score_batch(batch))
+            running.add(task)
+            task.add_done_callback(running.discard)
+            task.add_done_callback(lambda _: workers.release())
+
+    async def _score_batch(self, batch: list[tuple[str, int, asyncio.Future]]) -> None:
+        """Scores `batch` on the worker pool, one `search_batch` call per distinct `k`, and resolves its futures."""
+        loop = asyncio.get_running_loop()
+        self._batches += 1
+        self._queries += len(batch)
+        self._metrics.count("server.batches")
+        by_k: dict[int, list[tuple[str, asyncio.Future]]] = {}
+        for raw_query, k, future in batch:
+            by_k.setdefault(k, []).append((raw_query, future))
+        for k, queries in by_k.items():
+            try:
+                results = await loop.run_in_executor(self._executor, self._search_block,
+                                                     [raw_query for raw_query, _ in queries], k)
+            except Exception as error:
+                results = [error] * len(queries)
+            for (_, future), result in zip(queries, results):
+                if future.done():
+                    continue
+                elif isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _search_block(self, raw_queries: list[str], k: int) -> list[list[tuple[str, float]]]:
+        with self._metrics.phase("query.parse"):
+            query_docs = [Document("query", raw_query.split(), processors=self._processors)
+                          for raw_query in raw_queries]
+        return self._searcher.search_batch(query_docs, k)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answers the HTTP/1.1 requests of one connection until the client closes it or asks to."""
+        try:
+            keep_alive = True
+            while keep_alive:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                start = time.perf_counter()
+                self._requests += 1
+                try:
+                    status, payload = 200, await self._route(method, path, body)
+                except HttpError as error:
+                    self._errors += 1
+                    status, payload = error.status, {"error": str(error)}
+                except Exception as error:
+                    self._errors += 1
+                    status, payload = 500, {"error": str(error)}
+                self._metrics.observe("server.request_seconds", time.perf_counter() - start)
+                await _write_response(writer, status, payload, keep_alive)
+        except HttpError as error:
+            self._errors += 1
+            await _write_response(writer, error.status, {"error": str(error)}, False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _route(self, method: str, path: str, body: bytes) -> dict:
+        path = path.split("?", 1)[0]
+        if path in ("/health", "/stats"):
+            if method != "GET":
+                raise HttpError(405, f"{path} only supports GET")
+            return self.health() if path == "/health" else self.stats()
+        elif path == "/search":
+            if method != "POST":
+                raise HttpError(405, "/search only supports POST")
+            return await self._handle_search(body)
+        else:
+            raise HttpError(404, f"Unknown path: {path}")
+
+    async def _handle_search(self, body: bytes) -> dict:
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            raise HttpError(400, "The request body is not valid JSON")
+        if not isinstance(request, dict):
+            raise HttpError(400, "The request body must be a JSON object")
+
+        k = request.get("k", self._default_k)
+        if not isinstance(k, int) or isinstance(k, bool) or not 0 < k <= self._max_k:
+            raise HttpError(400, f"k must be an integer between 1 and {self._max_k}")
+        if "queries" in request:
+            raw_queries = request["queries"]
+            if not isinstance(raw_queries, list) or not all([isinstance(query, str) for query in raw_queries]):
+                raise HttpError(400, "queries must be a list of strings")
+            ranked_results = await self.search(raw_queries, k)
+            return {"results": [_to_json_results(ranked_result) for ranked_result in ranked_results]}
+        elif isinstance(request.get("query"), str):
+            ranked_result, = await self.search([request["query"]], k)
+            return {"query": request["query"], "results": _to_json_results(ranked_result)}
+        else:
+            raise HttpError(400, "The request needs a 'query' string or a 'queries' list")
+
+
+async def _read_request(reader: asyncio.StreamReader) -> tuple[str, str, dict[str, str], bytes] | None:
+    """Reads one HTTP request from `reader` and returns its method, path, (lower-cased) headers and body, or None if
+    the connection was closed before a new request started."""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, path, _ = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length")
+    if length < 0:
+        raise HttpError(400, f"Invalid Content-Length: {length}")
+    if length > MAX_BODY_SIZE:
+        raise HttpError(413, f"The request body is larger than {MAX_BODY_SIZE} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path, headers, body
+
+
+async def _write_response(writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool) -> None:
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+def _to_json_results(ranked_result: list[tuple[str, float]]) -> list[dict]:
+    return [{"title": title, "score": score} for title, score in ranked_result]
+
+
+def load_searcher(path: str, binary: bool = False) -> Corpus | MappedIndex:
+    """Loads the index at `path` written by the runner: a pickled `Corpus`, or a binary index file when `binary`."""
+    if binary:
+        return MappedIndex(path)
+    with open(path, "rb") as pickle_file:
+        return pickle.load(pickle_file)
+
+
+def setup_argument_parser() -> argparse.ArgumentParser:
+    pars = argparse.ArgumentParser(prog="python3 -m vectorspace.vector_space_server")
+    pars.add_argument("index_path", type=str,
+                      help="required string containing the path to a pickled corpus, or a binary index file with -b")
+    pars.add_argument("-b", "--binary", action="store_true",
+                      help="flag to serve a memory-mapped binary index instead of a pickled corpus")
+    pars.add_argument("--host", type=str, default="127.0.0.1",
+                      help="address to listen on (default: 127.0.0.1)")
+    pars.add_argument("--port", type=int, default=8080,
+                      help="port to listen on (default: 8080)")
+    pars.add_argument("-w", "--workers", type=int, default=1,
+                      help="integer indicating how many worker threads score batches; scoring holds the GIL, so more "
+                           "threads keep requests flowing but do not add throughput (default: 1)")
+    pars.add_argument("--max-batch", type=int, default=64,
+                      help="integer indicating how many queries are scored together at most (default: 64)")
+    pars.add_argument("--batch-window", type=float, default=0.002,
+                      help="seconds to wait for more queries before scoring a batch (default: 0.002)")
+    pars.add_argument("-k", "--num-results", type=int, default=10,
+                      help="integer indicating how many results to return when a request has no k (default: 10)")
+    return pars
+
+
+def main() -> None:
+    args = setup_argument_parser().parse_args()
+    start = time.perf_counter()
+    searcher = load_searcher(args.index_path, args.binary)
+    print(f"Elapsed time for index load: {time.perf_counter() - start:0.4f} seconds", file=sys.stderr)
+    processors = searcher.preprocessor
+    if processors is None:  # indexes saved without their preprocessor need the NLTK stop words
+        from nltk.corpus import stopwords
+        processors = Preprocessor(set(stopwords.words('english')), LazyStemmer('snowball', 'english'))
+    server = QueryServer(searcher, processors, workers=args.workers, max_batch=args.max_batch,
+                         batch_window=args.batch_window, default_k=args.num_results)
+    searcher.metrics = server.metrics  # records the scoring phases in /stats
+
+    async def serve() -> None:
+        await server.start(args.host, args.port)
+        print(f"Serving {len(searcher)} documents at http://{args.host}:{server.port}/search", file=sys.stderr)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
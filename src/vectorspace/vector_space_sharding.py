@@ -0,0 +1,278 @@
+"""Sharded index for the vector space model. The documents of a collection are partitioned into contiguous shards,
+   each holding the inverted index of its documents, while the collection-wide terms, document frequencies and
+   document count are kept by a coordinator. Shard weights are computed by the weighting scheme from the collection
+   statistics, so every score is identical to the unsharded `Corpus`. A query is weighted once by the coordinator,
+   sent to every shard (each in its own process, when requested), and the top k of the shards are merged.
+"""
+import heapq
+import itertools
+import multiprocessing
+import concurrent.futures
+
+from typing import Iterable
+from vectorspace.vector_space_models import Document, Corpus, SparseVector, PostingsSearch
+from vectorspace.vector_space_weighting import TfIdf, WeightingScheme
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+
+class IndexShard(PostingsSearch):
+    """This class holds the inverted index, norms and impacts of a contiguous range of documents of a sharded
+       collection, starting at document id `offset`. Weights are computed with the collection's document frequencies
+       and document count from `term_stats`, a dictionary of {term: (term id, df)} covering the terms of the shard,
+       so only the statistics of its own terms are shipped to a shard, and the collection's `avg_doc_length`, by the
+       `weighting` scheme (`TfIdf` by default). Queries arrive as {term id: weight} dictionaries already computed by
+       the coordinator, and results carry collection-wide document ids."""
+
+    def __init__(self, titles: list[str], counts: list[dict[str, int]], term_stats: dict[str, tuple[int, int]],
+                 num_docs: int, offset: int = 0, weighting: WeightingScheme | None = None,
+                 avg_doc_length: float = 0.0):
+        weighting = weighting if weighting is not None else TfIdf()
+        self._titles = titles
+        self._offset = offset
+        self._index: dict[int, list[tuple[int, float]]] = {}
+        self._norms: list[float] = []
+        for doc_id, doc_counts in enumerate(counts):
+            squares = 0.0
+            document_factor = weighting.document_factor(sum(doc_counts.values()), avg_doc_length)
+            for term, tf in doc_counts.items():
+                term_id, df = term_stats[term]
+                weight = weighting.weight(tf, weighting.term_factor(df, num_docs), document_factor)
+                if weight:
+                    self._index.setdefault(term_id, []).append((doc_id, weight))
+                    squares += weight ** 2
+            self._norms.append(weighting.norm(squares))
+
+        self._impacts = {}
+        for term_id, postings in self._index.items():
+            normalized = [weight / self._norms[doc_id] for doc_id, weight in postings]
+            self._impacts[term_id] = (min(normalized), max(normalized))
+
+    def __len__(self):
+        return len(self._titles)
+
+    @property
+    def offset(self):
+        return self._offset
+
+    def search_weights(self, query_weights: dict[int, float], k: int) -> list[tuple[int, str, float]]:
+        """Returns the `k` best (collection document id, title, score) triples of this shard for `query_weights`."""
+        return [(self._offset + doc_id, self._titles[doc_id], score)
+                for doc_id, score in self._search_top_k(query_weights, k)]
+
+    def search_weights_batch(self, block: list[dict[int, float]], k: int) -> list[list[tuple[int, str, float]]]:
+        """Returns the results of `search_weights` for each query weights dictionary of `block`, scored together."""
+        return [[(self._offset + doc_id, self._titles[doc_id], score) for doc_id, score in self._rank(scores, k)]
+                for scores in self._score_block(block)]
+
+    def _title(self, doc_id: int) -> str:
+        return self._titles[doc_id]
+
+
+class ShardedCorpus:
+    """This class partitions `documents` into `num_shards` contiguous `IndexShard`s and answers queries by
+       scatter-gather: query weights are computed once from the collection statistics, every shard returns its own
+       top k, and the results are merged by (score, document id), which is the order `Corpus.search` ranks in.
+       Documents and queries are weighted by the `weighting` scheme (`TfIdf` by default), like a `Corpus` built with
+       the same scheme.
+
+       With `processes` set, each shard is built in and served by its own process (standing in for a node), so the
+       shards are searched in parallel and only the coordinator's term statistics live in this process. Call
+       `close` (or use the corpus as a context manager) to stop them."""
+
+    def __init__(self, documents: Iterable[Document], num_shards: int = 2, processes: bool = False,
+                 sparse: bool = True, weighting: WeightingScheme | None = None):
+        if num_shards < 1:
+            raise ValueError(f"Invalid number of shards: {num_shards}")
+        titles, counts = [], []
+        for doc in documents:
+            titles.append(doc.title)
+            counts.append(doc.counts)
+
+        dfs = {}
+        for doc_counts in counts:
+            for term in doc_counts:
+                dfs[term] = dfs.get(term, 0) + 1
+        self._terms: dict[str, int] = Corpus._build_index_dict(list(dfs))
+        self._dfs: dict[str, int] = dfs
+        self._num_docs = len(titles)
+        self._sparse = sparse
+        self._weighting: WeightingScheme = weighting if weighting is not None else TfIdf()
+        self._avg_doc_length = 0.0
+        if self._weighting.uses_document_length and self._num_docs:
+            self._avg_doc_length = sum([sum(doc_counts.values()) for doc_counts in counts]) / self._num_docs
+
+        shard_size = max(1, -(-self._num_docs // num_shards))
+        self._shard_args = []
+        for offset in range(0, self._num_docs, shard_size):
+            shard_counts = counts[offset:offset + shard_size]
+            shard_terms = {term for doc_counts in shard_counts for term in doc_counts}
+            term_stats = {term: (self._terms[term], dfs[term]) for term in shard_terms}
+            self._shard_args.append((titles[offset:offset + shard_size], shard_counts, term_stats, self._num_docs,
+                                     offset, self._weighting, self._avg_doc_length))
+
+        self._shards: list[IndexShard] = []
+        self._connections = []
+        self._processes = []
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+        if processes:
+            self._start_processes()
+        else:
+            self._shards = [IndexShard(*args) for args in self._shard_args]
+        self._shard_args = []
+
+    def __len__(self):
+        return self._num_docs
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def terms(self):
+        return self._terms
+
+    @property
+    def dfs(self):
+        return self._dfs
+
+    @property
+    def weighting(self):
+        return self._weighting
+
+    @property
+    def num_shards(self) -> int:
+        return max(len(self._shards), len(self._processes))
+
+    @property
+    def shards(self) -> list[IndexShard]:
+        """The in-process shards, which is empty when the shards run in their own processes."""
+        return self._shards
+
+    def compute_tf_idf_vector(self, doc: Document, sparse=None):
+        """Computes and returns the TF-IDF vector of `doc` against the collection statistics, like
+        `Corpus.compute_tf_idf_vector`. A `SparseVector` is returned unless `sparse` (or the corpus flag) is unset."""
+        weighting = self._weighting
+        document_factor = weighting.document_factor(sum(doc.counts.values()), self._avg_doc_length)
+        term_ids, tf_idfs = [], []
+        for term, tf in doc.counts.items():
+            if term in self._terms:
+                term_ids.append(self._terms[term])
+                tf_idfs.append(weighting.weight(tf, weighting.term_factor(self._dfs[term], self._num_docs),
+                                                document_factor))
+        vector = SparseVector(term_ids, tf_idfs, len(self._terms))
+        return vector if (self._sparse if sparse is None else sparse) else vector.to_dense()
+
+    def search(self, query_doc: Document, k: int = 10) -> list[tuple[str, float]]:
+        """Returns the `k` best (document title, cosine similarity) pairs for `query_doc`, best first, exactly as the
+        unsharded `Corpus.search` would."""
+        shard_results = self._scatter("search_weights", self._compute_query_weights(query_doc), k)
+        return self._merge(shard_results, k)
+
+    def search_batch(self, query_docs: Iterable[Document], k: int = 10) -> list[list[tuple[str, float]]]:
+        """Returns the ranked results of `search` for each of `query_docs`, sending the whole batch to each shard."""
+        block = [self._compute_query_weights(query_doc) for query_doc in query_docs]
+        shard_results = self._scatter("search_weights_batch", block, k)
+        return [self._merge(query_results, k) for query_results in zip(*shard_results)]
+
+    def close(self) -> None:
+        """Stops the shard processes, if any."""
+        for connection in self._connections:
+            try:
+                connection.send(None)
+                connection.close()
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join()
+        if self._executor is not None:
+            self._executor.shutdown()
+        self._connections, self._processes, self._executor = [], [], None
+
+    def _compute_query_weights(self, query_doc: Document) -> dict[int, float]:
+        """Computes and returns the nonzero query weights of `query_doc` as a dictionary of {term id: weight}."""
+        weighting = self._weighting
+        weights = {}
+        for term, tf in query_doc.counts.items():
+            if term in self._terms:
+                weight = weighting.query_weight(tf, weighting.term_factor(self._dfs[term], self._num_docs))
+                if weight:
+                    weights[self._terms[term]] = weight
+        return weights
+
+    def _scatter(self, method: str, query, k: int) -> list:
+        """Calls `method` with `query` and `k` on every shard and returns their results in shard order."""
+        if not self._processes:
+            return [getattr(shard, method)(query, k) for shard in self._shards]
+        for connection in self._connections:
+            connection.send((method, query, k))
+        results = list(self._executor.map(_receive, self._connections))
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    def _merge(self, shard_results: Iterable[list[tuple[int, str, float]]], k: int) -> list[tuple[str, float]]:
+        """Merges the ranked (document id, title, score) lists of the shards into the overall top `k`."""
+        merged = heapq.merge(*shard_results, key=lambda result: (-result[2], result[0]))
+        return [(title, score) for _, title, score in itertools.islice(merged, k)]
+
+    def _start_processes(self) -> None:
+        """Starts one process per shard, each building its shard from its share of the term counts."""
+        context = multiprocessing.get_context()
+        try:
+            for args in self._shard_args:
+                connection, worker_connection = context.Pipe()
+                process = context.Process(target=_serve_shard, args=(worker_connection, *args), daemon=True)
+                process.start()
+                worker_connection.close()
+                self._connections.append(connection)
+                self._processes.append(process)
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(self._connections))
+            for result in self._executor.map(_receive, self._connections):  # wait for every shard to be built
+                if isinstance(result, Exception):
+                    raise result
+        except BaseException:
+            self.close()
+            raise
+
+
+def _receive(connection):
+    """Returns the next message received on `connection`, or the `EOFError` raised if its shard process died."""
+    try:
+        return connection.recv()
+    except EOFError as error:
+        return error
+
+
+def _serve_shard(connection, titles: list[str], counts: list[dict[str, int]], term_stats: dict[str, tuple[int, int]],
+                 num_docs: int, offset: int, weighting: WeightingScheme, avg_doc_length: float) -> None:
+    """Shard process loop: builds an `IndexShard`, then answers (method, query, k) requests until it receives None.
+    Exceptions are sent back to the coordinator instead of a result."""
+    try:
+        shard = IndexShard(titles, counts, term_stats, num_docs, offset, weighting, avg_doc_length)
+        connection.send(len(shard))
+    except Exception as error:
+        connection.send(error)
+        return
+    del titles, counts, term_stats
+
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        method, query, k = request
+        try:
+            connection.send(getattr(shard, method)(query, k))
+        except Exception as error:
+            connection.send(error)
+    connection.close()
@@ -0,0 +1,572 @@
+"""Binary index format for the vector space model. An index file is opened with `mmap`, so queries only read the
+   pages they touch and no deserialization happens on startup; processes opening the same file share one page-cached
+   copy of it.
+
+   The file starts with a header (magic, format version, byte order and counts) and a table of (offset, length)
+   entries, one per section. Sections are flat arrays in native byte order, each aligned to 8 bytes:
+
+     term_offsets     Q[num_terms + 1]   offsets of each term within `term_blob`
+     term_blob        B[...]             UTF-8 encoded terms, sorted bytewise for binary search
+     dfs              I[num_terms]       document frequency of each term
+     posting_offsets  Q[num_terms + 1]   offsets of each term's posting list within the posting arrays
+     posting_docs     I[num_postings]    document ids of the postings, sorted by document id within a term
+     posting_weights  d[num_postings]    weights of the postings
+     impacts          d[num_terms * 2]   (min, max) normalized weight of each term's posting list
+     norms            d[num_docs]        norm of each document's vector (`WeightingScheme.norm`)
+     title_offsets    Q[num_docs + 1]    offsets of each title within `title_blob`
+     title_blob       B[...]             UTF-8 encoded document titles, in document id order
+     analyzer         B[...]             UTF-8 encoded JSON of the query `Preprocessor` (`Preprocessor.to_dict`), or
+                                         empty if none was stored; absent from version 1 files
+     weighting        B[...]             UTF-8 encoded JSON of the `WeightingScheme` of the weights
+                                         (`WeightingScheme.to_dict`); absent from version 1 and 2 files, which
+                                         hold TF-IDF weights
+"""
+import json
+import heapq
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+from array import array
+from collections.abc import Mapping
+from itertools import groupby
+from typing import BinaryIO, Iterable, Iterator
+
+from vectorspace.vector_space_metrics import Metrics, NULL_METRICS
+from vectorspace.vector_space_models import Document, Corpus, Preprocessor, PostingsSearch
+from vectorspace.vector_space_weighting import TfIdf, WeightingScheme
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+MAGIC = b"VSIX"
+FORMAT_VERSION = 3
+SECTIONS = {
+    "term_offsets": "Q",
+    "term_blob": "B",
+    "dfs": "I",
+    "posting_offsets": "Q",
+    "posting_docs": "I",
+    "posting_weights": "d",
+    "impacts": "d",
+    "norms": "d",
+    "title_offsets": "Q",
+    "title_blob": "B",
+    "analyzer": "B",
+    "weighting": "B",
+}
+_VERSION_SECTIONS = {1: list(SECTIONS)[:-2], 2: list(SECTIONS)[:-1], 3: list(SECTIONS)}
+
+_HEADER = struct.Struct("<4sIB7xQQQ")  # magic, version, big endian flag, num_docs, num_terms, num_postings
+_SECTION = struct.Struct("<QQ")  # offset, length
+_ALIGNMENT = 8
+_RUN_ENTRY = struct.Struct("<II")  # length of the encoded term, number of postings
+
+
+def write_index(corpus: Corpus, path: str) -> None:
+    """Writes the inverted index, document norms and titles of `corpus` to `path` in the binary index format, along
+    with its `preprocessor` if it has one and its weighting scheme, which `MappedIndex` weights queries with."""
+    with corpus.metrics.phase("index.write"):
+        _write_corpus(corpus, path)
+
+
+def _write_corpus(corpus: Corpus, path: str) -> None:
+    corpus_terms = corpus.terms
+    index = corpus.index
+    norms = corpus.norms
+
+    terms = sorted(corpus_terms, key=lambda term: term.encode())
+    posting_offsets = array('Q', [0])
+    posting_docs = array('I')
+    posting_weights = array('d')
+    impacts = array('d')
+    for term in terms:
+        postings = index.get(corpus_terms[term], [])
+        normalized = [weight / norms[doc_id] for doc_id, weight in postings]
+        posting_docs.extend([doc_id for doc_id, _ in postings])
+        posting_weights.extend([weight for _, weight in postings])
+        posting_offsets.append(len(posting_docs))
+        impacts.extend([min(normalized), max(normalized)] if normalized else [0.0, 0.0])
+
+    term_offsets, term_blob = _encode_strings(terms)
+    title_offsets, title_blob = _encode_strings([doc.title for doc in corpus])
+    _write_sections(path, len(corpus), len(terms), len(posting_docs), {
+        "term_offsets": term_offsets,
+        "term_blob": term_blob,
+        "dfs": array('I', [corpus.dfs[term] for term in terms]),
+        "posting_offsets": posting_offsets,
+        "posting_docs": posting_docs,
+        "posting_weights": posting_weights,
+        "impacts": impacts,
+        "norms": array('d', norms),
+        "title_offsets": title_offsets,
+        "title_blob": title_blob,
+        "analyzer": _encode_preprocessor(corpus.preprocessor),
+        "weighting": json.dumps(corpus.weighting.to_dict()).encode(),
+    })
+
+
+def _encode_preprocessor(preprocessor: Preprocessor | None) -> bytes:
+    """Returns the contents of the analyzer section storing `preprocessor`, which is empty if it is None."""
+    return b"" if preprocessor is None else json.dumps(preprocessor.to_dict()).encode()
+
+
+def _encode_strings(strings: list[str]) -> tuple[array, bytes]:
+    """Returns the (offsets, blob) pair storing `strings` as concatenated UTF-8."""
+    encoded = [string.encode() for string in strings]
+    offsets = array('Q', [0])
+    for string in encoded:
+        offsets.append(offsets[-1] + len(string))
+    return offsets, b"".join(encoded)
+
+
+def _write_sections(path: str, num_docs: int, num_terms: int, num_postings: int,
+                    sections: dict[str, array | bytes | BinaryIO]) -> None:
+    """Writes an index file holding `sections`, each an array, bytes or a binary file positioned at its start.
+
+    The file is written next to `path` and moved into place once complete, so readers never see a partial index.
+
+    """
+    if set(sections) != set(SECTIONS):
+        raise ValueError(f"Expected sections {list(SECTIONS)}, got: {list(sections)}")
+
+    temp_path = f"{path}.tmp"
+    table_size = _HEADER.size + _SECTION.size * len(SECTIONS)
+    table = []
+    with open(temp_path, "wb") as index_file:
+        index_file.write(b"\0" * table_size)
+        for name in SECTIONS:
+            index_file.write(b"\0" * (-index_file.tell() % _ALIGNMENT))
+            offset = index_file.tell()
+            section = sections[name]
+            if isinstance(section, (array, bytes)):
+                index_file.write(section)
+            else:
+                shutil.copyfileobj(section, index_file)
+            table.append((offset, index_file.tell() - offset))
+
+        index_file.seek(0)
+        index_file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, sys.byteorder == "big", num_docs, num_terms,
+                                      num_postings))
+        for offset, length in table:
+            index_file.write(_SECTION.pack(offset, length))
+    os.replace(temp_path, path)
+
+
+class IndexBuilder:
+    """This class builds an index file from a stream of documents with bounded memory (single-pass in-memory
+       indexing). Term counts are accumulated in memory until their estimated size reaches `memory_budget` bytes,
+       then written to a temporary run file sorted by term. `finish` merges the runs, computes the weights of the
+       `weighting` scheme (`TfIdf` by default) from the final document frequencies and document lengths and writes
+       the index with `write_index`'s layout, so the result opens with `MappedIndex` and answers queries like a
+       `Corpus` built from the same documents."""
+
+    _TERM_OVERHEAD = 128  # estimated bytes for a term's entry in the in-memory block, besides its postings
+
+    def __init__(self, path: str, memory_budget: int = 64 * 1024 ** 2, temp_dir: str | None = None,
+                 preprocessor: Preprocessor | None = None, weighting: WeightingScheme | None = None):
+        self._path = path
+        self._preprocessor = preprocessor
+        self._weighting = weighting if weighting is not None else TfIdf()
+        self._memory_budget = memory_budget
+        self._temp_dir = tempfile.TemporaryDirectory(dir=temp_dir)
+        self._titles = self._temp_file("titles")
+        self._title_offsets = self._temp_file("title_offsets")
+        self._title_offsets.write(array('Q', [0]))
+        self._title_size = 0
+        self._doc_lengths = self._temp_file("doc_lengths")
+        self._total_length = 0
+        self._runs: list[str] = []
+        self._block: dict[str, array] = {}
+        self._block_size = 0
+        self._num_docs = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @property
+    def num_docs(self):
+        return self._num_docs
+
+    @property
+    def num_runs(self):
+        return len(self._runs)
+
+    def add(self, title: str, words: Iterable[str]) -> None:
+        """Adds the document `title` made of `words` to the index, flushing a run once the memory budget is reached."""
+        counts = {}
+        for word in words:
+            counts[word] = counts.get(word, 0) + 1
+
+        doc_id = self._num_docs
+        for term, tf in counts.items():
+            postings = self._block.get(term)
+            if postings is None:
+                postings = self._block[term] = array('I')
+                self._block_size += self._TERM_OVERHEAD + len(term)
+            postings.extend((doc_id, tf))
+            self._block_size += 2 * postings.itemsize
+
+        encoded = title.encode()
+        self._titles.write(encoded)
+        self._title_size += len(encoded)
+        self._title_offsets.write(array('Q', [self._title_size]))
+        doc_length = sum(counts.values())
+        self._doc_lengths.write(array('Q', [doc_length]))
+        self._total_length += doc_length
+        self._num_docs += 1
+
+        if self._block_size >= self._memory_budget:
+            self._flush()
+
+    def finish(self) -> None:
+        """Merges the runs into the index file at `path` and removes the temporary files."""
+        self._flush()
+        temp = {name: self._temp_file(name) for name in SECTIONS if not name.startswith("title")}
+        temp["term_offsets"].write(array('Q', [0]))
+        temp["posting_offsets"].write(array('Q', [0]))
+        num_docs, num_terms, num_postings, term_size = self._num_docs, 0, 0, 0
+        weighting = self._weighting
+
+        # The document factors and squared norms are kept in memory-mapped files so that they are paged out like the
+        # rest.
+        factors_file = self._write_document_factors()
+        squares_file = self._temp_file("squares")
+        squares_file.truncate(max(num_docs, 1) * 8)
+        with mmap.mmap(squares_file.fileno(), 0) as squares_map, memoryview(squares_map) as squares_view, \
+                mmap.mmap(factors_file.fileno(), 0) as factors_map, memoryview(factors_map) as factors_view:
+            squares = squares_view.cast('d')
+            factors = factors_view.cast('d')
+            for encoded, postings in self._merge_runs():
+                df = len(postings) // 2
+                doc_ids = postings[0::2]
+                term_factor = weighting.term_factor(df, num_docs)
+                weights = array('d', [weighting.weight(tf, term_factor, factors[doc_id])
+                                      for doc_id, tf in zip(doc_ids, postings[1::2])])
+                nonzero = [position for position, weight in enumerate(weights) if weight]
+                for position in nonzero:
+                    squares[doc_ids[position]] += weights[position] ** 2
+
+                temp["term_blob"].write(encoded)
+                term_size += len(encoded)
+                temp["term_offsets"].write(array('Q', [term_size]))
+                temp["dfs"].write(array('I', [df]))
+                temp["posting_docs"].write(array('I', [doc_ids[position] for position in nonzero]))
+                temp["posting_weights"].write(array('d', [weights[position] for position in nonzero]))
+                num_postings += len(nonzero)
+                temp["posting_offsets"].write(array('Q', [num_postings]))
+                num_terms += 1
+
+            norms = array('d', [weighting.norm(square) for square in squares[:num_docs]])
+            squares.release()
+            factors.release()
+        factors_file.close()
+        temp["norms"].write(norms)
+        self._write_impacts(temp, norms)
+        temp["analyzer"].write(_encode_preprocessor(self._preprocessor))
+        temp["weighting"].write(json.dumps(weighting.to_dict()).encode())
+
+        sections = dict(temp, title_offsets=self._title_offsets, title_blob=self._titles)
+        for section in sections.values():
+            section.flush()
+            section.seek(0)
+        _write_sections(self._path, num_docs, num_terms, num_postings, sections)
+        for section in sections.values():
+            section.close()
+        self.close()
+
+    def close(self) -> None:
+        """Removes the temporary files of this builder."""
+        self._temp_dir.cleanup()
+
+    def _temp_file(self, name: str) -> BinaryIO:
+        """Opens and returns a new temporary file named `name` for reading and writing."""
+        return open(os.path.join(self._temp_dir.name, name), "w+b")
+
+    def _write_document_factors(self) -> BinaryIO:
+        """Writes the document factor of the weighting scheme of every document, computed from the document lengths,
+        to a temporary file and returns it."""
+        avg_doc_length = self._total_length / self._num_docs if self._num_docs else 0.0
+        factors_file = self._temp_file("document_factors")
+        self._doc_lengths.flush()
+        self._doc_lengths.seek(0)
+        while chunk := self._doc_lengths.read(8 * 4096):
+            doc_lengths = array('Q')
+            doc_lengths.frombytes(chunk)
+            factors_file.write(array('d', [self._weighting.document_factor(doc_length, avg_doc_length)
+                                           for doc_length in doc_lengths]))
+        factors_file.truncate(max(self._num_docs, 1) * 8)
+        factors_file.flush()
+        self._doc_lengths.close()
+        return factors_file
+
+    def _flush(self) -> None:
+        """Writes the in-memory block to a new run file, sorted by term, and empties the block."""
+        if not self._block:
+            return
+        run_path = os.path.join(self._temp_dir.name, f"run{len(self._runs):05d}")
+        with open(run_path, "wb") as run_file:
+            for encoded, term in sorted([(term.encode(), term) for term in self._block]):
+                postings = self._block[term]
+                run_file.write(_RUN_ENTRY.pack(len(encoded), len(postings)))
+                run_file.write(encoded)
+                run_file.write(postings)
+        self._runs.append(run_path)
+        self._block = {}
+        self._block_size = 0
+
+    def _merge_runs(self) -> Iterator[tuple[bytes, array]]:
+        """Yields (encoded term, postings) in term order by k-way merging the runs.
+
+        Postings interleave document ids and term counts. Runs hold increasing document ids and the merge is stable,
+        so concatenating a term's postings in run order keeps them sorted by document id.
+
+        """
+        entries = heapq.merge(*[_read_run(run) for run in self._runs], key=lambda entry: entry[0])
+        for encoded, group in groupby(entries, key=lambda entry: entry[0]):
+            postings = array('I')
+            for _, run_postings in group:
+                postings.extend(run_postings)
+            yield encoded, postings
+
+    @staticmethod
+    def _write_impacts(temp: dict[str, BinaryIO], norms: array) -> None:
+        """Writes the impacts section by streaming the postings and weights back with the final document norms."""
+        for name in ("posting_offsets", "posting_docs", "posting_weights"):
+            temp[name].flush()
+            temp[name].seek(0)
+        offsets = array('Q')
+        offsets.frombytes(temp["posting_offsets"].read())
+        for start, end in zip(offsets, offsets[1:]):
+            doc_ids, weights = array('I'), array('d')
+            doc_ids.frombytes(temp["posting_docs"].read((end - start) * doc_ids.itemsize))
+            weights.frombytes(temp["posting_weights"].read((end - start) * weights.itemsize))
+            normalized = [weight / norms[doc_id] for doc_id, weight in zip(doc_ids, weights)]
+            temp["impacts"].write(array('d', [min(normalized), max(normalized)] if normalized else [0.0, 0.0]))
+
+
+def _read_run(run_path: str) -> Iterator[tuple[bytes, array]]:
+    """Yields the (encoded term, postings) entries of the run file at `run_path`, in term order."""
+    with open(run_path, "rb") as run_file:
+        while entry := run_file.read(_RUN_ENTRY.size):
+            term_size, num_values = _RUN_ENTRY.unpack(entry)
+            encoded = run_file.read(term_size)
+            postings = array('I')
+            postings.frombytes(run_file.read(num_values * postings.itemsize))
+            yield encoded, postings
+
+
+def build_index(documents: Iterable[tuple[str, Iterable[str]]], path: str, memory_budget: int = 64 * 1024 ** 2,
+                temp_dir: str | None = None, preprocessor: Preprocessor | None = None,
+                weighting: WeightingScheme | None = None) -> int:
+    """Builds an index file at `path` from an iterable of (title, words) pairs, using about `memory_budget` bytes
+    for term counts, storing `preprocessor` with it and weighting it with `weighting` (`TfIdf` by default). Returns
+    the number of runs that were written to temporary files and merged."""
+    with IndexBuilder(path, memory_budget, temp_dir, preprocessor, weighting) as builder:
+        for title, words in documents:
+            builder.add(title, words)
+        builder.finish()
+        return builder.num_runs
+
+
+class MappedIndex(PostingsSearch):
+    """This class opens an index file written by `write_index` with `mmap` and answers the same queries as
+       `Corpus.search`, reading posting lists straight from the mapped pages. Term ids are the positions of the
+       terms in the sorted term dictionary of the file, and queries are weighted with the weighting scheme stored
+       in the file."""
+
+    def __init__(self, path: str, metrics: Metrics | None = None):
+        self._metrics = metrics if metrics is not None else NULL_METRICS
+        with self._metrics.phase("index.open"):
+            self._open(path)
+
+    def _open(self, path: str) -> None:
+        """Maps the index file at `path` and casts a view over each of its sections."""
+        with open(path, "rb") as index_file:
+            self._mmap = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, big_endian, num_docs, num_terms, num_postings = _HEADER.unpack_from(self._mmap)
+        except struct.error:
+            self._mmap.close()
+            raise ValueError(f"Not an index file: {path}")
+        if magic != MAGIC or version not in _VERSION_SECTIONS or big_endian != (sys.byteorder == "big"):
+            self._mmap.close()
+            raise ValueError(f"Unsupported index file (magic {magic}, version {version}): {path}")
+
+        self._num_docs: int = num_docs
+        self._num_terms: int = num_terms
+        self._num_postings: int = num_postings
+
+        view = memoryview(self._mmap)
+        self._views = [view]
+        self._sections = {}
+        for position, name in enumerate(_VERSION_SECTIONS[version]):
+            offset, length = _SECTION.unpack_from(self._mmap, _HEADER.size + _SECTION.size * position)
+            self._sections[name] = view[offset:offset + length].cast(SECTIONS[name])
+            self._views.append(self._sections[name])
+        self._preprocessor: Preprocessor | None = None
+        if len(self._sections.get("weighting", b"")):
+            self._weighting = WeightingScheme.from_dict(json.loads(self._sections["weighting"].tobytes()))
+        else:
+            self._weighting = TfIdf()
+
+        self._index = _MappedPostings(self._sections["posting_offsets"], self._sections["posting_docs"],
+                                      self._sections["posting_weights"])
+        self._norms = self._sections["norms"]
+        self._impacts = _MappedImpacts(self._sections["impacts"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __len__(self):
+        return self._num_docs
+
+    @property
+    def num_terms(self):
+        return self._num_terms
+
+    @property
+    def num_postings(self):
+        return self._num_postings
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def norms(self):
+        return self._norms
+
+    @property
+    def weighting(self) -> WeightingScheme:
+        """The `WeightingScheme` of the weights of the index, which is `TfIdf` for files written before it was
+        stored."""
+        return self._weighting
+
+    @property
+    def preprocessor(self) -> Preprocessor | None:
+        """The `Preprocessor` stored with the index, decoded on first use, or None if none was stored."""
+        if self._preprocessor is None and len(self._sections.get("analyzer", b"")):
+            self._preprocessor = Preprocessor.from_dict(json.loads(self._sections["analyzer"].tobytes()))
+        return self._preprocessor
+
+    def close(self) -> None:
+        """Releases the views of the mapped file and unmaps it."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def title(self, doc_id: int) -> str:
+        """Returns the title of the document whose id is `doc_id`."""
+        if 0 <= doc_id < self._num_docs:
+            return self._string("title", doc_id)
+        else:
+            raise IndexError(f"Index out of range: {doc_id}")
+
+    def term(self, term_id: int) -> str:
+        """Returns the term whose id is `term_id`."""
+        if 0 <= term_id < self._num_terms:
+            return self._string("term", term_id)
+        else:
+            raise IndexError(f"Index out of range: {term_id}")
+
+    def term_id(self, term: str) -> int | None:
+        """Returns the id of `term` by binary search over the sorted term dictionary, or None if it is not indexed."""
+        encoded = term.encode()
+        offsets, blob = self._sections["term_offsets"], self._sections["term_blob"]
+        low, high = 0, self._num_terms
+        while low < high:
+            middle = (low + high) // 2
+            if blob[offsets[middle]:offsets[middle + 1]].tobytes() < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._num_terms and blob[offsets[low]:offsets[low + 1]].tobytes() == encoded:
+            return low
+        return None
+
+    def df(self, term: str) -> int:
+        """Returns the document frequency of `term`, or 0 if it is not indexed."""
+        term_id = self.term_id(term)
+        return 0 if term_id is None else self._sections["dfs"][term_id]
+
+    def search(self, query_doc: Document, k: int = 10) -> list[tuple[str, float]]:
+        """Returns the `k` best (document title, cosine similarity) pairs for `query_doc`, best first."""
+        with self._metrics.phase("query.weights"):
+            query_weights = self._compute_query_weights(query_doc)
+        with self._metrics.phase("query.scoring"):
+            results = [(self.title(doc_id), score) for doc_id, score in self._search_top_k(query_weights, k)]
+        self._metrics.count("query.queries")
+        return results
+
+    def _title(self, doc_id: int) -> str:
+        return self._string("title", doc_id)
+
+    def _compute_query_weights(self, query_doc: Document) -> dict[int, float]:
+        """Computes and returns the nonzero query weights of `query_doc` as a dictionary of {term id: weight}."""
+        weights = {}
+        dfs = self._sections["dfs"]
+        weighting = self._weighting
+        for term, tf in query_doc.counts.items():
+            term_id = self.term_id(term)
+            if term_id is not None:
+                weight = weighting.query_weight(tf, weighting.term_factor(dfs[term_id], self._num_docs))
+                if weight:
+                    weights[term_id] = weight
+        return weights
+
+    def _string(self, prefix: str, position: int) -> str:
+        """Decodes the string at `position` of the `prefix`_offsets and `prefix`_blob sections."""
+        offsets, blob = self._sections[f"{prefix}_offsets"], self._sections[f"{prefix}_blob"]
+        return blob[offsets[position]:offsets[position + 1]].tobytes().decode()
+
+
+class _MappedPostings(Mapping):
+    """A read-only mapping of {term id: posting list} decoding posting lists from the mapped posting arrays."""
+
+    def __init__(self, offsets: memoryview, docs: memoryview, weights: memoryview):
+        self._offsets = offsets
+        self._docs = docs
+        self._weights = weights
+
+    def __getitem__(self, term_id: int) -> list[tuple[int, float]]:
+        if not isinstance(term_id, int) or not 0 <= term_id < len(self._offsets) - 1:
+            raise KeyError(term_id)
+        start, end = self._offsets[term_id], self._offsets[term_id + 1]
+        if start == end:
+            raise KeyError(term_id)
+        return list(zip(self._docs[start:end], self._weights[start:end]))
+
+    def __contains__(self, term_id) -> bool:
+        return (isinstance(term_id, int) and 0 <= term_id < len(self._offsets) - 1
+                and self._offsets[term_id] != self._offsets[term_id + 1])
+
+    def __iter__(self) -> Iterator[int]:
+        return (term_id for term_id in range(len(self._offsets) - 1) if term_id in self)
+
+    def __len__(self) -> int:
+        return sum([1 for _ in self])
+
+
+class _MappedImpacts:
+    """A read-only mapping of {term id: (min impact, max impact)} over the mapped impacts array."""
+
+    def __init__(self, impacts: memoryview):
+        self._impacts = impacts
+
+    def __getitem__(self, term_id: int) -> tuple[float, float]:
+        return self._impacts[2 * term_id], self._impacts[2 * term_id + 1]
@@ -0,0 +1,254 @@
+"""Term weighting for the vector space model. `CorpusStatistics` holds the raw statistics of a corpus that every
+   weighting depends on: the term counts of each document, the document lengths and the document frequencies.
+   Weighting schemes are strategies computing the weights of every posting of those statistics in one pass, so a
+   corpus can switch schemes, or re-parameterize one, without re-tokenizing or re-counting its documents.
+
+   A scheme splits a weight into a term factor (from the document frequency), a document factor (from the document
+   length) and a function of the term frequency and both factors. Each factor is computed once per term or document
+   rather than once per posting, and weights computed one at a time (for queries and for documents outside the
+   corpus) go through the same functions, so they are identical to the weights computed in a batch.
+"""
+import math
+
+from array import array
+from typing import Iterable
+
+__author__ = "Garrett Buchanan"
+__copyright__ = "Copyright 2023, Westmont College, Mike Ryu"
+__credits__ = ["Garrett Buchanan", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "gbuchanan@westmont.edu"
+
+
+class CorpusStatistics:
+    """This class holds the term counts of the documents of a corpus as flat arrays: `term_ids` and `tfs` hold the
+       (term id, term frequency) pairs of every document in order, those of document `doc_id` being at
+       `doc_offsets[doc_id]` to `doc_offsets[doc_id + 1]`. `doc_lengths` holds the number of words of each document,
+       and `dfs` the document frequency of each term id. It is built from the term-count table of each document,
+       the {term: term id} dictionary `terms` and the {term: document frequency} dictionary `dfs` of the corpus."""
+
+    __slots__ = ("_doc_offsets", "_term_ids", "_tfs", "_doc_lengths", "_dfs", "_total_length")
+
+    def __init__(self, counts_list: Iterable[dict[str, int]], terms: dict[str, int], dfs: dict[str, int]):
+        self._doc_offsets = array('Q', [0])
+        self._term_ids = array('I')
+        self._tfs = array('I')
+        self._doc_lengths = array('Q')
+        for counts in counts_list:
+            self._term_ids.extend([terms[term] for term in counts])
+            self._tfs.extend(counts.values())
+            self._doc_lengths.append(sum(counts.values()))
+            self._doc_offsets.append(len(self._term_ids))
+        self._dfs = array('I', [dfs[term] for term in terms])
+        self._total_length = sum(self._doc_lengths)
+
+    def __getstate__(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state: dict) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    @property
+    def num_docs(self) -> int:
+        return len(self._doc_lengths)
+
+    @property
+    def num_terms(self) -> int:
+        return len(self._dfs)
+
+    @property
+    def avg_doc_length(self) -> float:
+        return self._total_length / self.num_docs if self.num_docs else 0.0
+
+    @property
+    def doc_offsets(self):
+        return self._doc_offsets
+
+    @property
+    def term_ids(self):
+        return self._term_ids
+
+    @property
+    def tfs(self):
+        return self._tfs
+
+    @property
+    def doc_lengths(self):
+        return self._doc_lengths
+
+    @property
+    def dfs(self):
+        return self._dfs
+
+
+class WeightingScheme:
+    """This class is the base of the weighting schemes. Subclasses provide `term_factor`, `document_factor`, `weight`
+       and `query_weight`, and set `cosine_normalized` to False if their weights are already normalized by document
+       length, in which case documents are not divided by the norm of their vector when scored, and
+       `uses_document_length` to False if their document factor ignores the document length, in which case the
+       average document length is not computed for them. Schemes are compared by `key`, their class name and
+       parameters, under which a corpus caches their weights, and are stored by `to_dict`."""
+
+    cosine_normalized = True
+    uses_document_length = True
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, WeightingScheme) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __repr__(self) -> str:
+        name, parameters = self.key
+        return f"{name}({', '.join([f'{parameter}={value}' for parameter, value in parameters])})"
+
+    @property
+    def key(self) -> tuple[str, tuple[tuple[str, float], ...]]:
+        return type(self).__name__, tuple(sorted(vars(self).items()))
+
+    @staticmethod
+    def from_dict(state: dict) -> "WeightingScheme":
+        """Returns the scheme described by `state`, a dictionary returned by `to_dict`."""
+        if state["scheme"] not in WEIGHTING_SCHEMES:
+            raise ValueError(f"Unknown weighting scheme: {state['scheme']}")
+        return WEIGHTING_SCHEMES[state["scheme"]](**state["parameters"])
+
+    def to_dict(self) -> dict:
+        """Returns the name (in `WEIGHTING_SCHEMES`) and parameters of this scheme as a JSON serializable
+        dictionary."""
+        names = {scheme: name for name, scheme in WEIGHTING_SCHEMES.items()}
+        if type(self) not in names:
+            raise ValueError(f"Cannot store the weighting scheme: {self}")
+        return {"scheme": names[type(self)], "parameters": vars(self).copy()}
+
+    def term_factor(self, df: int, num_docs: int) -> float:
+        """Returns the factor of the weights of a term occurring in `df` of `num_docs` documents."""
+        raise NotImplementedError
+
+    def document_factor(self, doc_length: int, avg_doc_length: float) -> float:
+        """Returns the factor of the weights of a document of `doc_length` words."""
+        raise NotImplementedError
+
+    def weight(self, tf: int, term_factor: float, document_factor: float) -> float:
+        """Returns the weight of a term occurring `tf` (at least one) times in a document, given their factors."""
+        raise NotImplementedError
+
+    def query_weight(self, tf: int, term_factor: float) -> float:
+        """Returns the weight of a term occurring `tf` (at least one) times in a query, given its term factor."""
+        raise NotImplementedError
+
+    def norm(self, squares: float) -> float:
+        """Returns the norm of a document whose weights square to `squares`: the Euclidean norm if the scheme is
+        cosine normalized, and otherwise 1.0, or 0.0 if the document has no nonzero weight."""
+        if self.cosine_normalized:
+            return math.sqrt(squares)
+        return 1.0 if squares else 0.0
+
+    def document_weight(self, tf: int, df: int, doc_length: int, num_docs: int, avg_doc_length: float) -> float:
+        """Returns the weight of a term occurring `tf` times in a document of `doc_length` words, and in `df` of the
+        `num_docs` documents of a corpus whose documents average `avg_doc_length` words."""
+        if not tf:
+            return 0.0
+        return self.weight(tf, self.term_factor(df, num_docs), self.document_factor(doc_length, avg_doc_length))
+
+    def document_weights(self, statistics: CorpusStatistics) -> array:
+        """Returns the weight of every (term id, term frequency) pair of `statistics`, in the same order."""
+        term_factors = self._term_factors(statistics)
+        avg_doc_length = statistics.avg_doc_length
+        offsets, term_ids, tfs, weight = statistics.doc_offsets, statistics.term_ids, statistics.tfs, self.weight
+        weights = array('d')
+        for doc_id, doc_length in enumerate(statistics.doc_lengths):
+            document_factor = self.document_factor(doc_length, avg_doc_length)
+            start, end = offsets[doc_id], offsets[doc_id + 1]
+            weights.extend([weight(tf, term_factors[term_id], document_factor)
+                            for term_id, tf in zip(term_ids[start:end], tfs[start:end])])
+        return weights
+
+    def _term_factors(self, statistics: CorpusStatistics) -> list[float]:
+        num_docs = statistics.num_docs
+        return [self.term_factor(df, num_docs) for df in statistics.dfs]
+
+
+class TfIdf(WeightingScheme):
+    """This class is the TF-IDF weighting of this package: log10(1 + tf) * log10(N / (1 + df)) for a corpus of N
+       documents, or zero if the corpus has a single document, cosine normalized. Queries are weighted the same
+       way."""
+
+    uses_document_length = False
+
+    def term_factor(self, df: int, num_docs: int) -> float:
+        return math.log10(num_docs / (1 + df)) if num_docs > 1 else 0.0
+
+    def document_factor(self, doc_length: int, avg_doc_length: float) -> float:
+        return 1.0
+
+    def weight(self, tf: int, term_factor: float, document_factor: float) -> float:
+        return math.log10(1 + tf) * term_factor
+
+    def query_weight(self, tf: int, term_factor: float) -> float:
+        return math.log10(1 + tf) * term_factor
+
+    def document_weights(self, statistics: CorpusStatistics) -> array:
+        """Returns the weight of every (term id, term frequency) pair of `statistics`, looking up log10(1 + tf) in
+        a table of the term frequencies of the corpus, since the weights of a document do not depend on it."""
+        term_factors = self._term_factors(statistics)
+        tf_factors = [math.log10(1 + tf) for tf in range(max(statistics.tfs, default=0) + 1)]
+        return array('d', [tf_factors[tf] * term_factors[term_id]
+                           for term_id, tf in zip(statistics.term_ids, statistics.tfs)])
+
+
+class BM25(WeightingScheme):
+    """This class is the Okapi BM25 weighting (Robertson et al.): idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b *
+       dl / avgdl)) for a document of dl words, with idf = ln(1 + (N - df + 0.5) / (df + 0.5)), which is positive.
+       A query term is weighted by its frequency in the query, so a score is the BM25 score of the document divided
+       by the norm of the query, which does not change the ranking."""
+
+    cosine_normalized = False
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        if k1 < 0 or not 0 <= b <= 1:
+            raise ValueError(f"Invalid k1 or b: {k1}, {b}")
+        self.k1 = k1
+        self.b = b
+
+    def term_factor(self, df: int, num_docs: int) -> float:
+        return math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+
+    def document_factor(self, doc_length: int, avg_doc_length: float) -> float:
+        return self.k1 * (1 - self.b + self.b * doc_length / avg_doc_length) if avg_doc_length else self.k1
+
+    def weight(self, tf: int, term_factor: float, document_factor: float) -> float:
+        return term_factor * tf * (self.k1 + 1) / (tf + document_factor)
+
+    def query_weight(self, tf: int, term_factor: float) -> float:
+        return float(tf)
+
+
+class PivotedNormalization(WeightingScheme):
+    """This class is the pivoted document length normalization weighting (Singhal, Buckley and Mitra):
+       (1 + ln(1 + ln(tf))) / (1 - s + s * dl / avgdl) * ln((N + 1) / df) for a document of dl words, with the
+       `slope` s. A query term is weighted by its frequency in the query, and, as the weights are length normalized,
+       documents are not cosine normalized."""
+
+    cosine_normalized = False
+
+    def __init__(self, slope: float = 0.2):
+        if not 0 <= slope <= 1:
+            raise ValueError(f"Invalid slope: {slope}")
+        self.slope = slope
+
+    def term_factor(self, df: int, num_docs: int) -> float:
+        return math.log((num_docs + 1) / df) if df else 0.0
+
+    def document_factor(self, doc_length: int, avg_doc_length: float) -> float:
+        return 1 / (1 - self.slope + self.slope * doc_length / avg_doc_length) if avg_doc_length else 1.0
+
+    def weight(self, tf: int, term_factor: float, document_factor: float) -> float:
+        return (1 + math.log(1 + math.log(tf))) * document_factor * term_factor
+
+    def query_weight(self, tf: int, term_factor: float) -> float:
+        return float(tf)
+
+
+WEIGHTING_SCHEMES = {"tfidf": TfIdf, "bm25": BM25, "pivoted": PivotedNormalization}